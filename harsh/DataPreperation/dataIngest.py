@@ -14,3 +14,9 @@ def split_documents(documents, chunk_size=50, chunk_overlap=10):
     )
     split_docs = text_splitter.split_documents(documents)
     return split_docs
+
+def load_and_split(file_path, chunk_size=300, chunk_overlap=50):
+    # Worker entry point for the ingestion process pool: parse one PDF and
+    # split it straight away so only its chunks travel back to the parent.
+    documents = load_documents(file_path)
+    return split_documents(documents, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
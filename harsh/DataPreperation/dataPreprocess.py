@@ -1,21 +1,146 @@
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import FAISS
-import dotenv
-
-from dotenv import load_dotenv
-load_dotenv(dotenv_path=r"C:\Users\Harsh Sharma\Desktop\sujal-maheshwari2004 bashAI main sujal\DataPreperation\env")
-
-embeddings = OpenAIEmbeddings(model="text-embedding-3-small")
-
-
-def chunk_embeddings(chunks, save_dir="faiss_index"):
-    texts = [chunk.page_content for chunk in chunks]
-    metadatas = [chunk.metadata for chunk in chunks]
-
-    try:
-        vectorstore = FAISS.from_texts(texts, embeddings, metadatas=metadatas)
-        vectorstore.save_local(save_dir)
-        return vectorstore
-    except Exception as e:
-        print(f"Error creating FAISS vectorstore: {e}")
-        return None
+import os
+import sys
+import time
+import random
+from pathlib import Path
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from langchain_community.vectorstores import FAISS
+
+# The embedding backend is shared with the shell (see backends.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import backends
+
+embeddings = backends.get_embeddings()
+
+
+def chunk_embeddings(chunks, save_dir="faiss_index"):
+    texts = [chunk.page_content for chunk in chunks]
+    metadatas = [chunk.metadata for chunk in chunks]
+
+    try:
+        vectorstore = FAISS.from_texts(texts, embeddings, metadatas=metadatas)
+        vectorstore.save_local(save_dir)
+        return vectorstore
+    except Exception as e:
+        print(f"Error creating FAISS vectorstore: {e}")
+        return None
+
+
+# Errors worth another try are recognised by HTTP status where there is
+# one, otherwise by class name, so no client library has to be imported:
+# openai's RateLimitError, APITimeoutError and APIConnectionError, httpx's
+# ConnectError and ReadTimeout (ollama) and the like.
+RETRY_STATUSES = {408, 425, 429}
+TRANSIENT_NAMES = ("RateLimit", "Timeout", "Connect", "ServiceUnavailable", "Overloaded")
+
+
+def is_transient(error):
+    # Rate limits, timeouts, dropped connections and 5xx responses; a bad
+    # key, a bad request or a bug fails the same way every time
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int):
+        return status in RETRY_STATUSES or status >= 500
+    return any(name in cls.__name__ for cls in type(error).__mro__ for name in TRANSIENT_NAMES)
+
+
+def retry_delay(error, attempt, base_delay=1.0):
+    # Honour Retry-After on rate-limit responses, otherwise back off
+    # exponentially with some jitter.
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    retry_after = headers.get("retry-after")
+    if retry_after:
+        try:
+            return float(retry_after)
+        except ValueError:
+            pass
+    return base_delay * (2 ** attempt) + random.uniform(0, base_delay)
+
+
+def embed_with_retry(texts, max_retries=6):
+    for attempt in range(max_retries):
+        try:
+            return embeddings.embed_documents(texts)
+        except Exception as e:
+            if attempt == max_retries - 1 or not is_transient(e):
+                raise
+            delay = retry_delay(e, attempt)
+            print(f"[WARN] Embedding batch failed ({e.__class__.__name__}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+class IndexWriter:
+    """Embed chunks in bounded concurrent batches and add them to the index.
+
+    Chunks are buffered up to ``batch_size`` and sent to a thread pool; at
+    most ``max_workers * 2`` batches are in flight, so memory is bounded by
+    the batch size rather than by the size of the corpus. With
+    ``incremental`` the saved index is loaded and updated in place,
+    otherwise a new one is built.
+    """
+
+    def __init__(self, save_dir, incremental=True, batch_size=64, max_workers=4):
+        self.save_dir = save_dir
+        self.batch_size = batch_size
+        self.max_in_flight = max_workers * 2
+        self.pool = ThreadPoolExecutor(max_workers=max_workers)
+        self.in_flight = deque()
+        self.batch = []
+        self.vectorstore = None
+        if incremental and os.path.exists(os.path.join(save_dir, "index.faiss")):
+            self.vectorstore = FAISS.load_local(save_dir, embeddings, allow_dangerous_deserialization=True)
+
+    def delete(self, ids):
+        if self.vectorstore is None or not ids:
+            return
+        existing = set(self.vectorstore.index_to_docstore_id.values())
+        stale = [i for i in ids if i in existing]
+        if stale:
+            self.vectorstore.delete(stale)
+
+    def add(self, chunks, ids):
+        self.batch.extend(zip(chunks, ids))
+        while len(self.batch) >= self.batch_size:
+            self._submit(self.batch[:self.batch_size])
+            self.batch = self.batch[self.batch_size:]
+
+    def _submit(self, batch):
+        while len(self.in_flight) >= self.max_in_flight:
+            self._collect(self.in_flight.popleft())
+        texts = [chunk.page_content for chunk, _ in batch]
+        metadatas = [chunk.metadata for chunk, _ in batch]
+        ids = [chunk_id for _, chunk_id in batch]
+        future = self.pool.submit(embed_with_retry, texts)
+        self.in_flight.append((future, texts, metadatas, ids))
+
+    def _collect(self, item):
+        future, texts, metadatas, ids = item
+        text_embeddings = list(zip(texts, future.result()))
+        if self.vectorstore is None:
+            self.vectorstore = FAISS.from_embeddings(text_embeddings, embeddings, metadatas=metadatas, ids=ids)
+        else:
+            self.vectorstore.add_embeddings(text_embeddings, metadatas=metadatas, ids=ids)
+
+    def close(self):
+        # Flush the remaining batches and save; returns None on failure.
+        try:
+            if self.batch:
+                self._submit(self.batch)
+                self.batch = []
+            while self.in_flight:
+                self._collect(self.in_flight.popleft())
+            if self.vectorstore is not None:
+                self.vectorstore.save_local(self.save_dir)
+            return self.vectorstore
+        except Exception as e:
+            print(f"Error updating FAISS vectorstore: {e}")
+            for future, *_ in self.in_flight:
+                future.cancel()
+            return None
+        finally:
+            self.pool.shutdown(wait=True)
@@ -1,36 +1,198 @@
-import os
-from pathlib import Path
-from dataIngest import load_documents, split_documents
-from dataPreprocess import chunk_embeddings
-
-# Define input and output directories
-DATA_DIR = Path(__file__).resolve().parent.parent / "data"
-EMBEDDING_DIR = Path(__file__).resolve().parent.parent / "embeddings"
-
-def main():
-    all_documents = []
-    print(f"[INFO] Reading PDFs from: {DATA_DIR}")
-
-    # Loop over all PDF files in the data directory
-    for pdf_file in DATA_DIR.glob("*.pdf"):
-        print(f"[INFO] Loading: {pdf_file.name}")
-        docs = load_documents(str(pdf_file))
-        all_documents.extend(docs)
-
-    print(f"[INFO] Total documents loaded: {len(all_documents)}")
-
-    print(f"[INFO] Splitting documents...")
-    chunks = split_documents(all_documents, chunk_size=300, chunk_overlap=50)
-    print(f"[INFO] Total chunks created: {len(chunks)}")
-
-    print(f"[INFO] Saving FAISS vectorstore to: {EMBEDDING_DIR}")
-    EMBEDDING_DIR.mkdir(parents=True, exist_ok=True)
-    vectorstore = chunk_embeddings(chunks, save_dir=str(EMBEDDING_DIR))
-
-    if vectorstore:
-        print("[SUCCESS] Vectorstore saved successfully.")
-    else:
-        print("[FAILURE] Vectorstore creation failed.")
-
-if __name__ == "__main__":
-    main()
+import os
+import sys
+import json
+import hashlib
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+# The embedding backend is shared with the shell (see backends.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+import backends
+
+# Define input and output directories
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+EMBEDDING_DIR = Path(__file__).resolve().parent.parent / backends.index_dir_name()
+MANIFEST_PATH = EMBEDDING_DIR / "manifest.json"
+
+EMBEDDING_MODEL = backends.embedding_model_id()
+CHUNK_SIZE = 300
+CHUNK_OVERLAP = 50
+
+# PDFs are parsed in a process pool; embeddings are requested in batches of
+# EMBED_BATCH_SIZE chunks with at most EMBED_WORKERS requests running.
+PARSE_WORKERS = int(os.environ.get("BASHAI_PARSE_WORKERS", os.cpu_count() or 1))
+EMBED_BATCH_SIZE = int(os.environ.get("BASHAI_EMBED_BATCH", "64"))
+EMBED_WORKERS = int(os.environ.get("BASHAI_EMBED_WORKERS", "4"))
+
+# The shell reads the memory-mapped copy in NATIVE_DIR (see vector_index.py)
+NATIVE_DIR = EMBEDDING_DIR / "native"
+INDEX_DTYPE = os.environ.get("BASHAI_INDEX_DTYPE", "float16")
+IVF_LISTS = os.environ.get("BASHAI_IVF_LISTS", "auto")
+
+
+def file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_ids(file_name, chunks):
+    # Ids come from the chunk text, so an edit only changes the ids of the
+    # chunks it touches. Repeated text within a file gets a running suffix.
+    seen = {}
+    ids = []
+    for chunk in chunks:
+        text_hash = hashlib.sha256(chunk.page_content.encode("utf-8")).hexdigest()[:24]
+        count = seen.get(text_hash, 0)
+        seen[text_hash] = count + 1
+        ids.append(f"{file_name}:{text_hash}:{count}")
+    return ids
+
+
+def load_manifest():
+    try:
+        with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("embedding_model") != EMBEDDING_MODEL:
+        return None
+    if manifest.get("chunking") != [CHUNK_SIZE, CHUNK_OVERLAP]:
+        return None
+    if not (EMBEDDING_DIR / "index.faiss").exists():
+        return None
+    return manifest
+
+
+def save_manifest(manifest):
+    tmp_path = MANIFEST_PATH.with_suffix(".json.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def scan_corpus(manifest):
+    # Returns (changed, removed, unchanged) where changed maps file name to
+    # (path, stat, digest). Files whose size and mtime match the manifest are
+    # not even re-hashed.
+    known = manifest["files"] if manifest else {}
+    changed, unchanged = {}, {}
+    for pdf_file in sorted(DATA_DIR.glob("*.pdf")):
+        st = pdf_file.stat()
+        entry = known.get(pdf_file.name)
+        if entry and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+            unchanged[pdf_file.name] = entry
+            continue
+        digest = file_digest(pdf_file)
+        if entry and entry["sha256"] == digest:
+            unchanged[pdf_file.name] = dict(entry, size=st.st_size, mtime_ns=st.st_mtime_ns)
+            continue
+        changed[pdf_file.name] = (pdf_file, st, digest)
+    removed = [name for name in known if name not in changed and name not in unchanged]
+    return changed, removed, unchanged
+
+
+def parse_changed(changed):
+    # Yield (name, chunks) as each PDF finishes parsing. Only a couple of
+    # files per worker are queued at a time so finished-but-unconsumed
+    # results cannot pile up while embedding lags behind.
+    from dataIngest import load_and_split
+
+    pending_files = list(changed.items())
+    with ProcessPoolExecutor(max_workers=PARSE_WORKERS) as pool:
+        running = {}
+        while pending_files or running:
+            while pending_files and len(running) < PARSE_WORKERS * 2:
+                name, (pdf_file, _, _) = pending_files.pop(0)
+                print(f"[INFO] Loading: {name}")
+                future = pool.submit(load_and_split, str(pdf_file), CHUNK_SIZE, CHUNK_OVERLAP)
+                running[future] = name
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield running.pop(future), future.result()
+
+
+def main():
+    rebuild = "--rebuild" in sys.argv
+    manifest = None if rebuild else load_manifest()
+    print(f"[INFO] Reading PDFs from: {DATA_DIR}")
+
+    changed, removed, unchanged = scan_corpus(manifest)
+    native_ready = (NATIVE_DIR / "meta.json").exists()
+    if manifest and not changed and not removed and native_ready:
+        if unchanged != manifest["files"]:
+            manifest["files"] = unchanged
+            save_manifest(manifest)
+        print("[INFO] Vectorstore is up to date, nothing to embed.")
+        return
+
+    # Only pay for the LangChain/OpenAI imports when there is work to do
+    from dataPreprocess import IndexWriter
+
+    EMBEDDING_DIR.mkdir(parents=True, exist_ok=True)
+    known = manifest["files"] if manifest else {}
+    files = dict(unchanged)
+    embedded = deleted = 0
+    writer = None
+
+    try:
+        writer = IndexWriter(
+            str(EMBEDDING_DIR),
+            incremental=manifest is not None,
+            batch_size=EMBED_BATCH_SIZE,
+            max_workers=EMBED_WORKERS,
+        )
+
+        for name in removed:
+            print(f"[INFO] Removed: {name}")
+            writer.delete(known[name]["chunks"])
+            deleted += len(known[name]["chunks"])
+
+        for name, chunks in parse_changed(changed):
+            pdf_file, st, digest = changed[name]
+            ids = chunk_ids(name, chunks)
+
+            old_ids = set(known.get(name, {}).get("chunks", []))
+            stale = list(old_ids - set(ids))
+            writer.delete(stale)
+            deleted += len(stale)
+
+            fresh = [(chunk, chunk_id) for chunk, chunk_id in zip(chunks, ids) if chunk_id not in old_ids]
+            writer.add([chunk for chunk, _ in fresh], [chunk_id for _, chunk_id in fresh])
+            embedded += len(fresh)
+            print(f"[INFO] {name}: {len(chunks)} chunks, {len(fresh)} new, {len(stale)} removed")
+
+            files[name] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": digest, "chunks": ids}
+
+        print(f"[INFO] Saving FAISS vectorstore to: {EMBEDDING_DIR}")
+        vectorstore = writer.close()
+
+        if vectorstore:
+            from vector_index import export_faiss
+            print(f"[INFO] Writing native index ({INDEX_DTYPE}) to: {NATIVE_DIR}")
+            export_faiss(
+                vectorstore, str(NATIVE_DIR), dtype=INDEX_DTYPE,
+                nlist=None if IVF_LISTS == "auto" else int(IVF_LISTS),
+            )
+    except Exception as e:
+        print(f"Error updating FAISS vectorstore: {e}")
+        if writer is not None:
+            writer.pool.shutdown(wait=False, cancel_futures=True)
+        vectorstore = None
+
+    print(f"[INFO] Chunks embedded: {embedded}, chunks deleted: {deleted}")
+
+    if vectorstore:
+        save_manifest({
+            "embedding_model": EMBEDDING_MODEL,
+            "chunking": [CHUNK_SIZE, CHUNK_OVERLAP],
+            "files": files,
+        })
+        print("[SUCCESS] Vectorstore saved successfully.")
+    else:
+        print("[FAILURE] Vectorstore creation failed.")
+
+if __name__ == "__main__":
+    main()
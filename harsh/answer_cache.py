@@ -0,0 +1,167 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+# Persistent cache of DocBot answers. Exact repeats (after normalising the
+# question text) are answered without touching the backend at all; close
+# paraphrases are matched on the question embedding that the FAISS search
+# needs anyway. Entries are tied to the version of the embedding index they
+# were generated from, so rebuilding the index invalidates them.
+#
+# Saving rewrites the whole file, embeddings included, so it is not done
+# while an answer is being shown: new answers and hits (which move an
+# entry's "used" time, deciding what is evicted after a restart) are kept
+# in memory and written back by flush(), at exit.
+
+CACHE_PATH = os.path.expanduser(os.environ.get("BASHAI_CACHE_PATH", "~/.bashai_answer_cache.json"))
+SIMILARITY_THRESHOLD = float(os.environ.get("BASHAI_CACHE_THRESHOLD", "0.95"))
+TTL_SECONDS = float(os.environ.get("BASHAI_CACHE_TTL", str(7 * 24 * 3600)))
+MAX_ENTRIES = int(os.environ.get("BASHAI_CACHE_SIZE", "500"))
+
+
+def normalize_question(question):
+    question = question.strip().strip("\"'").lower()
+    question = re.sub(r"\s+", " ", question)
+    return question.rstrip(" ?!.")
+
+
+def index_version(index_dir="embeddings", model=""):
+    # Cheap fingerprint of the saved index: file names, sizes and mtimes.
+    digest = hashlib.sha1(model.encode())
+    try:
+        names = sorted(os.listdir(index_dir))
+    except OSError:
+        names = []
+    for name in names:
+        try:
+            st = os.stat(os.path.join(index_dir, name))
+        except OSError:
+            continue
+        digest.update(f"{name}:{st.st_size}:{st.st_mtime_ns};".encode())
+    return digest.hexdigest()[:16]
+
+
+class AnswerCache:
+    def __init__(self, path=CACHE_PATH, version="", threshold=SIMILARITY_THRESHOLD,
+                 ttl=TTL_SECONDS, max_entries=MAX_ENTRIES):
+        self.path = path
+        self.version = version
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self._matrix = None
+        self._matrix_keys = []
+        # Answers or hits since the last save
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def _key(self, question):
+        return f"{self.version}:{normalize_question(question)}"
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        entries = [
+            (key, entry) for key, entry in data.get("entries", [])
+            if key.startswith(self.version + ":") and now - entry.get("created", 0) <= self.ttl
+        ]
+        # Least recently used first, so the OrderedDict keeps LRU order
+        entries.sort(key=lambda item: item[1].get("used", 0))
+        self.entries.update(entries[-self.max_entries:])
+
+    def save(self):
+        with self._lock:
+            self._dirty = False
+            data = {"entries": list(self.entries.items())}
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"Answer cache error: {e}")
+
+    def flush(self):
+        """Save if anything changed since the last save."""
+        if self._dirty:
+            self.save()
+
+    def _expired(self, entry):
+        return time.time() - entry["created"] > self.ttl
+
+    def get(self, question):
+        key = self._key(question)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if self._expired(entry):
+                del self.entries[key]
+                self._matrix = None
+                return None
+            self.entries.move_to_end(key)
+            entry["used"] = time.time()
+            self._dirty = True
+            return entry["result"]
+
+    def _build_matrix(self):
+        # Stack the normalised cached embeddings; numpy is only needed once
+        # there is something to compare against.
+        self._matrix_keys = [k for k, e in self.entries.items() if e.get("embedding")]
+        if not self._matrix_keys:
+            return False
+        import numpy as np
+
+        matrix = np.array([self.entries[k]["embedding"] for k in self._matrix_keys], dtype=np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+        self._matrix = matrix
+        return True
+
+    def get_similar(self, vector):
+        with self._lock:
+            if self._matrix is None and not self._build_matrix():
+                return None
+            import numpy as np
+
+            query = np.array(vector, dtype=np.float32)
+            query /= np.linalg.norm(query) + 1e-12
+            scores = self._matrix @ query
+            best = int(np.argmax(scores))
+            if scores[best] < self.threshold:
+                return None
+
+            key = self._matrix_keys[best]
+            entry = self.entries.get(key)
+            if entry is None or self._expired(entry):
+                return None
+            self.entries.move_to_end(key)
+            entry["used"] = time.time()
+            self._dirty = True
+            return entry["result"]
+
+    def put(self, question, vector, result):
+        key = self._key(question)
+        now = time.time()
+        with self._lock:
+            self.entries[key] = {
+                "question": question,
+                "result": result,
+                "embedding": [round(float(x), 6) for x in vector] if vector is not None else None,
+                "created": now,
+                "used": now,
+            }
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            self._matrix = None
+            self._dirty = True
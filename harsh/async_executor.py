@@ -0,0 +1,244 @@
+import sys
+import asyncio
+import threading
+import subprocess
+
+from pipeline import CHUNK_SIZE, QUEUE_DEPTH
+
+# Optional asyncio core (BASHAI_EXECUTOR=async). One event loop runs on one
+# background thread for the life of the shell:
+#
+#   - timer builtins (sleep, countdown, repeat) and echo are coroutines, so
+#     waiting costs a timer entry instead of a blocked thread
+#   - external programs run through asyncio.create_subprocess_exec
+#   - a pipeline is a graph of tasks, one per stage, joined by bounded
+#     asyncio.Queues (the same shape as pipeline.run_stages with threads)
+#   - a background job is just a task on the loop
+#
+# Builtins that have no coroutine version run in the loop's default thread
+# pool with their whole input collected, as run_command does.
+
+_loop = None
+_loop_lock = threading.Lock()
+_DONE = object()
+
+
+def get_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="bashai-async", daemon=True).start()
+        return _loop
+
+
+async def a_echo(tokens, chunks=None):
+    yield (" ".join(tokens[1:]) + "\n").encode()
+
+
+async def a_sleep(tokens, chunks=None):
+    try:
+        seconds = int(tokens[1]) if len(tokens) > 1 else 1
+    except ValueError as e:
+        yield f"sleep error: {e}\n".encode()
+        return
+    await asyncio.sleep(seconds)
+    yield f"Slept for {seconds} seconds.\n".encode()
+
+
+async def a_countdown(tokens, chunks=None):
+    try:
+        start = int(tokens[1]) if len(tokens) > 1 else 5
+    except ValueError as e:
+        yield f"countdown error: {e}\n".encode()
+        return
+    for i in range(start, 0, -1):
+        yield f"{i}...\n".encode()
+        await asyncio.sleep(1)
+    yield b"Go!\n"
+
+
+async def a_repeat(tokens, chunks=None):
+    word = tokens[1] if len(tokens) > 1 else "hello"
+    try:
+        count = int(tokens[2]) if len(tokens) > 2 else 5
+    except ValueError as e:
+        yield f"repeat error: {e}\n".encode()
+        return
+    for _ in range(count):
+        yield (word + "\n").encode()
+        await asyncio.sleep(1)
+
+
+ASYNC_BUILTINS = {
+    "echo": a_echo,
+    "sleep": a_sleep,
+    "countdown": a_countdown,
+    "repeat": a_repeat,
+}
+
+
+async def external_stage(tokens, chunks=None, status=None):
+    # The exit status is appended to status, if given, as in
+    # pipeline.external_stage
+    import pathcache
+    if status is None:
+        status = []
+    executable = pathcache.lookup(tokens[0])
+    if executable is None:
+        status.append(127)
+        yield f"{tokens[0]}: command not found\n".encode()
+        return
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *tokens,
+            executable=executable,
+            stdin=subprocess.PIPE if chunks is not None else None,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+    except FileNotFoundError:
+        status.append(127)
+        yield f"{tokens[0]}: command not found\n".encode()
+        return
+    except Exception as e:
+        status.append(126)
+        yield f"Error running {tokens[0]}: {e}\n".encode()
+        return
+
+    feeder = None
+    if chunks is not None:
+        async def feed():
+            try:
+                async for chunk in chunks:
+                    proc.stdin.write(chunk)
+                    await proc.stdin.drain()
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+            finally:
+                proc.stdin.close()
+        feeder = asyncio.create_task(feed())
+
+    try:
+        while True:
+            data = await proc.stdout.read(CHUNK_SIZE)
+            if not data:
+                break
+            yield data
+        await proc.wait()
+    finally:
+        if proc.returncode is None:
+            proc.terminate()
+            await proc.wait()
+        status.append(proc.returncode)
+        if feeder is not None:
+            feeder.cancel()
+
+
+async def threaded_stage(tokens, chunks=None):
+    import executer
+    data = None
+    if chunks is not None:
+        data = b"".join([chunk async for chunk in chunks])
+
+    def run():
+        return b"".join(executer.stream_command(tokens, [data] if data is not None else None))
+
+    output = await asyncio.to_thread(run)
+    if output:
+        yield output
+
+
+def stage_for(tokens):
+    import registry
+    cmd = tokens[0]
+    if cmd in ASYNC_BUILTINS:
+        return ASYNC_BUILTINS[cmd]
+    if registry.get(cmd) is not None:
+        return threaded_stage
+    return external_stage
+
+
+async def _drain(queue):
+    while True:
+        item = await queue.get()
+        if item is _DONE:
+            return
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+
+
+async def _pump(stage, tokens, upstream, queue):
+    try:
+        async for chunk in stage(tokens, upstream):
+            if chunk:
+                await queue.put(chunk)
+    except asyncio.CancelledError:
+        raise
+    except BaseException as e:
+        await queue.put(e)
+    await queue.put(_DONE)
+
+
+async def _file_source(handle):
+    while True:
+        chunk = await asyncio.to_thread(handle.read, CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+async def run_pipeline(commands, input_handle=None, output_file=None, append=False):
+    """Run a pipeline on the loop and write its output; returns the exit
+    status of the last stage."""
+    upstream = _file_source(input_handle) if input_handle else None
+    tasks = []
+    try:
+        for tokens in commands[:-1]:
+            queue = asyncio.Queue(QUEUE_DEPTH)
+            tasks.append(asyncio.create_task(_pump(stage_for(tokens), tokens, upstream, queue)))
+            upstream = _drain(queue)
+
+        last = commands[-1]
+        status = []
+        stage = stage_for(last)
+        if stage is external_stage:
+            output = external_stage(last, upstream, status)
+        else:
+            output = stage(last, upstream)
+        if output_file:
+            with open(output_file, "ab" if append else "wb") as f:
+                async for chunk in output:
+                    f.write(chunk)
+        else:
+            async for chunk in output:
+                sys.stdout.buffer.write(chunk)
+                sys.stdout.buffer.flush()
+        return status[0] if status else 0
+    finally:
+        for task in tasks:
+            task.cancel()
+        if input_handle:
+            input_handle.close()
+
+
+def submit(commands, input_handle=None, output_file=None, append=False):
+    """Schedule a pipeline; returns a concurrent.futures.Future."""
+    coro = run_pipeline(commands, input_handle, output_file, append)
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def run_foreground(commands, input_handle=None, output_file=None, append=False):
+    """Run a pipeline and wait for it; returns its exit status."""
+    sys.stdout.flush()
+    future = submit(commands, input_handle, output_file, append)
+    try:
+        return future.result()
+    except KeyboardInterrupt:
+        future.cancel()
+        print()
+        return 130
+    except Exception as e:
+        print(f"Pipeline error: {e}")
+        return 1
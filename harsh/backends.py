@@ -0,0 +1,135 @@
+import os
+
+# Selects where DocBot's embeddings and chat model come from.
+#
+#   BASHAI_BACKEND=openai    OpenAI API (default, needs OPENAI_API_KEY)
+#   BASHAI_BACKEND=ollama    local Ollama server; the model stays loaded in
+#                            the server between questions (BASHAI_KEEP_ALIVE)
+#   BASHAI_BACKEND=llamacpp  llama.cpp in-process on the CPU; the model is
+#                            loaded once and kept for the life of the shell
+#   BASHAI_BACKEND=local-http  any OpenAI-compatible server on localhost
+#                            (llama.cpp server, vLLM, LM Studio, ...)
+#
+# Model names and locations are overridden with BASHAI_LLM_MODEL,
+# BASHAI_EMBED_MODEL and BASHAI_BASE_URL. Only the selected backend's
+# packages are imported.
+
+BACKENDS = ("openai", "ollama", "llamacpp", "local-http")
+
+DEFAULTS = {
+    "openai": {"llm": "gpt-4o", "embed": "text-embedding-3-small", "url": None},
+    "ollama": {"llm": "llama2", "embed": "nomic-embed-text", "url": "http://localhost:11434"},
+    "llamacpp": {"llm": "models/llama-2-7b-chat.Q4_K_M.gguf", "embed": "models/nomic-embed-text.Q8_0.gguf", "url": None},
+    "local-http": {"llm": "local-model", "embed": "local-embedding", "url": "http://localhost:8080/v1"},
+}
+
+_config_loaded = False
+
+
+def load_config():
+    global _config_loaded
+    if _config_loaded:
+        return
+    from dotenv import load_dotenv
+    load_dotenv(dotenv_path=r"C:\Users\Harsh Sharma\Desktop\sujal-maheshwari2004 bashAI main sujal\DataPreperation\env")
+    _config_loaded = True
+
+
+def backend_name():
+    name = os.environ.get("BASHAI_BACKEND", "openai")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown BASHAI_BACKEND '{name}', expected one of: {', '.join(BACKENDS)}")
+    return name
+
+
+def llm_model():
+    return os.environ.get("BASHAI_LLM_MODEL", DEFAULTS[backend_name()]["llm"])
+
+
+def embedding_model():
+    return os.environ.get("BASHAI_EMBED_MODEL", DEFAULTS[backend_name()]["embed"])
+
+
+def embedding_model_id():
+    # Identifies the vector space an index was built in
+    return f"{backend_name()}:{embedding_model()}"
+
+
+def index_dir_name():
+    # Indexes from different embedding models cannot be mixed
+    name = backend_name()
+    return "embeddings" if name == "openai" else f"embeddings-{name}"
+
+
+def base_url():
+    return os.environ.get("BASHAI_BASE_URL", DEFAULTS[backend_name()]["url"])
+
+
+def openai_api_key():
+    key = os.getenv("OPENAI_API_KEY")
+    if not key:
+        raise ValueError("OPENAI_API_KEY environment variable is not set.")
+    return key
+
+
+def get_embeddings():
+    load_config()
+    name = backend_name()
+
+    if name == "openai":
+        from langchain_openai import OpenAIEmbeddings
+        return OpenAIEmbeddings(model=embedding_model(), openai_api_key=openai_api_key())
+
+    if name == "ollama":
+        from langchain_ollama import OllamaEmbeddings
+        return OllamaEmbeddings(model=embedding_model(), base_url=base_url())
+
+    if name == "llamacpp":
+        from langchain_community.embeddings import LlamaCppEmbeddings
+        return LlamaCppEmbeddings(model_path=embedding_model(), n_threads=os.cpu_count(), verbose=False)
+
+    from langchain_openai import OpenAIEmbeddings
+    return OpenAIEmbeddings(
+        model=embedding_model(),
+        base_url=base_url(),
+        openai_api_key=os.getenv("OPENAI_API_KEY", "not-needed"),
+        check_embedding_ctx_length=False,
+    )
+
+
+def get_llm():
+    # Returns (llm, structured_llm); the second one is asked for JSON output
+    # where the backend supports it.
+    load_config()
+    name = backend_name()
+
+    if name == "openai":
+        from langchain_openai import ChatOpenAI
+        llm = ChatOpenAI(model=llm_model(), openai_api_key=openai_api_key())
+        return llm, llm.bind(response_format={"type": "json_object"})
+
+    if name == "ollama":
+        from langchain_ollama import ChatOllama
+        keep_alive = os.environ.get("BASHAI_KEEP_ALIVE", "30m")
+        llm = ChatOllama(model=llm_model(), base_url=base_url(), keep_alive=keep_alive)
+        structured = ChatOllama(model=llm_model(), base_url=base_url(), keep_alive=keep_alive, format="json")
+        return llm, structured
+
+    if name == "llamacpp":
+        from langchain_community.chat_models import ChatLlamaCpp
+        llm = ChatLlamaCpp(
+            model_path=llm_model(),
+            n_ctx=int(os.environ.get("BASHAI_N_CTX", "4096")),
+            n_threads=os.cpu_count(),
+            temperature=0,
+            verbose=False,
+        )
+        return llm, llm
+
+    from langchain_openai import ChatOpenAI
+    llm = ChatOpenAI(
+        model=llm_model(),
+        base_url=base_url(),
+        openai_api_key=os.getenv("OPENAI_API_KEY", "not-needed"),
+    )
+    return llm, llm
@@ -0,0 +1,101 @@
+import os
+import sys
+import json
+import time
+import tempfile
+from types import SimpleNamespace
+
+import chat
+
+# Benchmarks DocBot generation modes against a local stub LLM, so the
+# numbers measure how the calls are scheduled rather than network jitter.
+# Usage: python bench_docbot.py [latency_seconds] [queries]
+#
+# With --live the configured backend (see backends.py) is used instead, e.g.
+# BASHAI_BACKEND=ollama python bench_docbot.py --live 5 to benchmark the
+# whole DocBot path on a machine without network access.
+
+
+class StubLLM:
+    def __init__(self, latency):
+        self.latency = latency
+        self.calls = 0
+
+    def invoke(self, prompt):
+        self.calls += 1
+        time.sleep(self.latency)
+        if "JSON object" in prompt:
+            content = json.dumps({"explanation": "Use ls to list files.", "command": "ls -la"})
+        elif prompt.rstrip().endswith("Command:"):
+            content = "ls -la"
+        else:
+            content = "Use ls to list files."
+        return SimpleNamespace(content=content)
+
+
+class StubEmbedding:
+    def embed_query(self, text):
+        return [float(len(text)), 1.0]
+
+
+class StubStore:
+    def similarity_search_by_vector(self, vector, k=5):
+        return [SimpleNamespace(page_content="ls lists directory contents.")] * k
+
+
+def run_modes(queries, save_path, stub=None):
+    print(f"{'mode':<12} {'ms/query':>10} {'LLM calls':>10} {'speedup':>8}")
+    baseline = None
+    for mode in ("sequential", "parallel", "structured"):
+        if stub:
+            stub.calls = 0
+        start = time.perf_counter()
+        for i in range(queries):
+            chat.query_bash_ai(f"how do I list files {i}", save_path=save_path, mode=mode, use_cache=False)
+        per_query = (time.perf_counter() - start) / queries
+        baseline = baseline or per_query
+        calls = f"{stub.calls:10d}" if stub else f"{'-':>10}"
+        print(f"{mode:<12} {per_query * 1000:10.1f} {calls} {baseline / per_query:7.2f}x")
+
+
+def run_live(queries, save_path):
+    start = time.perf_counter()
+    chat.load_backend()
+    print(f"Backend: {chat.backends.backend_name()} ({chat.backends.llm_model()}), "
+          f"loaded in {(time.perf_counter() - start) * 1000:.0f} ms")
+    run_modes(queries, save_path)
+
+    for i in range(queries):
+        for _ in chat.stream_bash_ai(f"how do I show disk usage {i}", save_path=save_path, use_cache=False):
+            pass
+    print(chat.format_metrics(), end="")
+
+
+def main():
+    args = [a for a in sys.argv[1:] if a != "--live"]
+    save_path = os.path.join(tempfile.gettempdir(), "bench_docbot_response.json")
+
+    if "--live" in sys.argv:
+        run_live(int(args[0]) if args else 3, save_path)
+    else:
+        latency = float(args[0]) if args else 0.2
+        queries = int(args[1]) if len(args) > 1 else 5
+
+        stub = StubLLM(latency)
+        chat.embedding = StubEmbedding()
+        chat.vectorstore = StubStore()
+        chat.llm = stub
+        chat.structured_llm = stub
+        chat.explanation_prompt = chat.EXPLANATION_TEMPLATE
+        chat.code_only_prompt = chat.CODE_ONLY_TEMPLATE
+        chat.structured_prompt = chat.STRUCTURED_TEMPLATE
+
+        print(f"Stub LLM latency: {latency * 1000:.0f} ms per call, {queries} queries per mode")
+        run_modes(queries, save_path, stub)
+
+    if os.path.exists(save_path):
+        os.remove(save_path)
+
+
+if __name__ == "__main__":
+    main()
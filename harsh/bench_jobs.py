@@ -0,0 +1,69 @@
+import os
+import sys
+import time
+import threading
+
+import executer
+import async_executor
+
+# Compares the thread-per-job design with the asyncio core for many
+# concurrent background jobs: how long it takes to launch them, how late
+# they finish compared with the ideal, and how much memory each one costs
+# while they are all alive.
+# Usage: python bench_jobs.py [jobs] [sleep_seconds]
+
+
+def rss_bytes():
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def bench_threads(count, seconds):
+    cmd = ["sleep", str(seconds)]
+    before = rss_bytes()
+    start = time.perf_counter()
+    threads = [threading.Thread(target=executer.run_command, args=(cmd,)) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    launched = time.perf_counter() - start
+    peak = rss_bytes() - before
+    alive = threading.active_count()
+    for thread in threads:
+        thread.join()
+    return launched, time.perf_counter() - start, peak, alive
+
+
+def bench_async(count, seconds):
+    commands = [["sleep", str(seconds)]]
+    async_executor.get_loop()
+    before = rss_bytes()
+    start = time.perf_counter()
+    futures = [async_executor.submit(commands, output_file=os.devnull) for _ in range(count)]
+    launched = time.perf_counter() - start
+    # Let every task reach its first await before measuring
+    time.sleep(min(0.2, seconds / 2))
+    peak = rss_bytes() - before
+    alive = threading.active_count()
+    for future in futures:
+        future.result()
+    return launched, time.perf_counter() - start, peak, alive
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    seconds = int(sys.argv[2]) if len(sys.argv) > 2 else 1
+
+    print(f"{count} concurrent `sleep {seconds}` jobs")
+    print(f"{'design':<10} {'launch us/job':>14} {'finish lag ms':>14} {'KiB/job':>9} {'threads':>8}")
+    for name, bench in (("thread", bench_threads), ("asyncio", bench_async)):
+        launched, total, peak, alive = bench(count, seconds)
+        print(f"{name:<10} {launched / count * 1e6:14.1f} {(total - seconds) * 1000:14.1f} "
+              f"{peak / count / 1024:9.1f} {alive:8d}")
+
+
+if __name__ == "__main__":
+    main()
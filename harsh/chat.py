@@ -1,95 +1,407 @@
-import os
-import json
-from langchain_community.vectorstores import FAISS
-from langchain_openai import ChatOpenAI, OpenAIEmbeddings
-from langchain_core.prompts import PromptTemplate
-import dotenv
-from dotenv import load_dotenv
-load_dotenv(dotenv_path=r"C:\Users\Harsh Sharma\Desktop\sujal-maheshwari2004 bashAI main sujal\DataPreperation\env")
-
-# Load API key securely from environment variable
-openai_api_key = os.getenv("OPENAI_API_KEY")
-if not openai_api_key:
-    raise ValueError("OPENAI_API_KEY environment variable is not set.")
-
-# Load vector store using OpenAI embeddings
-embedding = OpenAIEmbeddings(
-    model="text-embedding-3-small",
-    openai_api_key=openai_api_key
-)
-vectorstore = FAISS.load_local("embeddings", embedding, allow_dangerous_deserialization=True)
-
-# Initialize GPT-4o model
-llm = ChatOpenAI(
-    model="gpt-4o",
-    openai_api_key=openai_api_key
-)
-
-# Prompt for explanation
-explanation_prompt = PromptTemplate.from_template("""
-You are a helpful assistant that explains Linux Bash scripting concepts in detail.
-Using the provided context, answer the user's question in a clear and thorough way.
-Give response shortly and concisely, use only text and no markdown.
-
-Context:
-{context}
-
-Question:
-{question}
-
-Answer:
-""")
-
-# Prompt for code-only response
-code_only_prompt = PromptTemplate.from_template("""
-You are a Linux Bash expert. Based on the context, return only the single-line shell command or script that solves the user's query.
-
-DO NOT return explanations, comments, or output examples.
-DO NOT use markdown formatting or any special characters like backticks.
-DO NOT include anything other than the pure command.
-DO NOT include ''' or ' or " at the beginning or end of the command.
-DO NOT include any other text or explanation.
-
-The output must be copy-paste ready to run in a bash shell.
-
-Context:
-{context}
-
-Question:
-{question}
-
-Command:
-""")
-
-# Main function to process a query
-def query_bash_ai(question, save_path="response.json", k=5):
-    # Search for relevant documents
-    docs = vectorstore.similarity_search(question, k=k)
-    context = "\n\n".join(doc.page_content for doc in docs)
-
-    if not context:
-        return {
-            "question": question,
-            "explanation": "No relevant context found to generate an answer.",
-            "code": ""
-        }
-
-    # Generate explanation
-    expl_prompt = explanation_prompt.format(context=context, question=question)
-    explanation = llm.invoke(expl_prompt).content.strip()
-
-    # Generate bash command
-    code_prompt = code_only_prompt.format(context=explanation, question=question)
-    code = llm.invoke(code_prompt).content.strip()
-
-    # Save result
-    result = {
-        "question": question,
-        "explanation": explanation,
-        "code": code
-    }
-
-    with open(save_path, "w", encoding="utf-8") as f:
-        json.dump(result, f, indent=4)
-
-    return result
+import os
+import re
+import json
+import atexit
+import time
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import backends
+from answer_cache import AnswerCache, index_version
+
+# The LangChain/FAISS/model stack takes seconds to import and set up, so it
+# is only loaded the first time DocBot is used (or warmed up in the
+# background once the prompt is showing).
+embedding = None
+vectorstore = None
+llm = None
+structured_llm = None
+explanation_prompt = None
+code_only_prompt = None
+structured_prompt = None
+streaming_prompt = None
+
+_load_lock = threading.Lock()
+_warm_thread = None
+
+answer_cache = None
+
+# How the explanation and the command are generated:
+#   structured - one call returning both as a JSON object
+#   parallel   - the two prompts run concurrently from the retrieved context
+#   sequential - the command prompt waits for, and is fed, the explanation
+GENERATION_MODES = ("structured", "parallel", "sequential")
+GENERATION_MODE = os.environ.get("BASHAI_DOCBOT_MODE", "structured")
+
+# Latency of the streamed answers, as the user feels it
+metrics = {
+    "queries": 0,
+    "cache_hits": 0,
+    "cancelled": 0,
+    "ttft": deque(maxlen=100),
+    "total": deque(maxlen=100),
+}
+
+# Prompt for explanation
+EXPLANATION_TEMPLATE = """
+You are a helpful assistant that explains Linux Bash scripting concepts in detail.
+Using the provided context, answer the user's question in a clear and thorough way.
+Give response shortly and concisely, use only text and no markdown.
+
+Context:
+{context}
+
+Question:
+{question}
+
+Answer:
+"""
+
+# Prompt for code-only response
+CODE_ONLY_TEMPLATE = """
+You are a Linux Bash expert. Based on the context, return only the single-line shell command or script that solves the user's query.
+
+DO NOT return explanations, comments, or output examples.
+DO NOT use markdown formatting or any special characters like backticks.
+DO NOT include anything other than the pure command.
+DO NOT include ''' or ' or " at the beginning or end of the command.
+DO NOT include any other text or explanation.
+
+The output must be copy-paste ready to run in a bash shell.
+
+Context:
+{context}
+
+Question:
+{question}
+
+Command:
+"""
+
+# Prompt for explanation and command in a single JSON response
+STRUCTURED_TEMPLATE = """
+You are a Linux Bash expert. Using the provided context, answer the user's question.
+
+Respond with a JSON object with exactly these two keys:
+"explanation": a short, concise explanation in plain text with no markdown.
+"command": the single-line shell command or script that solves the query. It must be
+copy-paste ready to run in a bash shell, with no backticks, comments or surrounding quotes.
+
+Context:
+{context}
+
+Question:
+{question}
+"""
+
+# Prompt for a streamed answer: explanation first, then the command on its
+# own line, so the explanation can be shown while the command is generated
+STREAMING_TEMPLATE = """
+You are a Linux Bash expert. Using the provided context, answer the user's question.
+
+Reply in exactly this format and nothing else:
+Explanation: <a short, concise explanation in plain text with no markdown>
+Command: <the single-line shell command that solves the query, copy-paste ready, no backticks or surrounding quotes>
+
+Context:
+{context}
+
+Question:
+{question}
+"""
+
+
+def load_backend():
+    global embedding, vectorstore, llm, structured_llm
+    global explanation_prompt, code_only_prompt, structured_prompt, streaming_prompt
+    with _load_lock:
+        if llm is not None:
+            return
+
+        from langchain_core.prompts import PromptTemplate
+
+        # Embeddings and chat model come from the configured backend
+        embedding = backends.get_embeddings()
+
+        # Prefer the memory-mapped native index; the pickled FAISS store is
+        # only a fallback for indexes built before it existed
+        native_dir = os.path.join(backends.index_dir_name(), "native")
+        if os.path.exists(os.path.join(native_dir, "meta.json")):
+            import vector_index
+            vectorstore = vector_index.open_index(native_dir)
+        else:
+            from langchain_community.vectorstores import FAISS
+            vectorstore = FAISS.load_local(backends.index_dir_name(), embedding, allow_dangerous_deserialization=True)
+
+        explanation_prompt = PromptTemplate.from_template(EXPLANATION_TEMPLATE)
+        code_only_prompt = PromptTemplate.from_template(CODE_ONLY_TEMPLATE)
+        structured_prompt = PromptTemplate.from_template(STRUCTURED_TEMPLATE)
+        streaming_prompt = PromptTemplate.from_template(STREAMING_TEMPLATE)
+
+        # Initialize the chat model last: it doubles as the "loaded" flag.
+        # Local backends keep it loaded for the rest of the session.
+        chat_model, structured_llm = backends.get_llm()
+        llm = chat_model
+
+
+def warm_up():
+    # Load the backend in a daemon thread; errors are left for the first
+    # real query to report.
+    global _warm_thread
+    if _warm_thread is not None or llm is not None:
+        return
+
+    def load_quietly():
+        try:
+            load_backend()
+        except Exception:
+            pass
+
+    _warm_thread = threading.Thread(target=load_quietly, daemon=True)
+    _warm_thread.start()
+
+
+def get_answer_cache():
+    global answer_cache
+    if answer_cache is None:
+        answer_cache = AnswerCache(version=index_version(backends.index_dir_name(), backends.embedding_model_id()))
+        # New answers and hits are only in memory until then
+        atexit.register(answer_cache.flush)
+    return answer_cache
+
+
+def save_result(result, save_path):
+    with open(save_path, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=4)
+
+
+def parse_structured(text):
+    # Pull explanation and command out of a JSON answer, tolerating stray
+    # text or code fences around the object.
+    match = re.search(r"\{.*\}", text, re.DOTALL)
+    try:
+        data = json.loads(match.group(0) if match else text)
+    except ValueError:
+        return text.strip(), ""
+    return str(data.get("explanation", "")).strip(), str(data.get("command", "")).strip()
+
+
+def generate_answer(context, question, mode=None):
+    mode = mode or GENERATION_MODE
+
+    if mode == "structured":
+        prompt = structured_prompt.format(context=context, question=question)
+        return parse_structured(structured_llm.invoke(prompt).content)
+
+    if mode == "parallel":
+        expl_prompt = explanation_prompt.format(context=context, question=question)
+        code_prompt = code_only_prompt.format(context=context, question=question)
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            explanation = pool.submit(llm.invoke, expl_prompt)
+            code = pool.submit(llm.invoke, code_prompt)
+            return explanation.result().content.strip(), code.result().content.strip()
+
+    # Generate explanation
+    expl_prompt = explanation_prompt.format(context=context, question=question)
+    explanation = llm.invoke(expl_prompt).content.strip()
+
+    # Generate bash command
+    code_prompt = code_only_prompt.format(context=explanation, question=question)
+    code = llm.invoke(code_prompt).content.strip()
+    return explanation, code
+
+
+class AnswerStreamParser:
+    """Split a streamed "Explanation: ... Command: ..." reply as it arrives.
+
+    feed() returns ("explanation", text) events for explanation text as soon
+    as it is safe to show, and a single ("command", text) event once the
+    command line is complete. Only a "Command:" label at the start of a line
+    ends the explanation, so the word inside a sentence stays part of it.
+    """
+
+    EXPLANATION = "Explanation:"
+    COMMAND = "Command:"
+    COMMAND_LINE = re.compile(r"^[ \t]*Command:", re.MULTILINE)
+
+    def __init__(self):
+        self.buffer = ""
+        self.section = None
+        self.explanation = []
+        self.command = None
+        # Whether buffer starts at the beginning of a line
+        self.line_start = True
+
+    def _emit_explanation(self, text, events):
+        if not self.explanation:
+            text = text.lstrip()
+        if text:
+            self.explanation.append(text)
+            events.append(("explanation", text))
+
+    def feed(self, text):
+        events = []
+        self.buffer += text
+
+        if self.section is None:
+            stripped = self.buffer.lstrip()
+            if stripped.startswith(self.EXPLANATION):
+                self.buffer = stripped[len(self.EXPLANATION):]
+                self.line_start = False
+            elif self.EXPLANATION.startswith(stripped):
+                return events
+            self.section = "explanation"
+
+        if self.section == "explanation":
+            # At pos 1, ^ only matches after a newline
+            match = self.COMMAND_LINE.search(self.buffer, 0 if self.line_start else 1)
+            if match:
+                self._emit_explanation(self.buffer[:match.start()].rstrip(), events)
+                self.buffer = self.buffer[match.end():]
+                self.section = "command"
+            else:
+                # Hold back a last line that may still become the label,
+                # with its newline so none is shown before the command
+                cut = self.buffer.rfind("\n")
+                tail = self.buffer[cut + 1:].lstrip(" \t")
+                if cut == -1 and not self.line_start or not self.COMMAND.startswith(tail):
+                    cut = len(self.buffer)
+                if cut > 0:
+                    self._emit_explanation(self.buffer[:cut], events)
+                    self.buffer = self.buffer[cut:]
+                    self.line_start = False
+
+        if self.section == "command":
+            line, newline, _ = self.buffer.lstrip().partition("\n")
+            if newline and line.strip():
+                self.command = line.strip()
+                self.section = "done"
+                events.append(("command", self.command))
+
+        return events
+
+    def close(self):
+        events = []
+        if self.section in (None, "explanation"):
+            self._emit_explanation(self.buffer, events)
+        elif self.section == "command":
+            self.command = self.buffer.strip()
+            events.append(("command", self.command))
+        self.buffer = ""
+        return events
+
+
+def retrieve_context(question, cache, k=5):
+    # Returns (cached_result, query_vector, context); exact repeats are
+    # answered before the backend is even loaded.
+    cached = cache.get(question) if cache is not None else None
+    if cached is not None:
+        return dict(cached, question=question), None, ""
+
+    load_backend()
+
+    # The question embedding serves both the semantic cache and the search
+    query_vector = embedding.embed_query(question)
+    cached = cache.get_similar(query_vector) if cache is not None else None
+    if cached is not None:
+        return dict(cached, question=question), query_vector, ""
+
+    # Search for relevant documents
+    docs = vectorstore.similarity_search_by_vector(query_vector, k=k)
+    context = "\n\n".join(doc.page_content for doc in docs)
+    return None, query_vector, context
+
+
+def no_context_result(question):
+    return {
+        "question": question,
+        "explanation": "No relevant context found to generate an answer.",
+        "code": ""
+    }
+
+
+def stream_bash_ai(question, save_path="response.json", k=5, use_cache=True):
+    # Yields ("explanation", text) pieces while the answer is generated, a
+    # ("command", text) event once the command is complete and finally
+    # ("result", dict) with the same shape query_bash_ai returns.
+    start = time.perf_counter()
+    metrics["queries"] += 1
+    cache = get_answer_cache() if use_cache else None
+    cached, query_vector, context = retrieve_context(question, cache, k)
+
+    if cached is not None or not context:
+        result = cached if cached is not None else no_context_result(question)
+        if cached is not None:
+            metrics["cache_hits"] += 1
+            save_result(result, save_path)
+        metrics["ttft"].append(time.perf_counter() - start)
+        yield "explanation", result["explanation"]
+        yield "command", result["code"]
+        yield "result", result
+        return
+
+    parser = AnswerStreamParser()
+    prompt = streaming_prompt.format(context=context, question=question)
+    first_chunk = True
+    try:
+        for chunk in llm.stream(prompt):
+            if first_chunk:
+                metrics["ttft"].append(time.perf_counter() - start)
+                first_chunk = False
+            for event in parser.feed(chunk.content):
+                yield event
+        yield from parser.close()
+    except (GeneratorExit, KeyboardInterrupt):
+        # Closed by the consumer, or Ctrl+C while waiting on the model
+        metrics["cancelled"] += 1
+        raise
+    metrics["total"].append(time.perf_counter() - start)
+
+    result = {
+        "question": question,
+        "explanation": "".join(parser.explanation).strip(),
+        "code": parser.command or ""
+    }
+    save_result(result, save_path)
+    if cache is not None:
+        cache.put(question, query_vector, result)
+    yield "result", result
+
+
+def format_metrics():
+    def average_ms(values):
+        return f"{sum(values) / len(values) * 1000:.0f} ms" if values else "n/a"
+
+    return (
+        f"Queries: {metrics['queries']} (cache hits: {metrics['cache_hits']}, cancelled: {metrics['cancelled']})\n"
+        f"Average time to first token: {average_ms(metrics['ttft'])}\n"
+        f"Average time to full answer: {average_ms(metrics['total'])}\n"
+    )
+
+
+# Main function to process a query
+def query_bash_ai(question, save_path="response.json", k=5, mode=None, use_cache=True):
+    cache = get_answer_cache() if use_cache else None
+    cached, query_vector, context = retrieve_context(question, cache, k)
+    if cached is not None:
+        save_result(cached, save_path)
+        return cached
+
+    if not context:
+        return no_context_result(question)
+
+    explanation, code = generate_answer(context, question, mode)
+
+    # Save result
+    result = {
+        "question": question,
+        "explanation": explanation,
+        "code": code
+    }
+
+    save_result(result, save_path)
+    if cache is not None:
+        cache.put(question, query_vector, result)
+
+    return result
@@ -0,0 +1,115 @@
+import os
+import time
+import subprocess
+
+# Small builtins. Each takes (tokens, input_bytes=None) and returns bytes;
+# see registry.py.
+
+
+def echo(tokens, input_bytes=None):
+    return (" ".join(tokens[1:]) + "\n").encode()
+
+
+def pwd(tokens, input_bytes=None):
+    return (os.getcwd() + "\n").encode()
+
+
+def whoami(tokens, input_bytes=None):
+    try:
+        return (os.getlogin() + "\n").encode()
+    except:
+        return os.environ.get("USERNAME", "unknown").encode()
+
+
+def clear(tokens, input_bytes=None):
+    os.system('cls' if os.name == 'nt' else 'clear')
+    return b""
+
+
+def ls(tokens, input_bytes=None):
+    try:
+        path = tokens[1] if len(tokens) > 1 else "."
+        return ("\n".join(os.listdir(path)) + "\n").encode()
+    except Exception as e:
+        return (f"ls error: {e}\n").encode()
+
+
+def dir_(tokens, input_bytes=None):
+    try:
+        args = tokens[1:] if len(tokens) > 1 else []
+        result = subprocess.run(["cmd", "/c", "dir"] + args, capture_output=True, text=True)
+        return result.stdout.encode()
+    except Exception as e:
+        return f"dir error: {e}\n".encode()
+
+
+def touch(tokens, input_bytes=None):
+    try:
+        open(tokens[1], "a").close()
+    except Exception as e:
+        return f"touch error: {e}\n".encode()
+    return b""
+
+
+def mkdir(tokens, input_bytes=None):
+    try:
+        os.mkdir(tokens[1])
+    except Exception as e:
+        return f"mkdir error: {e}\n".encode()
+    return b""
+
+
+def rmdir(tokens, input_bytes=None):
+    try:
+        os.rmdir(tokens[1])
+    except Exception as e:
+        return f"rmdir error: {e}\n".encode()
+    return b""
+
+
+def rm(tokens, input_bytes=None):
+    try:
+        os.remove(tokens[1])
+    except Exception as e:
+        return f"rm error: {e}\n".encode()
+    return b""
+
+
+def sleep(tokens, input_bytes=None):
+    try:
+        seconds = int(tokens[1]) if len(tokens) > 1 else 1
+        time.sleep(seconds)
+        return f"Slept for {seconds} seconds.\n".encode()
+    except Exception as e:
+        return f"sleep error: {e}\n".encode()
+
+
+def countdown(tokens, input_bytes=None):
+    try:
+        start = int(tokens[1]) if len(tokens) > 1 else 5
+        result = ""
+        for i in range(start, 0, -1):
+            result += f"{i}...\n"
+            time.sleep(1)
+        result += "Go!\n"
+        return result.encode()
+    except Exception as e:
+        return f"countdown error: {e}\n".encode()
+
+
+def repeat(tokens, input_bytes=None):
+    try:
+        word = tokens[1] if len(tokens) > 1 else "hello"
+        count = int(tokens[2]) if len(tokens) > 2 else 5
+        result = ""
+        for _ in range(count):
+            result += word + "\n"
+            time.sleep(1)
+        return result.encode()
+    except Exception as e:
+        return f"repeat error: {e}\n".encode()
+
+
+def kill(tokens, input_bytes=None):
+    import jobs
+    return jobs.kill(tokens).encode()
@@ -0,0 +1,82 @@
+import os
+
+# DocBot builtin: asks the model a question, shows the answer as it streams
+# and offers to run the suggested command. chat is only imported here, on
+# the first question.
+
+
+def stream_docbot_answer(chat, question, divider):
+    # Print the answer token by token. Ctrl+C stops the generation and
+    # returns None instead of unwinding into the shell loop.
+    print(f"{divider}\nQuestion: {question}\nAnswer: ", end="", flush=True)
+    answer = chat.stream_bash_ai(question)
+    result = None
+    try:
+        for kind, value in answer:
+            if kind == "explanation":
+                print(value, end="", flush=True)
+            elif kind == "command":
+                print(f"\nCode:\n{value}", flush=True)
+            elif kind == "result":
+                result = value
+    except KeyboardInterrupt:
+        print()
+        return None
+    finally:
+        answer.close()
+    print(divider)
+    return result
+
+
+def docbot(tokens, input_bytes=None):
+    if len(tokens) < 2:
+        return b"bashai: missing question\n"
+    # Imported here so the shell starts without loading the DocBot stack
+    import chat
+    if tokens[1] == "--stats":
+        return chat.format_metrics().encode()
+    question = " ".join(tokens[1:])
+
+    GREEN = "\033[92m"
+    RESET = "\033[0m"
+
+    divider = GREEN + ("=*=" * 18) + "DocBot" + ("=*=" * 18) + RESET
+    try:
+        if os.environ.get("BASHAI_DOCBOT_STREAM", "1") == "1":
+            result = stream_docbot_answer(chat, question, divider)
+            if result is None:
+                return b"DocBot: generation cancelled.\n"
+        else:
+            result = chat.query_bash_ai(question)
+            print(f"{divider}\nQuestion: {result['question']}\nAnswer: {result['explanation']}\nCode:\n{result['code']}\n{divider}")
+    except Exception as e:
+        return f"DocBot error: {e}\n".encode()
+
+    user_input = input(f"{GREEN}Do you want to run the above code? (y/n): {RESET}").strip().lower()
+    if user_input == 'y':
+        # Strip leading/trailing whitespaces
+        raw_code = result['code'].strip()
+
+        # Remove surrounding triple quotes
+        if (raw_code.startswith('"""') and raw_code.endswith('"""')) or \
+        (raw_code.startswith("'''") and raw_code.endswith("'''")):
+            cleaned_code = raw_code[3:-3].strip()
+
+        # Remove surrounding double quotes
+        elif raw_code.startswith('"') and raw_code.endswith('"'):
+            cleaned_code = raw_code[1:-1].strip()
+
+        # Remove surrounding single quotes
+        elif raw_code.startswith("'") and raw_code.endswith("'"):
+            cleaned_code = raw_code[1:-1].strip()
+
+        else:
+            cleaned_code = raw_code  # No surrounding quotes
+
+        # Tokenize the cleaned code
+        new_tokens = cleaned_code.split()
+        print(f"Executing code: {cleaned_code}")
+        import executer
+        return executer.run_command(new_tokens)
+    else:
+        return b"Skipped execution of suggested code.\n"
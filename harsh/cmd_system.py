@@ -0,0 +1,92 @@
+import os
+import shutil
+import platform
+import datetime
+
+# System information builtins; see registry.py for the handler convention.
+
+
+def df(tokens, input_bytes=None):
+    try:
+        # Use current drive or specified path
+        path = tokens[1] if len(tokens) > 1 else "."
+        total, used, free = shutil.disk_usage(path)
+        
+        def to_gb(n): return f"{n / (1024**3):.2f} GB"
+        
+        output = (
+            f"Filesystem: {os.path.abspath(path)}\n"
+            f"Total: {to_gb(total)}\n"
+            f"Used: {to_gb(used)}\n"
+            f"Free: {to_gb(free)}\n"
+        )
+        return output.encode()
+    except Exception as e:
+        return f"df error: {e}\n".encode()
+    
+
+def uptime(tokens, input_bytes=None):
+    try:
+        # Windows uptime via ctypes
+        if os.name == 'nt':
+            import ctypes
+            import ctypes.wintypes
+            
+            class SYSTEM_TIME(ctypes.Structure):
+                _fields_ = [('dwLowDateTime', ctypes.wintypes.DWORD),
+                            ('dwHighDateTime', ctypes.wintypes.DWORD)]
+            
+            GetTickCount64 = ctypes.windll.kernel32.GetTickCount64
+            GetTickCount64.restype = ctypes.c_ulonglong
+            millis = GetTickCount64()
+            seconds = millis / 1000
+        else:
+            # On Unix, read from /proc/uptime
+            with open("/proc/uptime") as f:
+                seconds = float(f.readline().split()[0])
+        
+        days = int(seconds // (24*3600))
+        seconds %= (24*3600)
+        hours = int(seconds // 3600)
+        seconds %= 3600
+        minutes = int(seconds // 60)
+        seconds = int(seconds % 60)
+        
+        return f"Uptime: {days}d {hours}h {minutes}m {seconds}s\n".encode()
+    except Exception as e:
+        return f"uptime error: {e}\n".encode()
+    
+    
+def stat(tokens, input_bytes=None):
+    if len(tokens) < 2:
+        return b"Usage: stat filename\n"
+    try:
+        filepath = tokens[1]
+        st = os.stat(filepath)
+        size = st.st_size
+        ctime = datetime.datetime.fromtimestamp(st.st_ctime)
+        mtime = datetime.datetime.fromtimestamp(st.st_mtime)
+        atime = datetime.datetime.fromtimestamp(st.st_atime)
+        
+        output = (
+            f"  File: {filepath}\n"
+            f"  Size: {size} bytes\n"
+            f"  Created: {ctime}\n"
+            f"  Modified: {mtime}\n"
+            f"  Accessed: {atime}\n"
+        )
+        return output.encode()
+    except Exception as e:
+        return f"stat error: {e}\n".encode()
+    
+
+def uname(tokens, input_bytes=None):
+    output = (
+        f"System: {platform.system()}\n"
+        f"Node Name: {platform.node()}\n"
+        f"Release: {platform.release()}\n"
+        f"Version: {platform.version()}\n"
+        f"Machine: {platform.machine()}\n"
+        f"Processor: {platform.processor()}\n"
+    )
+    return output.encode()
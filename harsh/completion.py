@@ -0,0 +1,221 @@
+import os
+import time
+import bisect
+
+# Tab completion for the interactive shell.
+#
+# readline calls the completer with state 0, 1, 2, ... until it returns
+# None; the candidates are computed once at state 0 and the later calls just
+# index into them. Command names (builtins, aliases, PATH executables and
+# the first words of history) live in a prefix trie that is only rebuilt when
+# one of its sources changes. Directory listings are cached as sorted name
+# lists, checked against the directory's mtime (one stat) on every use, so
+# completing in a directory with 100k entries costs one scan the first time
+# and a bisect afterwards. Arguments are completed according to the command:
+# directories for cd, jobs for fg/bg/kill, command names for type/which,
+# flags when the word starts with "-", files otherwise. When nothing
+# completes at the end of the line, Tab fills in the autosuggestion instead
+# (suggest.py), which is how readline, with no inline hints, gets them.
+
+LISTING_CACHE_SIZE = 64
+LISTING_TTL = 60.0
+
+DIR_COMMANDS = {"cd", "rmdir", "tree", "index"}
+COMMAND_ARG_COMMANDS = {"type", "which", "hash"}
+JOB_COMMANDS = {"fg", "bg", "wait", "kill"}
+# Only options the builtins accept
+FLAGS = {
+    "grep": ["-E", "-F", "-c", "-e", "-i", "-l", "-n", "-r", "-v"],
+    "sort": ["-k", "-n", "-r", "-t", "-u"],
+    "tree": ["--du", "--filelimit", "--limit", "-L", "-a", "-d", "-l"],
+    "find": ["-iname", "-mmin", "-mtime", "-name", "-newer", "-o", "-print", "-size", "-type"],
+    "history": ["-c", "-f", "-p", "-s", "-w"],
+    "hash": ["-r"],
+    "jobs": ["-l"],
+    "index": ["--drop", "-l"],
+    "locate": ["-i"],
+    "cp": ["-r"],
+}
+
+
+class Trie:
+    def __init__(self, words=()):
+        self.root = {}
+        for word in words:
+            self.add(word)
+
+    def add(self, word):
+        node = self.root
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def words(self, prefix):
+        """Every word starting with prefix, sorted."""
+        node = self.root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return []
+        out = []
+        stack = [(node, prefix)]
+        while stack:
+            node, word = stack.pop()
+            for char in node:
+                if char == "":
+                    out.append(word)
+                else:
+                    stack.append((node[char], word + char))
+        out.sort()
+        return out
+
+
+# Command-name trie and what it was built from
+_commands = None
+_commands_key = None
+_history_seen = 0
+
+
+def _command_trie():
+    global _commands, _commands_key, _history_seen
+    import registry
+    import pathcache
+    from executer import aliases
+    from history import command_history
+
+    executables = pathcache.executables()
+    key = (id(executables), tuple(aliases), len(registry.builtins))
+    history_len = len(command_history)
+    if key != _commands_key or history_len < _history_seen:
+        _commands = Trie(list(aliases) + registry.names() + executables)
+        _commands_key = key
+        _history_seen = 0
+    if history_len > _history_seen:
+        for command in command_history[_history_seen:history_len]:
+            first = command.split(None, 1)
+            if first and not first[0].startswith("!"):
+                _commands.add(first[0])
+        _history_seen = history_len
+    return _commands
+
+
+# path -> [mtime_ns, scanned_at, last_used, names, dirs]
+_listings = {}
+
+
+def _scan(path):
+    import fsindex
+    indexed = fsindex.list_dir(path)
+    entries = indexed if indexed is not None else os.scandir(path)
+    names, dirs = [], set()
+    try:
+        for entry in entries:
+            names.append(entry.name)
+            try:
+                if entry.is_dir():
+                    dirs.add(entry.name)
+            except OSError:
+                pass
+    finally:
+        close = getattr(entries, "close", None)
+        if close is not None:
+            close()
+    names.sort()
+    return names, dirs
+
+
+def listing(path):
+    """(sorted names, set of directory names) of path, cached by mtime."""
+    key = os.path.abspath(path)
+    mtime = os.stat(key).st_mtime_ns
+    now = time.monotonic()
+    cached = _listings.get(key)
+    # The age limit covers filesystems whose mtimes are too coarse to see
+    # two changes close together
+    if cached is not None and cached[0] == mtime and now - cached[1] < LISTING_TTL:
+        cached[2] = now
+        return cached[3], cached[4]
+    names, dirs = _scan(key)
+    _listings[key] = [mtime, now, now, names, dirs]
+    if len(_listings) > LISTING_CACHE_SIZE:
+        del _listings[min(_listings, key=lambda k: _listings[k][2])]
+    return names, dirs
+
+
+def complete_path(text, dirs_only=False):
+    head, rest = os.path.split(text)
+    directory = os.path.expanduser(head) if head else "."
+    try:
+        names, dirs = listing(directory)
+    except OSError:
+        return []
+    start = bisect.bisect_left(names, rest)
+    out = []
+    show_hidden = rest.startswith(".")
+    for name in names[start:]:
+        if not name.startswith(rest):
+            break
+        if name.startswith(".") and not show_hidden:
+            continue
+        is_dir = name in dirs
+        if dirs_only and not is_dir:
+            continue
+        candidate = os.path.join(head, name) if head else name
+        out.append(candidate + os.sep if is_dir else candidate)
+    return out
+
+
+def complete_jobs(text):
+    import jobs
+    return [f"%{job_id}" for job_id in sorted(jobs.table) if f"%{job_id}".startswith(text)]
+
+
+def candidates(line, begidx, text):
+    words = line[:begidx].replace("|", " | ").replace(";", " ; ").split()
+    # Only the current command of a pipeline or list matters
+    for i in range(len(words) - 1, -1, -1):
+        if words[i] in ("|", ";"):
+            words = words[i + 1:]
+            break
+    if not words:
+        if os.sep in text:
+            return complete_path(text)
+        return _command_trie().words(text)
+
+    command = words[0]
+    if text.startswith("-") and command in FLAGS:
+        return [flag for flag in FLAGS[command] if flag.startswith(text)]
+    if command in DIR_COMMANDS:
+        return complete_path(text, dirs_only=True)
+    if command in JOB_COMMANDS and (text.startswith("%") or command != "kill"):
+        return complete_jobs(text)
+    if command in COMMAND_ARG_COMMANDS:
+        return _command_trie().words(text)
+    if command == "alias":
+        from executer import aliases
+        return [name for name in sorted(aliases) if name.startswith(text)]
+    return complete_path(text)
+
+
+_matches = []
+
+
+def complete(text, state):
+    """readline completer."""
+    global _matches
+    if state == 0:
+        import readline
+        line = readline.get_line_buffer()
+        try:
+            _matches = candidates(line, readline.get_begidx(), text)
+        except Exception:
+            _matches = []
+        if not _matches and readline.get_endidx() == len(line):
+            import suggest
+            rest = suggest.suggestion(line) if suggest.enabled() else None
+            if rest:
+                return text + rest
+        # A single directory match keeps going without a trailing space
+        if len(_matches) == 1 and not _matches[0].endswith(os.sep):
+            _matches = [_matches[0] + " "]
+    return _matches[state] if state < len(_matches) else None
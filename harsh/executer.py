@@ -1,21 +1,27 @@
 import os
 import sys
 import subprocess
-import shutil
-import threading
-import time
 import signal
-import re
-import fnmatch
-import platform 
-import datetime
+import codecs
+import functools
 
 
-from history import command_history
-from chat import query_bash_ai
+from pipeline import run_stages, run_native, iter_file, external_stage
+import registry
+import pathcache
+import jobs
 
 aliases = {}
-background_jobs = []
+# Exit status of the last command, like $?
+last_status = 0
+
+
+class Operator(str):
+    # A shell operator as typed, told apart from the same text quoted
+    __slots__ = ()
+
+
+PIPE = Operator("|")
 
 # Signal Handlers
 def handle_sigint(signal_number, frame):
@@ -30,381 +36,113 @@ if os.name == 'posix':
     signal.signal(signal.SIGTSTP, handle_sigtstp)
 elif os.name == 'nt':
     signal.signal(signal.SIGINT, handle_sigint)
+jobs.install()
 
 def expand_variables_and_aliases(tokens):
     if not tokens:
         return []
     if tokens[0] in aliases:
-        alias_expansion = aliases[tokens[0]].split()
+        alias_expansion = [PIPE if word == "|" else word for word in aliases[tokens[0]].split()]
         tokens = alias_expansion + tokens[1:]
-    tokens = [os.path.expandvars(token) for token in tokens]
+    tokens = [token if isinstance(token, Operator) else os.path.expandvars(token) for token in tokens]
     return tokens
 
-def cmd_grep(tokens, input_bytes=None):
-    if len(tokens) < 2:
-        return b"Usage: grep pattern [file]\n"
-    
-    pattern = tokens[1]
-    lines = []
-    
-    if len(tokens) > 2:
-        # Read from file
-        try:
-            with open(tokens[2], 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
-        except Exception as e:
-            return f"grep error: {e}\n".encode()
-    else:
-        # Use input_bytes from pipe if available
-        if input_bytes:
-            lines = input_bytes.decode(errors='ignore').splitlines()
-        else:
-            return b"grep error: no input or file provided\n"
-    
-    result = []
-    for line in lines:
-        if pattern in line:
-            result.append(line)
-    return ("\n".join(result) + "\n").encode()
-
-def cmd_find(tokens):
-    start_path = "."
-    pattern = "*"
-    
-    if len(tokens) > 1:
-        start_path = tokens[1]
-    if len(tokens) > 2:
-        pattern = tokens[2]
-    
-    matches = []
-    try:
-        for root, dirs, files in os.walk(start_path):
-            for name in dirs + files:
-                if fnmatch.fnmatch(name, pattern):
-                    matches.append(os.path.join(root, name))
-    except Exception as e:
-        return str(e).encode()
-    return ("\n".join(matches) + "\n").encode()
 
-def cmd_df(tokens):
-    try:
-        # Use current drive or specified path
-        path = tokens[1] if len(tokens) > 1 else "."
-        total, used, free = shutil.disk_usage(path)
-        
-        def to_gb(n): return f"{n / (1024**3):.2f} GB"
-        
-        output = (
-            f"Filesystem: {os.path.abspath(path)}\n"
-            f"Total: {to_gb(total)}\n"
-            f"Used: {to_gb(used)}\n"
-            f"Free: {to_gb(free)}\n"
-        )
-        return output.encode()
-    except Exception as e:
-        return f"df error: {e}\n".encode()
-    
-
-def cmd_uptime(tokens):
-    try:
-        # Windows uptime via ctypes
-        if os.name == 'nt':
-            import ctypes
-            import ctypes.wintypes
-            
-            class SYSTEM_TIME(ctypes.Structure):
-                _fields_ = [('dwLowDateTime', ctypes.wintypes.DWORD),
-                            ('dwHighDateTime', ctypes.wintypes.DWORD)]
-            
-            GetTickCount64 = ctypes.windll.kernel32.GetTickCount64
-            GetTickCount64.restype = ctypes.c_ulonglong
-            millis = GetTickCount64()
-            seconds = millis / 1000
+def split_pipeline(tokens):
+    # Split at PIPE operators only, so a quoted "|" stays an argument
+    commands = [[]]
+    for token in tokens:
+        if token is PIPE:
+            commands.append([])
         else:
-            # On Unix, read from /proc/uptime
-            with open("/proc/uptime") as f:
-                seconds = float(f.readline().split()[0])
-        
-        days = int(seconds // (24*3600))
-        seconds %= (24*3600)
-        hours = int(seconds // 3600)
-        seconds %= 3600
-        minutes = int(seconds // 60)
-        seconds = int(seconds % 60)
-        
-        return f"Uptime: {days}d {hours}h {minutes}m {seconds}s\n".encode()
-    except Exception as e:
-        return f"uptime error: {e}\n".encode()
-    
-    
-def cmd_stat(tokens):
-    if len(tokens) < 2:
-        return b"Usage: stat filename\n"
-    try:
-        filepath = tokens[1]
-        st = os.stat(filepath)
-        size = st.st_size
-        ctime = datetime.datetime.fromtimestamp(st.st_ctime)
-        mtime = datetime.datetime.fromtimestamp(st.st_mtime)
-        atime = datetime.datetime.fromtimestamp(st.st_atime)
-        
-        output = (
-            f"  File: {filepath}\n"
-            f"  Size: {size} bytes\n"
-            f"  Created: {ctime}\n"
-            f"  Modified: {mtime}\n"
-            f"  Accessed: {atime}\n"
-        )
-        return output.encode()
-    except Exception as e:
-        return f"stat error: {e}\n".encode()
-    
-
-def cmd_uname(tokens):
-    output = (
-        f"System: {platform.system()}\n"
-        f"Node Name: {platform.node()}\n"
-        f"Release: {platform.release()}\n"
-        f"Version: {platform.version()}\n"
-        f"Machine: {platform.machine()}\n"
-        f"Processor: {platform.processor()}\n"
-    )
-    return output.encode()
-
-def cmd_tree(tokens):
-    start_path = tokens[1] if len(tokens) > 1 else "."
-    
-    def walk_dir(path, prefix=""):
-        lines = []
-        try:
-            entries = os.listdir(path)
-        except Exception as e:
-            return [f"tree error: {e}"]
-        
-        entries.sort()
-        for i, entry in enumerate(entries):
-            full_path = os.path.join(path, entry)
-            connector = "└── " if i == len(entries) - 1 else "├── "
-            lines.append(prefix + connector + entry)
-            if os.path.isdir(full_path):
-                extension = "    " if i == len(entries) - 1 else "│   "
-                lines.extend(walk_dir(full_path, prefix + extension))
-        return lines
-    
-    tree_lines = [start_path]
-    tree_lines.extend(walk_dir(start_path))
-    return ("\n".join(tree_lines) + "\n").encode()
-
-
-def cmd_sort(tokens, input_bytes=None):
-    lines = []
-    if len(tokens) > 1:
-        try:
-            with open(tokens[1], 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
-        except Exception as e:
-            return f"sort error: {e}\n".encode()
-    else:
-        if input_bytes:
-            lines = input_bytes.decode(errors='ignore').splitlines()
-        else:
-            return b"sort error: no input or file provided\n"
-    
-    lines.sort()
-    return ("\n".join(line.rstrip('\n') for line in lines) + "\n").encode()
+            commands[-1].append(token)
+    return commands
 
 
+def expand_pipeline(tokens):
+    # Aliases and variables, expanded exactly once for every command of
+    # the pipeline
+    expanded = []
+    for i, segment in enumerate(split_pipeline(tokens)):
+        if i:
+            expanded.append(PIPE)
+        expanded.extend(expand_variables_and_aliases(segment))
+    return expanded
 
 
-def run_command(cmd_tokens, input_bytes=None):
-    if not cmd_tokens:
-        return b""
+def is_plain_cat(commands, input_handle):
+    # `cat file...` on its own can go straight from the files to the output
+    # fd in the kernel
+    return (len(commands) == 1 and len(commands[0]) > 1 and commands[0][0] == "cat"
+            and "-" not in commands[0] and input_handle is None)
 
-    cmd = cmd_tokens[0]
 
-    if cmd == "echo":
-        return (" ".join(cmd_tokens[1:]) + "\n").encode()
-    elif cmd == "pwd":
-        return (os.getcwd() + "\n").encode()
-    elif cmd == "whoami":
-        try:
-            return (os.getlogin() + "\n").encode()
-        except:
-            return os.environ.get("USERNAME", "unknown").encode()
-    elif cmd == "clear":
-        os.system('cls' if os.name == 'nt' else 'clear')
-        return b""
-    elif cmd == "ls":
-        try:
-            path = cmd_tokens[1] if len(cmd_tokens) > 1 else "."
-            return ("\n".join(os.listdir(path)) + "\n").encode()
-        except Exception as e:
-            return (f"ls error: {e}\n").encode()
-    elif cmd == "dir":
-        try:
-            args = cmd_tokens[1:] if len(cmd_tokens) > 1 else []
-            result = subprocess.run(["cmd", "/c", "dir"] + args, capture_output=True, text=True)
-            return result.stdout.encode()
-        except Exception as e:
-            return f"dir error: {e}\n".encode()
-    elif cmd == "cat":
-        if len(cmd_tokens) < 2:
-            return input_bytes or b""
-        try:
-            return open(cmd_tokens[1], "rb").read()
-        except Exception as e:
-            return f"cat error: {e}\n".encode()
-    elif cmd == "touch":
-        try:
-            open(cmd_tokens[1], "a").close()
-        except Exception as e:
-            return f"touch error: {e}\n".encode()
-        return b""
-    elif cmd == "mkdir":
-        try:
-            os.mkdir(cmd_tokens[1])
-        except Exception as e:
-            return f"mkdir error: {e}\n".encode()
-        return b""
-    elif cmd == "rmdir":
+def cat_direct(paths, output_file=None, append=False):
+    # Returns False when stdout has no usable fd and the caller must stream
+    import fastcopy
+    if output_file:
         try:
-            os.rmdir(cmd_tokens[1])
-        except Exception as e:
-            return f"rmdir error: {e}\n".encode()
-        return b""
-    elif cmd == "cp":
-        try:
-            if len(cmd_tokens) < 3:
-                return b"cp: missing source or destination\n"
-            shutil.copy(cmd_tokens[1], cmd_tokens[2])
-        except Exception as e:
-            return f"cp error: {e}\n".encode()
-        return b""
-    elif cmd == "mv":
-        try:
-            if len(cmd_tokens) < 3:
-                return b"mv: missing source or destination\n"
-            shutil.move(cmd_tokens[1], cmd_tokens[2])
-        except Exception as e:
-            return f"mv error: {e}\n".encode()
-        return b""
-    elif cmd == "rm":
-        try:
-            os.remove(cmd_tokens[1])
-        except Exception as e:
-            return f"rm error: {e}\n".encode()
-        return b""
-    elif cmd == "sleep":
-        try:
-            seconds = int(cmd_tokens[1]) if len(cmd_tokens) > 1 else 1
-            time.sleep(seconds)
-            return f"Slept for {seconds} seconds.\n".encode()
-        except Exception as e:
-            return f"sleep error: {e}\n".encode()
-    elif cmd == "countdown":
-        try:
-            start = int(cmd_tokens[1]) if len(cmd_tokens) > 1 else 5
-            result = ""
-            for i in range(start, 0, -1):
-                result += f"{i}...\n"
-                time.sleep(1)
-            result += "Go!\n"
-            return result.encode()
-        except Exception as e:
-            return f"countdown error: {e}\n".encode()
-    elif cmd == "repeat":
-        try:
-            word = cmd_tokens[1] if len(cmd_tokens) > 1 else "hello"
-            count = int(cmd_tokens[2]) if len(cmd_tokens) > 2 else 5
-            result = ""
-            for _ in range(count):
-                result += word + "\n"
-                time.sleep(1)
-            return result.encode()
-        except Exception as e:
-            return f"repeat error: {e}\n".encode()
-    elif cmd_tokens[0] == "kill":
-        if len(cmd_tokens) < 2:
-            print("Usage: kill <job_id>")
-            return
+            with open(output_file, "ab" if append else "wb") as f:
+                errors = fastcopy.cat_to_fd(paths, f.fileno())
+        except OSError as e:
+            print(f"Output redirection error: {e}")
+            return True
+    else:
         try:
-            job_id = int(cmd_tokens[1])
-        except:
-            print("kill: job_id must be a number")
-            return
-        for job in background_jobs:
-            if job["job_id"] == job_id:
-                proc = job.get("process")
-                if proc:
-                    proc.terminate()
-                    job["status"] = "Terminated"
-                    print(f"Killed job [{job_id}]: {job['command']}")
-                else:
-                    print(f"Job [{job_id}] cannot be killed (no process handle).")
-                return
-        print(f"kill: no such job [{job_id}]")
+            fd = sys.stdout.fileno()
+        except (AttributeError, ValueError, OSError):
+            return False
+        sys.stdout.flush()
+        errors = fastcopy.cat_to_fd(paths, fd)
+    for error in errors:
+        sys.stderr.write(error)
+    return True
+
+
+def is_native_pipeline(commands):
+    # True when every stage is an external program we can find on PATH, so
+    # the whole pipeline can be handed to the OS.
+    for cmd_tokens in commands:
+        if not cmd_tokens or registry.get(cmd_tokens[0]) is not None:
+            return False
+        if pathcache.lookup(cmd_tokens[0], hit=False) is None:
+            return False
+    return True
+
+
+def stream_command(cmd_tokens, chunks=None, status=None):
+    # status, when given, receives an external program's exit status
+    if not cmd_tokens:
         return
-    elif cmd == "grep":
-        return cmd_grep(cmd_tokens, input_bytes)
-    elif cmd == "find":
-        return cmd_find(cmd_tokens)
-    elif cmd == "df":
-        return cmd_df(cmd_tokens)
-    elif cmd == "uptime":
-        return cmd_uptime(cmd_tokens)
-    elif cmd == "stat":
-        return cmd_stat(cmd_tokens)
-    elif cmd == "uname":
-        return cmd_uname(cmd_tokens)
-    elif cmd == "tree":
-        return cmd_tree(cmd_tokens)
-    elif cmd == "sort":
-        return cmd_sort(cmd_tokens, input_bytes)
-    
-    elif cmd == "DocBot":
-        if len(cmd_tokens) < 2:
-            return b"bashai: missing question\n"
-        question = " ".join(cmd_tokens[1:])
-        result = query_bash_ai(question)
-
-        GREEN = "\033[92m"
-        RESET = "\033[0m"
-
-        divider = GREEN + ("=*=" * 18) + "DocBot" + ("=*=" * 18) + RESET
-        print(f"{divider}\nQuestion: {result['question']}\nAnswer: {result['explanation']}\nCode:\n{result['code']}\n{divider}")
-
-        user_input = input(f"{GREEN}Do you want to run the above code? (y/n): {RESET}").strip().lower()
-        if user_input == 'y':
-            # Strip leading/trailing whitespaces
-            raw_code = result['code'].strip()
-
-            # Remove surrounding triple quotes
-            if (raw_code.startswith('"""') and raw_code.endswith('"""')) or \
-            (raw_code.startswith("'''") and raw_code.endswith("'''")):
-                cleaned_code = raw_code[3:-3].strip()
-
-            # Remove surrounding double quotes
-            elif raw_code.startswith('"') and raw_code.endswith('"'):
-                cleaned_code = raw_code[1:-1].strip()
-
-            # Remove surrounding single quotes
-            elif raw_code.startswith("'") and raw_code.endswith("'"):
-                cleaned_code = raw_code[1:-1].strip()
+    builtin = registry.get(cmd_tokens[0])
+    if builtin is None:
+        yield from external_stage(cmd_tokens, chunks, status)
+    elif builtin.streaming:
+        yield from builtin.handler(cmd_tokens, chunks)
+    else:
+        input_bytes = b"".join(chunks) if chunks is not None and builtin.needs_stdin else None
+        data = builtin.handler(cmd_tokens, input_bytes)
+        if data:
+            yield data
 
-            else:
-                cleaned_code = raw_code  # No surrounding quotes
-
-            # Tokenize the cleaned code
-            new_tokens = cleaned_code.split()
-            print(f"Executing code: {cleaned_code}")
-            return run_command(new_tokens)
-        else:
-            return b"Skipped execution of suggested code.\n"
 
+def run_command(cmd_tokens, input_bytes=None):
+    if not cmd_tokens:
+        return b""
 
+    builtin = registry.get(cmd_tokens[0])
+    if builtin is not None:
+        if builtin.streaming:
+            chunks = [input_bytes] if input_bytes is not None else None
+            return b"".join(builtin.handler(cmd_tokens, chunks))
+        return builtin.handler(cmd_tokens, input_bytes)
 
+    cmd = cmd_tokens[0]
+    executable = pathcache.lookup(cmd)
+    if executable is None:
+        return f"{cmd}: command not found\n".encode()
     try:
-        proc = subprocess.run(cmd_tokens, input=input_bytes, capture_output=True)
+        proc = subprocess.run(cmd_tokens, executable=executable, input=input_bytes, capture_output=True)
         return proc.stdout + proc.stderr
     except FileNotFoundError:
         return f"{cmd}: command not found\n".encode()
@@ -412,24 +150,40 @@ def run_command(cmd_tokens, input_bytes=None):
         return f"Error running {cmd}: {e}\n".encode()
 
 def execute_command(tokens):
+    """Run one command line; returns its exit status, kept in last_status."""
+    global last_status
+    status = _execute(tokens) or 0
+    # Killed by a signal: 128 + its number, as sh reports it
+    last_status = 128 - status if status < 0 else status
+    return last_status
+
+
+def exit_status(args):
+    if not args:
+        return last_status
+    try:
+        return int(args[0]) & 0xFF
+    except ValueError:
+        print(f"exit: {args[0]}: numeric argument required")
+        return 2
+
+
+def _execute(tokens):
     if not tokens:
         return
 
     if tokens[0] == "jobs":
-        if background_jobs:
-            for job in background_jobs:
-                if job["status"].lower() == "running":
-                    print(f"Job ID [{job['job_id']}]: {job['status']} - Command: {job['command']}")
-        # If no running jobs found:
-                else:
-                    print("No running background jobs.")
-        else:
-            print("No background jobs.")
+        output = jobs.list_jobs(long="-l" in tokens)
+        print(output or "No background jobs.", end="" if output else "\n")
         return
 
-    if tokens[0] == "history":
-        for idx, cmd in enumerate(command_history, 1):
-            print(f"{idx}: {cmd}")
+    if tokens[0] in ("fg", "bg"):
+        action = jobs.foreground if tokens[0] == "fg" else jobs.background
+        print(action(tokens[1] if len(tokens) > 1 else None), end="")
+        return
+
+    if tokens[0] == "wait":
+        print(jobs.wait_for(tokens[1:]), end="")
         return
 
     if tokens[0] == "alias":
@@ -444,22 +198,27 @@ def execute_command(tokens):
             aliases[name] = val
         else:
             print("Invalid alias format. Use: alias name='command'")
+            return 1
         return
 
     run_in_background = tokens[-1] == "&"
     if run_in_background:
         tokens = tokens[:-1]
 
-    tokens = expand_variables_and_aliases(tokens)
+    tokens = expand_pipeline(tokens)
+    if not tokens:
+        return
 
     if tokens[0] == "exit":
+        status = exit_status(tokens[1:])
         print("Exiting shell...")
-        sys.exit(0)
+        sys.exit(status)
     elif tokens[0] == "cd":
         try:
             os.chdir(tokens[1] if len(tokens) > 1 else os.path.expanduser("~"))
         except Exception as e:
             print(f"cd error: {e}")
+            return 1
         return
 
     input_file = None
@@ -480,48 +239,83 @@ def execute_command(tokens):
             new_tokens.append(token)
     tokens = new_tokens
 
-    input_bytes = None
+    input_handle = None
     if input_file:
         try:
-            with open(input_file, "rb") as f:
-                input_bytes = f.read()
+            input_handle = open(input_file, "rb")
         except Exception as e:
             print(f"Input redirection error: {e}")
+            return 1
+
+    # Checked before importing so the default executor never loads asyncio
+    if os.environ.get("BASHAI_EXECUTOR") == "async":
+        import async_executor
+        commands = split_pipeline(tokens)
+        if run_in_background:
+            future = async_executor.submit(commands, input_handle, output_file, append)
+            print(f"[{jobs.add_future(' '.join(tokens), future).id}]")
             return
+        return async_executor.run_foreground(commands, input_handle, output_file, append)
 
     def run_pipeline():
+        # Returns the exit status of the last stage
         try:
-            if "|" in tokens:
-                segments = " ".join(tokens).split("|")
-                data = input_bytes
-                for seg in segments:
-                    cmd_tokens = expand_variables_and_aliases(seg.strip().split())
-                    data = run_command(cmd_tokens, input_bytes=data)
-            else:
-                data = run_command(tokens, input_bytes=input_bytes)
+            commands = split_pipeline(tokens)
+
+            if is_native_pipeline(commands):
+                if output_file:
+                    try:
+                        mode = "ab" if append else "wb"
+                        with open(output_file, mode) as f:
+                            return run_native(commands, stdin=input_handle, stdout=f)
+                    except OSError as e:
+                        print(f"Output redirection error: {e}")
+                        return 1
+                sys.stdout.flush()
+                return run_native(commands, stdin=input_handle)
+
+            if is_plain_cat(commands, input_handle):
+                if cat_direct(commands[0][1:], output_file, append):
+                    return
+
+            status = []
+            source = iter_file(input_handle) if input_handle else None
+            stages = [functools.partial(stream_command, cmd_tokens) for cmd_tokens in commands[:-1]]
+            stages.append(functools.partial(stream_command, commands[-1], status=status))
+            output = run_stages(stages, source)
 
             if output_file:
                 try:
                     mode = "ab" if append else "wb"
                     with open(output_file, mode) as f:
-                        f.write(data)
+                        for chunk in output:
+                            f.write(chunk)
                 except Exception as e:
                     print(f"Output redirection error: {e}")
+                    return 1
             else:
-                if data:
-                    sys.stdout.write(data.decode())
+                decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+                for chunk in output:
+                    sys.stdout.write(decoder.decode(chunk))
+                    sys.stdout.flush()
+                sys.stdout.write(decoder.decode(b"", final=True))
+            return status[0] if status else 0
+        except BrokenPipeError:
+            # Whoever read our output is gone (`| head`); the caller stops
+            raise
         except Exception as e:
             print(f"Pipeline error: {e}")
+            return 1
+        finally:
+            if input_handle:
+                input_handle.close()
 
     if run_in_background:
-        thread = threading.Thread(target=run_pipeline)
-        job_id = len(background_jobs) + 1
-        background_jobs.append({
-            "job_id": job_id,
-            "command": " ".join(tokens),
-            "thread": thread,
-            "status": "Running"
-        })
-        thread.start()
+        job = jobs.start(" ".join(tokens), run_pipeline)
+        if job.pid is not None:
+            print(f"[{job.id}] {job.pid}")
+            # The job has its own copy of the input file now
+            if input_handle:
+                input_handle.close()
     else:
-        run_pipeline()
+        return run_pipeline()
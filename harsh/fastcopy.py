@@ -0,0 +1,254 @@
+import os
+import errno
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# In-kernel file copies. Data moves with copy_file_range (file to file, can
+# share extents on CoW filesystems) or sendfile (file to anything) and never
+# passes through Python buffers. Every helper falls back to plain reads and
+# writes when the kernel call is missing or refuses the file pair, e.g. on
+# Windows, /proc files or some network filesystems.
+
+READ_SIZE = 1024 * 1024
+SEND_SIZE = 64 * 1024 * 1024
+COPY_WORKERS = int(os.environ.get("BASHAI_COPY_WORKERS", "8"))
+
+# Errors that mean "this fd pair is not supported", not "the copy failed"
+_UNSUPPORTED = {errno.EINVAL, errno.ENOSYS, errno.EXDEV, errno.EBADF, errno.ENOTSUP, errno.ESPIPE}
+
+
+def _copy_loop(func, src_fd, dst_fd):
+    # Returns bytes copied, or None if func does not work for this pair
+    # before anything was copied
+    total = 0
+    while True:
+        try:
+            sent = func(src_fd, dst_fd)
+        except OSError as e:
+            if total == 0 and e.errno in _UNSUPPORTED:
+                return None
+            raise
+        if sent == 0:
+            return total
+        total += sent
+
+
+def _read_write(src_fd, dst_fd):
+    total = 0
+    while True:
+        data = os.read(src_fd, READ_SIZE)
+        if not data:
+            return total
+        view = memoryview(data)
+        while view:
+            written = os.write(dst_fd, view)
+            view = view[written:]
+        total += len(data)
+
+
+def send_fd(src_fd, dst_fd):
+    """Copy the rest of src_fd to dst_fd with sendfile, else read/write."""
+    if hasattr(os, "sendfile"):
+        copied = _copy_loop(lambda s, d: os.sendfile(d, s, None, SEND_SIZE), src_fd, dst_fd)
+        if copied is not None:
+            return copied
+    return _read_write(src_fd, dst_fd)
+
+
+def copy_fd(src_fd, dst_fd):
+    """Copy file to file: copy_file_range, then sendfile, then read/write."""
+    if hasattr(os, "copy_file_range"):
+        copied = _copy_loop(lambda s, d: os.copy_file_range(s, d, SEND_SIZE), src_fd, dst_fd)
+        if copied is not None:
+            return copied
+    return send_fd(src_fd, dst_fd)
+
+
+def cat_to_fd(paths, dst_fd):
+    # Write files straight to an output fd; returns error messages
+    errors = []
+    for path in paths:
+        try:
+            fd = os.open(path, os.O_RDONLY)
+        except OSError as e:
+            errors.append(f"cat error: {e}\n")
+            continue
+        try:
+            send_fd(fd, dst_fd)
+        except IsADirectoryError:
+            errors.append(f"cat: {path}: Is a directory\n")
+        finally:
+            os.close(fd)
+    return errors
+
+
+def iter_files(paths, chunks=None):
+    # Chunked fallback for pipelines: large reads, one file at a time.
+    # "-" stands for the stage's input.
+    for path in paths:
+        if path == "-":
+            if chunks is not None:
+                yield from chunks
+            continue
+        try:
+            f = open(path, "rb", buffering=0)
+        except OSError as e:
+            yield f"cat error: {e}\n".encode()
+            continue
+        with f:
+            try:
+                while True:
+                    chunk = f.read(READ_SIZE)
+                    if not chunk:
+                        break
+                    yield chunk
+            except IsADirectoryError:
+                yield f"cat: {path}: Is a directory\n".encode()
+
+
+def cat(tokens, chunks=None):
+    if len(tokens) < 2:
+        if chunks is not None:
+            yield from chunks
+        return
+    yield from iter_files(tokens[1:], chunks)
+
+
+def copy_file(src, dst):
+    # Opening dst for writing first would truncate src when they are the
+    # same file (cp f f, cp f . from f's directory)
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        raise shutil.SameFileError(f"'{src}' and '{dst}' are the same file")
+    with open(src, "rb", buffering=0) as fsrc:
+        st = os.fstat(fsrc.fileno())
+        with open(dst, "wb", buffering=0) as fdst:
+            copy_fd(fsrc.fileno(), fdst.fileno())
+    os.chmod(dst, st.st_mode & 0o7777)
+
+
+def copy_tree(src, dst, workers=COPY_WORKERS):
+    """Copy a directory tree; files are copied in parallel. Returns errors."""
+    real_src = os.path.realpath(src)
+    real_dst = os.path.realpath(dst)
+    if real_dst == real_src or real_dst.startswith(real_src.rstrip(os.sep) + os.sep):
+        return [f"cp: cannot copy a directory, '{src}', into itself, '{dst}'\n"]
+
+    errors = []
+    errors_lock = threading.Lock()
+
+    def copy_one(s, d):
+        try:
+            copy_file(s, d)
+        except OSError as e:
+            with errors_lock:
+                errors.append(f"cp: cannot copy '{s}': {e.strerror or e}\n")
+
+    # Directories are created in walk order on this thread, so every file
+    # job runs after its parent exists
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        stack = [(src, dst)]
+        while stack:
+            src_dir, dst_dir = stack.pop()
+            try:
+                os.makedirs(dst_dir, exist_ok=True)
+                shutil.copymode(src_dir, dst_dir)
+                with os.scandir(src_dir) as it:
+                    entries = list(it)
+            except OSError as e:
+                errors.append(f"cp: cannot copy '{src_dir}': {e.strerror}\n")
+                continue
+            for entry in entries:
+                target = os.path.join(dst_dir, entry.name)
+                try:
+                    if entry.is_symlink():
+                        os.symlink(os.readlink(entry.path), target)
+                    elif entry.is_dir():
+                        stack.append((entry.path, target))
+                    else:
+                        pool.submit(copy_one, entry.path, target)
+                except OSError as e:
+                    errors.append(f"cp: cannot copy '{entry.path}': {e.strerror}\n")
+    return errors
+
+
+def _parse(tokens, name):
+    recursive = False
+    paths = []
+    for token in tokens[1:]:
+        if token.startswith("-") and len(token) > 1 and not paths:
+            flags = token[1:]
+            if flags.strip("rR"):
+                raise ValueError(f"{name}: invalid option -- '{flags.strip('rR')[0]}'")
+            recursive = True
+        else:
+            paths.append(token)
+    if len(paths) < 2:
+        raise ValueError(f"{name}: missing source or destination")
+    return recursive, paths[:-1], paths[-1]
+
+
+def _target(source, dest, several):
+    if os.path.isdir(dest):
+        return os.path.join(dest, os.path.basename(source.rstrip(os.sep)))
+    if several:
+        raise NotADirectoryError(errno.ENOTDIR, "target is not a directory", dest)
+    return dest
+
+
+def cp(tokens, input_bytes=None):
+    try:
+        recursive, sources, dest = _parse(tokens, "cp")
+    except ValueError as e:
+        return f"{e}\n".encode()
+
+    errors = []
+    for source in sources:
+        try:
+            target = _target(source, dest, len(sources) > 1)
+            if os.path.isdir(source):
+                if not recursive:
+                    errors.append(f"cp: -r not specified; omitting directory '{source}'\n")
+                    continue
+                errors.extend(copy_tree(source, target))
+            else:
+                copy_file(source, target)
+        except OSError as e:
+            errors.append(f"cp error: {e}\n")
+    return "".join(errors).encode()
+
+
+def mv(tokens, input_bytes=None):
+    # rename() when source and destination share a filesystem, otherwise
+    # an in-kernel copy followed by removing the source. Directories move
+    # with or without -r.
+    try:
+        _, sources, dest = _parse(tokens, "mv")
+    except ValueError as e:
+        return f"{e}\n".encode()
+
+    errors = []
+    for source in sources:
+        try:
+            target = _target(source, dest, len(sources) > 1)
+            try:
+                os.rename(source, target)
+                continue
+            except OSError as e:
+                if e.errno != errno.EXDEV:
+                    raise
+            if os.path.islink(source):
+                os.symlink(os.readlink(source), target)
+                os.remove(source)
+            elif os.path.isdir(source):
+                copy_errors = copy_tree(source, target)
+                if copy_errors:
+                    errors.extend(copy_errors)
+                    continue
+                shutil.rmtree(source)
+            else:
+                copy_file(source, target)
+                os.remove(source)
+        except OSError as e:
+            errors.append(f"mv error: {e}\n")
+    return "".join(errors).encode()
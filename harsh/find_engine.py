@@ -0,0 +1,284 @@
+import os
+import re
+import time
+import fnmatch
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import fsindex
+
+# find built on os.scandir. Entry types come from the directory listing
+# itself and stat() is only called when a predicate needs sizes or times,
+# using the DirEntry's cached result. Subdirectories are scanned concurrently
+# and paths are streamed out as each directory finishes, so output starts
+# at once but is not in a fixed order (set BASHAI_FIND_WORKERS=1 for a
+# sequential, depth-first walk). Trees covered by the fsindex are answered
+# from the index instead, after one revalidation pass; sizes and times are
+# still read from the disk, see fsindex.FreshEntry.
+
+FIND_WORKERS = int(os.environ.get("BASHAI_FIND_WORKERS", min(32, (os.cpu_count() or 1) * 4)))
+SIZE_UNITS = {"c": 1, "w": 2, "b": 512, "k": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+USAGE = (b"Usage: find [path...] [-maxdepth N] [-mindepth N] [-name PAT] [-iname PAT] "
+         b"[-type f|d|l] [-size [+-]N[ckMG]] [-mtime [+-]N] [-mmin [+-]N] [-newer FILE] "
+         b"[-prune] [-o] [-print]\n")
+
+
+class RootEntry:
+    # DirEntry look-alike for the starting paths
+    def __init__(self, path):
+        self.path = path
+        self.name = os.path.basename(path.rstrip(os.sep)) or path
+        self._stat = os.lstat(path)
+
+    def stat(self, follow_symlinks=False):
+        return self._stat
+
+    def is_dir(self, follow_symlinks=False):
+        return os.path.isdir(self.path) if follow_symlinks else _is_mode(self._stat, 0o040000)
+
+    def is_file(self, follow_symlinks=False):
+        return os.path.isfile(self.path) if follow_symlinks else _is_mode(self._stat, 0o100000)
+
+    def is_symlink(self):
+        return _is_mode(self._stat, 0o120000)
+
+
+def _is_mode(st, kind):
+    return (st.st_mode & 0o170000) == kind
+
+
+class FindOptions:
+    def __init__(self):
+        self.paths = []
+        self.maxdepth = None
+        self.mindepth = 0
+        # OR-groups of AND-ed terms; a term is a predicate(entry) -> bool,
+        # "prune" or "print"
+        self.groups = [[]]
+        self.explicit_print = False
+        # Some predicate looks at sizes or times
+        self.uses_stat = False
+
+
+def compare(spec):
+    # GNU numeric argument: +n is more than n, -n less than n, n exactly n
+    if spec.startswith("+"):
+        n = int(spec[1:])
+        return lambda v: v > n
+    if spec.startswith("-"):
+        n = int(spec[1:])
+        return lambda v: v < n
+    n = int(spec)
+    return lambda v: v == n
+
+
+def name_predicate(pattern, ignore_case=False):
+    # Compiled once instead of per entry
+    match = re.compile(fnmatch.translate(pattern), re.IGNORECASE if ignore_case else 0).match
+    return lambda entry: match(entry.name) is not None
+
+
+def type_predicate(kind):
+    if kind == "f":
+        return lambda entry: entry.is_file(follow_symlinks=False)
+    if kind == "d":
+        return lambda entry: entry.is_dir(follow_symlinks=False)
+    if kind == "l":
+        return lambda entry: entry.is_symlink()
+    raise ValueError(f"unknown argument to -type: {kind}")
+
+
+def size_predicate(spec):
+    unit = SIZE_UNITS.get(spec[-1])
+    if unit is None:
+        unit = 512
+    else:
+        spec = spec[:-1]
+    test = compare(spec)
+    # Sizes are rounded up to whole units, as GNU find does
+    return lambda entry: test(-(-entry.stat(follow_symlinks=False).st_size // unit))
+
+
+def age_predicate(spec, seconds):
+    test = compare(spec)
+    now = time.time()
+    return lambda entry: test(int((now - entry.stat(follow_symlinks=False).st_mtime) // seconds))
+
+
+def newer_predicate(path):
+    reference = os.stat(path).st_mtime_ns
+    return lambda entry: entry.stat(follow_symlinks=False).st_mtime_ns > reference
+
+
+def parse_args(tokens):
+    opts = FindOptions()
+    args = deque(tokens[1:])
+    while args and not args[0].startswith("-"):
+        opts.paths.append(args.popleft())
+
+    # Legacy form: `find path pattern`
+    if len(opts.paths) == 2 and not args and not os.path.isdir(opts.paths[1]):
+        opts.groups[0].append(name_predicate(opts.paths.pop()))
+    if not opts.paths:
+        opts.paths = ["."]
+
+    def value(option):
+        if not args:
+            raise ValueError(f"missing argument to `{option}'")
+        return args.popleft()
+
+    while args:
+        arg = args.popleft()
+        terms = opts.groups[-1]
+        if arg == "-maxdepth":
+            opts.maxdepth = int(value(arg))
+        elif arg == "-mindepth":
+            opts.mindepth = int(value(arg))
+        elif arg == "-name":
+            terms.append(name_predicate(value(arg)))
+        elif arg == "-iname":
+            terms.append(name_predicate(value(arg), ignore_case=True))
+        elif arg == "-type":
+            terms.append(type_predicate(value(arg)))
+        elif arg == "-size":
+            opts.uses_stat = True
+            terms.append(size_predicate(value(arg)))
+        elif arg == "-mtime":
+            opts.uses_stat = True
+            terms.append(age_predicate(value(arg), 86400))
+        elif arg == "-mmin":
+            opts.uses_stat = True
+            terms.append(age_predicate(value(arg), 60))
+        elif arg == "-newer":
+            opts.uses_stat = True
+            terms.append(newer_predicate(value(arg)))
+        elif arg == "-prune":
+            terms.append("prune")
+        elif arg == "-print":
+            terms.append("print")
+            opts.explicit_print = True
+        elif arg in ("-o", "-or"):
+            opts.groups.append([])
+        elif arg in ("-a", "-and"):
+            continue
+        else:
+            raise ValueError(f"unknown predicate `{arg}'")
+    return opts
+
+
+def evaluate(entry, opts):
+    # Returns (print, prune) for one entry
+    printed = pruned = False
+    for terms in opts.groups:
+        matched = True
+        for term in terms:
+            if term == "prune":
+                pruned = True
+            elif term == "print":
+                printed = True
+            elif not term(entry):
+                matched = False
+                break
+        if matched:
+            if not opts.explicit_print:
+                printed = True
+            break
+    return printed, pruned
+
+
+def visit(entry, depth, opts, out):
+    # Test one entry; returns True if the walk should descend into it
+    if depth >= opts.mindepth:
+        try:
+            printed, pruned = evaluate(entry, opts)
+        except OSError:
+            printed, pruned = False, False
+        if printed:
+            out.append(entry.path)
+    else:
+        pruned = False
+    if pruned or not entry.is_dir(follow_symlinks=False):
+        return False
+    return opts.maxdepth is None or depth < opts.maxdepth
+
+
+def scan(directory, depth, opts, tree=None):
+    # Scan one directory; returns (output lines, subdirectories to walk).
+    # tree is an fsindex.list_tree() listing to use instead of the disk.
+    out, subdirs = [], []
+    if tree is not None:
+        for entry in tree.get(directory, ()):
+            if opts.uses_stat:
+                entry = fsindex.FreshEntry(entry)
+            if visit(entry, depth, opts, out):
+                subdirs.append(entry.path)
+        return out, subdirs
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if visit(entry, depth, opts, out):
+                    subdirs.append(entry.path)
+    except OSError as e:
+        out.append(f"find: '{directory}': {e.strerror}")
+    return out, subdirs
+
+
+def _lines(out):
+    return ("\n".join(out) + "\n").encode()
+
+
+def find(tokens, chunks=None):
+    try:
+        opts = parse_args(tokens)
+    except (ValueError, OSError) as e:
+        yield f"find: {e}\n".encode() + USAGE
+        return
+
+    roots = []
+    for path in opts.paths:
+        try:
+            entry = RootEntry(path)
+        except OSError as e:
+            yield f"find: '{path}': {e.strerror}\n".encode()
+            continue
+        out = []
+        if visit(entry, 0, opts, out):
+            roots.append((path, 1))
+        if out:
+            yield _lines(out)
+
+    tree = None
+    if roots and all(fsindex.refresh(path) for path, _ in roots):
+        tree = {}
+        for path, _ in roots:
+            tree.update(fsindex.list_tree(path))
+
+    if tree is not None or FIND_WORKERS <= 1:
+        stack = list(reversed(roots))
+        while stack:
+            directory, depth = stack.pop()
+            out, subdirs = scan(directory, depth, opts, tree)
+            if out:
+                yield _lines(out)
+            stack.extend((d, depth + 1) for d in reversed(subdirs))
+        return
+
+    # Directories waiting to be scanned are kept depth-first so the backlog
+    # stays proportional to the tree's depth rather than its width
+    stack = list(reversed(roots))
+    pool = ThreadPoolExecutor(max_workers=FIND_WORKERS)
+    running = {}
+    try:
+        while stack or running:
+            while stack and len(running) < FIND_WORKERS * 2:
+                directory, depth = stack.pop()
+                running[pool.submit(scan, directory, depth, opts)] = depth
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                depth = running.pop(future)
+                out, subdirs = future.result()
+                if out:
+                    yield _lines(out)
+                stack.extend((d, depth + 1) for d in subdirs)
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
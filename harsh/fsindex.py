@@ -0,0 +1,519 @@
+import os
+import sys
+import time
+import struct
+import threading
+
+# Optional on-disk index of directory trees (path, type, size, mtime) so that
+# find, tree, locate and path completion can answer without walking the
+# filesystem. Nothing is indexed until `index <dir>` is run; paths outside an
+# indexed root always go to the filesystem.
+#
+# Freshness: a directory's mtime changes whenever an entry is added, removed
+# or renamed in it, so revalidating a tree costs one stat per directory
+# instead of a listing plus a stat per entry. On Linux an inotify watcher
+# (through ctypes, no extra packages) marks changed directories as they
+# change, and once a root is fully watched only those are re-read.
+# File sizes and mtimes are refreshed when their directory is re-read, or on
+# close-write events while the watcher is running.
+
+DB_PATH = os.path.expanduser(os.environ.get("BASHAI_FSINDEX_PATH", "~/.bashai_fsindex.db"))
+USE_INOTIFY = os.environ.get("BASHAI_FSINDEX_INOTIFY", "1") != "0"
+
+_conn = None
+_roots = None
+_lock = threading.RLock()
+_watcher = None
+
+
+def _connect(create=False):
+    global _conn
+    if _conn is None:
+        if not create and not os.path.exists(DB_PATH):
+            return None
+        import sqlite3
+        _conn = sqlite3.connect(DB_PATH, check_same_thread=False, isolation_level=None)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute("PRAGMA synchronous=NORMAL")
+        _conn.execute("CREATE TABLE IF NOT EXISTS roots (path TEXT PRIMARY KEY, indexed_at REAL)")
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "path TEXT PRIMARY KEY, parent TEXT, name TEXT, type TEXT, size INTEGER, mtime_ns INTEGER)"
+        )
+        _conn.execute("CREATE INDEX IF NOT EXISTS entries_parent ON entries(parent)")
+    return _conn
+
+
+def roots():
+    global _roots
+    with _lock:
+        if _roots is None:
+            conn = _connect()
+            _roots = [row[0] for row in conn.execute("SELECT path FROM roots")] if conn else []
+        return list(_roots)
+
+
+def covering_root(path):
+    path = os.path.abspath(path)
+    for root in roots():
+        if path == root or path.startswith(_prefix(root)):
+            return root
+    return None
+
+
+def _prefix(path):
+    return path.rstrip(os.sep) + os.sep
+
+
+def _subtree(path):
+    # Bounds for "every path strictly below path" as a range scan
+    prefix = _prefix(path)
+    return prefix, prefix[:-1] + chr(ord(os.sep) + 1)
+
+
+def _kind(entry):
+    if entry.is_symlink():
+        return "l"
+    if entry.is_dir(follow_symlinks=False):
+        return "d"
+    return "f"
+
+
+class IndexedEntry:
+    # DirEntry look-alike backed by an index row
+    __slots__ = ("path", "name", "kind", "size", "mtime_ns")
+
+    def __init__(self, path, name, kind, size, mtime_ns):
+        self.path = path
+        self.name = name
+        self.kind = kind
+        self.size = size
+        self.mtime_ns = mtime_ns
+
+    def is_dir(self, follow_symlinks=False):
+        return self.kind == "d"
+
+    def is_file(self, follow_symlinks=False):
+        return self.kind == "f"
+
+    def is_symlink(self):
+        return self.kind == "l"
+
+    def stat(self, follow_symlinks=False):
+        return StatResult(self.size, self.mtime_ns)
+
+
+class FreshEntry:
+    # IndexedEntry whose stat() comes from the disk. Writing to a file in
+    # place changes neither its directory's mtime nor, without the watcher,
+    # anything the index sees, so stored sizes and times can be stale; names
+    # and types cannot. Used wherever sizes or times are shown or compared.
+    __slots__ = ("entry", "path", "name", "_stat")
+
+    def __init__(self, entry):
+        self.entry = entry
+        self.path = entry.path
+        self.name = entry.name
+        self._stat = None
+
+    def stat(self, follow_symlinks=False):
+        if self._stat is None:
+            self._stat = os.lstat(self.path)
+        return self._stat
+
+    def is_dir(self, follow_symlinks=False):
+        return self.entry.is_dir(follow_symlinks)
+
+    def is_file(self, follow_symlinks=False):
+        return self.entry.is_file(follow_symlinks)
+
+    def is_symlink(self):
+        return self.entry.is_symlink()
+
+
+class StatResult:
+    __slots__ = ("st_size", "st_mtime_ns", "st_mtime")
+
+    def __init__(self, size, mtime_ns):
+        self.st_size = size
+        self.st_mtime_ns = mtime_ns
+        self.st_mtime = mtime_ns / 1e9
+
+
+def _sync_dir(conn, directory):
+    # Re-read one directory into the index. Returns the subdirectories that
+    # were not indexed before, which the caller still has to walk.
+    if _watcher:
+        _watcher.clean(directory)
+    try:
+        dir_stat = os.stat(directory)
+        with os.scandir(directory) as it:
+            rows = []
+            for entry in it:
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                rows.append((entry.path, directory, entry.name, _kind(entry), st.st_size, st.st_mtime_ns))
+    except OSError:
+        _delete_tree(conn, directory)
+        return []
+
+    known = {path: kind for path, kind in conn.execute("SELECT path, type FROM entries WHERE parent = ?", (directory,))}
+    present = {row[0]: row[3] for row in rows}
+    for path, kind in known.items():
+        if present.get(path) is None or kind == "d" and present[path] != "d":
+            _delete_tree(conn, path)
+
+    new_dirs = [row[0] for row in rows if row[3] == "d" and known.get(row[0]) != "d"]
+    conn.executemany("INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)", rows)
+    # Keep the row for the directory itself, but with the mtime just read
+    conn.execute(
+        "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, 'd', ?, ?)",
+        (directory, os.path.dirname(directory), os.path.basename(directory), dir_stat.st_size, dir_stat.st_mtime_ns),
+    )
+    # Existing subdirectories keep their old mtime until they are revalidated
+    return new_dirs
+
+
+def _delete_tree(conn, path):
+    low, high = _subtree(path)
+    conn.execute("DELETE FROM entries WHERE path = ? OR (path > ? AND path < ?)", (path, low, high))
+
+
+def _index_tree(conn, root):
+    # Full walk of a tree that is not in the index yet
+    stack = [root]
+    while stack:
+        directory = stack.pop()
+        if _watcher:
+            _watcher.add(directory)
+        stack.extend(_sync_dir(conn, directory))
+
+
+def index(path):
+    """Index the tree at path (or refresh it if it is already indexed)."""
+    root = os.path.abspath(path)
+    if not os.path.isdir(root):
+        raise NotADirectoryError(f"not a directory: {path}")
+    global _roots
+    with _lock:
+        conn = _connect(create=True)
+        _start_watcher()
+        conn.execute("BEGIN")
+        try:
+            if covering_root(root) is None:
+                # Roots nested inside the new one are absorbed by it
+                low, high = _subtree(root)
+                conn.execute("DELETE FROM roots WHERE path > ? AND path < ?", (low, high))
+                _index_tree(conn, root)
+            else:
+                _refresh_locked(conn, root)
+            conn.execute("INSERT OR REPLACE INTO roots VALUES (?, ?)", (covering_root(root) or root, time.time()))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        _roots = None
+        if _watcher and not _watcher.overflowed:
+            _watcher.watched.add(covering_root(root))
+
+
+def drop(path):
+    global _roots
+    root = os.path.abspath(path)
+    with _lock:
+        conn = _connect()
+        if conn is None or root not in roots():
+            return False
+        conn.execute("DELETE FROM roots WHERE path = ?", (root,))
+        _delete_tree(conn, root)
+        _roots = None
+        return True
+
+
+def refresh(path):
+    """Bring the part of the index under path up to date."""
+    path = os.path.abspath(path)
+    with _lock:
+        conn = _connect()
+        if conn is None or covering_root(path) is None:
+            return False
+        _start_watcher()
+        conn.execute("BEGIN")
+        try:
+            _refresh_locked(conn, path)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return True
+
+
+def _refresh_locked(conn, path):
+    root = covering_root(path)
+    if _watcher and root in _watcher.watched and not _watcher.overflowed:
+        for directory in _watcher.take_dirty():
+            if conn.execute("SELECT 1 FROM entries WHERE path = ?", (directory,)).fetchone():
+                for new_dir in _sync_dir(conn, directory):
+                    _index_tree(conn, new_dir)
+        return
+
+    # No (complete) watcher: compare every indexed directory's mtime
+    if _watcher:
+        _watcher.take_dirty()
+        _watcher.overflowed = False
+    low, high = _subtree(path)
+    dirs = conn.execute(
+        "SELECT path, mtime_ns FROM entries WHERE type = 'd' AND (path = ? OR (path > ? AND path < ?))",
+        (path, low, high),
+    ).fetchall()
+    for directory, mtime_ns in dirs:
+        if _watcher:
+            _watcher.add(directory)
+        try:
+            current = os.stat(directory).st_mtime_ns
+        except OSError:
+            _delete_tree(conn, directory)
+            continue
+        if current != mtime_ns:
+            for new_dir in _sync_dir(conn, directory):
+                _index_tree(conn, new_dir)
+    if _watcher and not _watcher.overflowed:
+        _watcher.watched.add(root)
+
+
+def list_dir(path, display_path=None):
+    """Entries of one indexed directory sorted by name, or None when the
+    directory is not covered by the index (the caller lists it itself)."""
+    directory = os.path.abspath(path)
+    if covering_root(directory) is None:
+        return None
+    display_path = path if display_path is None else display_path
+    with _lock:
+        conn = _connect()
+        row = conn.execute("SELECT mtime_ns FROM entries WHERE path = ? AND type = 'd'", (directory,)).fetchone()
+        if row is None:
+            return None
+        _revalidate_dir(conn, directory, row[0])
+        rows = conn.execute(
+            "SELECT name, type, size, mtime_ns FROM entries WHERE parent = ? ORDER BY name", (directory,)
+        ).fetchall()
+    return [IndexedEntry(os.path.join(display_path, name), name, kind, size, mtime_ns)
+            for name, kind, size, mtime_ns in rows]
+
+
+def list_tree(path):
+    """Every indexed directory under path mapped to its entries, keyed by
+    the directory's path spelled the way path was. One range scan instead
+    of a query per directory; call refresh() first."""
+    directory = os.path.abspath(path)
+    low, high = _subtree(directory)
+    tree = {}
+    with _lock:
+        conn = _connect()
+        rows = conn.execute(
+            "SELECT parent, name, type, size, mtime_ns FROM entries WHERE path > ? AND path < ?", (low, high)
+        )
+        cut = len(directory)
+        # parent -> (key, prefix of its entries' paths), spelled the way
+        # os.scandir would: "d/" and "/" get no doubled separator
+        spelled = {}
+        for parent, name, kind, size, mtime_ns in rows:
+            names = spelled.get(parent)
+            if names is None:
+                rest = parent[cut:].lstrip(os.sep)
+                display_dir = os.path.join(path, rest) if rest else path
+                names = spelled[parent] = (display_dir, os.path.join(display_dir, ""))
+            display_dir, prefix = names
+            entry = IndexedEntry(prefix + name, name, kind, size, mtime_ns)
+            entries = tree.get(display_dir)
+            if entries is None:
+                tree[display_dir] = [entry]
+            else:
+                entries.append(entry)
+    return tree
+
+
+def _revalidate_dir(conn, directory, mtime_ns):
+    dirty = bool(_watcher) and _watcher.is_dirty(directory)
+    try:
+        stale = os.stat(directory).st_mtime_ns != mtime_ns
+    except OSError:
+        stale = True
+    if stale or dirty:
+        conn.execute("BEGIN")
+        try:
+            for new_dir in _sync_dir(conn, directory):
+                _index_tree(conn, new_dir)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+
+def locate(pattern, ignore_case=False):
+    # Substring match on the whole path, or a glob on the name when the
+    # pattern has wildcards (like locate(1))
+    with _lock:
+        conn = _connect()
+        if conn is None:
+            return []
+        if any(c in pattern for c in "*?["):
+            column = "lower(name)" if ignore_case else "name"
+            query = f"SELECT path FROM entries WHERE {column} GLOB ? ORDER BY path"
+        else:
+            column = "lower(path)" if ignore_case else "path"
+            query = f"SELECT path FROM entries WHERE instr({column}, ?) > 0 ORDER BY path"
+        return [row[0] for row in conn.execute(query, (pattern.lower() if ignore_case else pattern,))]
+
+
+def stats():
+    with _lock:
+        conn = _connect()
+        if conn is None:
+            return []
+        out = []
+        for root in roots():
+            low, high = _subtree(root)
+            count = conn.execute("SELECT count(*) FROM entries WHERE path > ? AND path < ?", (low, high)).fetchone()[0]
+            out.append((root, count))
+        return out
+
+
+class InotifyWatcher:
+    # Marks directories dirty as the kernel reports changes in them
+    IN_ATTRIB = 0x004
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_DELETE_SELF = 0x400
+    IN_Q_OVERFLOW = 0x4000
+    IN_IGNORED = 0x8000
+    IN_ONLYDIR = 0x01000000
+    IN_CLOEXEC = 0o2000000
+    MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+            | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_ONLYDIR)
+    EVENT = struct.Struct("iIII")
+
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+        self.available = False
+        self.overflowed = False
+        self.watched = set()
+        self.wds = {}
+        self.paths = {}
+        self.dirty = set()
+        self.dirty_lock = threading.Lock()
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.add_watch = libc.inotify_add_watch
+        self.add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(self.IN_CLOEXEC)
+        if self.fd < 0:
+            return
+        self.available = True
+        threading.Thread(target=self._read_loop, daemon=True).start()
+
+    def add(self, directory):
+        if not self.available or directory in self.paths:
+            return
+        wd = self.add_watch(self.fd, os.fsencode(directory), self.MASK)
+        if wd < 0:
+            # Usually fs.inotify.max_user_watches; fall back to mtimes
+            self.watched.discard(covering_root(directory))
+            self.overflowed = True
+            return
+        self.wds[wd] = directory
+        self.paths[directory] = wd
+
+    def is_dirty(self, directory):
+        with self.dirty_lock:
+            return directory in self.dirty or self.overflowed
+
+    def clean(self, directory):
+        with self.dirty_lock:
+            self.dirty.discard(directory)
+
+    def take_dirty(self):
+        with self.dirty_lock:
+            dirty, self.dirty = self.dirty, set()
+        return sorted(dirty)
+
+    def _read_loop(self):
+        while True:
+            try:
+                data = os.read(self.fd, 65536)
+            except OSError:
+                return
+            offset = 0
+            with self.dirty_lock:
+                while offset < len(data):
+                    wd, mask, _, length = self.EVENT.unpack_from(data, offset)
+                    offset += self.EVENT.size + length
+                    if mask & self.IN_Q_OVERFLOW:
+                        self.overflowed = True
+                        continue
+                    directory = self.wds.get(wd)
+                    if directory is None:
+                        continue
+                    if mask & (self.IN_IGNORED | self.IN_DELETE_SELF):
+                        self.wds.pop(wd, None)
+                        self.paths.pop(directory, None)
+                        self.dirty.add(os.path.dirname(directory))
+                        continue
+                    self.dirty.add(directory)
+
+
+def _start_watcher():
+    global _watcher
+    if _watcher is None and USE_INOTIFY and sys.platform.startswith("linux"):
+        try:
+            _watcher = InotifyWatcher()
+        except (OSError, AttributeError):
+            _watcher = False
+    return _watcher or None
+
+
+def cmd_index(tokens, chunks=None):
+    # index [path...]       index or refresh trees
+    # index -l              list indexed roots
+    # index --drop path     forget a tree
+    args = tokens[1:]
+    if args[:1] == ["-l"]:
+        for root, count in stats():
+            yield f"{root}\t{count} entries\n".encode()
+        return
+    if args[:1] == ["--drop"]:
+        for path in args[1:]:
+            if not drop(path):
+                yield f"index: {path}: not indexed\n".encode()
+        return
+    for path in args or ["."]:
+        start = time.perf_counter()
+        try:
+            index(path)
+        except OSError as e:
+            yield f"index error: {e}\n".encode()
+            continue
+        yield f"Indexed {os.path.abspath(path)} in {(time.perf_counter() - start) * 1000:.0f} ms\n".encode()
+
+
+def cmd_locate(tokens, chunks=None):
+    args = tokens[1:]
+    ignore_case = "-i" in args
+    patterns = [a for a in args if a != "-i"]
+    if not patterns:
+        yield b"Usage: locate [-i] pattern\n"
+        return
+    if not roots():
+        yield b"locate: nothing is indexed yet, run `index <dir>` first\n"
+        return
+    for root in roots():
+        refresh(root)
+    for pattern in patterns:
+        paths = locate(pattern, ignore_case)
+        if paths:
+            yield ("\n".join(paths) + "\n").encode()
@@ -0,0 +1,364 @@
+import os
+import re
+import fnmatch
+import functools
+import multiprocessing
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+# Streaming grep: input is read in large binary chunks and searched with one
+# compiled bytes regex per chunk, so lines are never decoded and memory does
+# not depend on file size. Only whole lines are searched; the partial line at
+# the end of a chunk is carried over to the next one.
+
+READ_SIZE = 1024 * 1024
+BINARY_SNIFF = 8192
+IGNORE_FILES = (".grepignore", ".gitignore")
+ALWAYS_IGNORED = (".git", ".hg", ".svn", "__pycache__")
+
+# Multi-file searches are spread over a pool: threads, unless the regex
+# itself is likely to be the bottleneck (backreferences, lookarounds,
+# quantified groups, several unbounded wildcards), where processes pay for
+# their startup. BASHAI_GREP_POOL forces "thread" or "process". Processes
+# are started by a forkserver (spawn where there is none) rather than
+# forked from a shell whose pipeline threads may hold locks.
+GREP_WORKERS = int(os.environ.get("BASHAI_GREP_WORKERS", os.cpu_count() or 1))
+GREP_POOL = os.environ.get("BASHAI_GREP_POOL", "auto")
+EXPENSIVE_REGEX = re.compile(r"\\[1-9]|\(\?<?[=!]|\)[*+{]")
+UNBOUNDED = re.compile(r"(?<!\\)[.\]][*+]")
+USAGE = b"Usage: grep [-icnlvrFE] [-e pattern] pattern [file...]\n"
+
+
+class GrepOptions:
+    def __init__(self):
+        self.patterns = []
+        self.files = []
+        self.ignore_case = False
+        self.invert = False
+        self.count = False
+        self.files_with_matches = False
+        self.line_numbers = False
+        self.recursive = False
+        self.fixed = False
+
+
+def parse_args(tokens):
+    opts = GrepOptions()
+    args = iter(tokens[1:])
+    positional = []
+    for arg in args:
+        if arg == "--":
+            positional.extend(args)
+            break
+        if arg == "-e":
+            pattern = next(args, None)
+            if pattern is None:
+                raise ValueError("option requires an argument -- 'e'")
+            opts.patterns.append(pattern)
+        elif arg.startswith("-") and len(arg) > 1:
+            for flag in arg[1:]:
+                if flag == "i":
+                    opts.ignore_case = True
+                elif flag == "v":
+                    opts.invert = True
+                elif flag == "c":
+                    opts.count = True
+                elif flag == "l":
+                    opts.files_with_matches = True
+                elif flag == "n":
+                    opts.line_numbers = True
+                elif flag in "rR":
+                    opts.recursive = True
+                elif flag == "F":
+                    opts.fixed = True
+                elif flag == "E":
+                    opts.fixed = False
+                else:
+                    raise ValueError(f"invalid option -- '{flag}'")
+        else:
+            positional.append(arg)
+
+    if not opts.patterns:
+        if not positional:
+            raise ValueError("missing pattern")
+        opts.patterns.append(positional.pop(0))
+    opts.files = positional
+    return opts
+
+
+@functools.lru_cache(maxsize=128)
+def compile_patterns(patterns, fixed=False, ignore_case=False):
+    # Several patterns become one alternation so each chunk is scanned once.
+    # Fixed strings are escaped and ordered longest first.
+    if fixed:
+        parts = [re.escape(p) for p in sorted(patterns, key=len, reverse=True)]
+    else:
+        parts = [f"(?:{p})" for p in patterns]
+    flags = re.MULTILINE | (re.IGNORECASE if ignore_case else 0)
+    return re.compile("|".join(parts).encode(), flags)
+
+
+def match_spans(buf, regex, invert=False):
+    # Yield (start, end) of every selected line in a buffer of whole lines;
+    # end includes the newline when there is one.
+    size = len(buf)
+    if invert:
+        pos = 0
+        while pos < size:
+            end = buf.find(b"\n", pos)
+            end = size if end == -1 else end + 1
+            if not regex.search(buf, pos, end - 1 if buf[end - 1:end] == b"\n" else end):
+                yield pos, end
+            pos = end
+        return
+
+    pos = 0
+    search = regex.search
+    while pos < size:
+        m = search(buf, pos)
+        if m is None or (m.start() == size and buf.endswith(b"\n")):
+            return
+        start = buf.rfind(b"\n", 0, m.start()) + 1
+        line_end = buf.find(b"\n", m.start())
+        line_end = size if line_end == -1 else line_end
+        end = min(line_end + 1, size)
+        # The whole-buffer search can match the newline itself or run over
+        # it into the next line ([^a], \s, \W); such a hit only counts if
+        # the line matches on its own
+        if m.end() > line_end and not search(buf, start, line_end):
+            pos = end
+            continue
+        yield start, end
+        pos = end
+
+
+def iter_buffers(chunks):
+    # Regroup a chunk stream into buffers that end on a line boundary
+    carry = []
+    for chunk in chunks:
+        if not chunk:
+            continue
+        cut = chunk.rfind(b"\n")
+        if cut == -1:
+            carry.append(chunk)
+            continue
+        carry.append(chunk[:cut + 1])
+        yield b"".join(carry)
+        carry = [chunk[cut + 1:]] if cut + 1 < len(chunk) else []
+    if carry:
+        yield b"".join(carry)
+
+
+def iter_file_chunks(f):
+    while True:
+        chunk = f.read(READ_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+
+def grep_stream(chunks, regex, opts, name="(standard input)", show_name=False):
+    # Grep one input and yield output byte blocks. Lines are prefixed with
+    # the input's name when several files are searched.
+    prefix = name.encode() + b":" if show_name else b""
+    matched = 0
+    lineno = 1
+    for buf in iter_buffers(chunks):
+        out = []
+        counted_to = 0
+        for start, end in match_spans(buf, regex, opts.invert):
+            matched += 1
+            if opts.files_with_matches:
+                yield name.encode() + b"\n"
+                return
+            if opts.count:
+                continue
+            line = buf[start:end]
+            if not line.endswith(b"\n"):
+                line += b"\n"
+            if opts.line_numbers:
+                lineno += buf.count(b"\n", counted_to, start)
+                counted_to = start
+                out.append(prefix + str(lineno).encode() + b":" + line)
+            else:
+                out.append(prefix + line)
+        if opts.line_numbers:
+            lineno += buf.count(b"\n", counted_to)
+        if out:
+            yield b"".join(out)
+    if opts.count:
+        yield prefix + str(matched).encode() + b"\n"
+
+
+def load_ignore_patterns(root):
+    patterns = []
+    for name in IGNORE_FILES:
+        try:
+            with open(os.path.join(root, name), "r", encoding="utf-8", errors="ignore") as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith(("#", "!")):
+                        patterns.append(line)
+        except OSError:
+            continue
+    return patterns
+
+
+def is_ignored(name, rel_path, is_dir, patterns):
+    if name in ALWAYS_IGNORED:
+        return True
+    for pattern in patterns:
+        if pattern.endswith("/"):
+            if not is_dir:
+                continue
+            pattern = pattern.rstrip("/")
+        if pattern.startswith("/"):
+            if fnmatch.fnmatch(rel_path, pattern.lstrip("/")):
+                return True
+        elif fnmatch.fnmatch(name, pattern) or fnmatch.fnmatch(rel_path, pattern):
+            return True
+    return False
+
+
+def walk_files(paths):
+    # Files under each path in sorted order, skipping whatever the root's
+    # ignore files exclude
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path
+            continue
+        patterns = load_ignore_patterns(path)
+        stack = [path]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as it:
+                    entries = sorted(it, key=lambda e: e.name)
+            except OSError:
+                continue
+            subdirs = []
+            for entry in entries:
+                rel_path = os.path.relpath(entry.path, path)
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if is_ignored(entry.name, rel_path, is_dir, patterns):
+                    continue
+                if is_dir:
+                    subdirs.append(entry.path)
+                elif entry.is_file():
+                    yield entry.path
+            # Depth-first, in name order
+            stack.extend(reversed(subdirs))
+
+
+def grep_file(path, regex, opts, show_name):
+    # Search one file and return its whole output; runs in a pool worker
+    try:
+        f = open(path, "rb")
+    except OSError as e:
+        return f"grep error: {e}\n".encode()
+    with f:
+        head = f.read(BINARY_SNIFF)
+        if opts.recursive and b"\0" in head:
+            return b""
+        chunks = iter_file_chunks(f)
+        return b"".join(grep_stream(_prepend(head, chunks), regex, opts, path, show_name))
+
+
+def _prepend(first, chunks):
+    if first:
+        yield first
+    yield from chunks
+
+
+def expensive(pattern):
+    return EXPENSIVE_REGEX.search(pattern) is not None or len(UNBOUNDED.findall(pattern)) > 1
+
+
+def use_processes(regex, opts):
+    if GREP_POOL in ("thread", "process"):
+        return GREP_POOL == "process"
+    if GREP_WORKERS < 2 or opts.fixed:
+        return False
+    return any(expensive(p) for p in opts.patterns)
+
+
+def process_pool(workers):
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+
+def grep_files(files, regex, opts, show_names):
+    # Search files on a worker pool, yielding each file's output in input
+    # order as soon as it and every file before it are done. At most a few
+    # results per worker are held at once.
+    if use_processes(regex, opts):
+        pool = process_pool(GREP_WORKERS)
+    else:
+        pool = ThreadPoolExecutor(max_workers=GREP_WORKERS)
+    window = GREP_WORKERS * 4
+    pending = deque()
+    try:
+        for path in files:
+            pending.append(pool.submit(grep_file, path, regex, opts, show_names))
+            while len(pending) >= window or (pending and pending[0].done()):
+                output = pending.popleft().result()
+                if output:
+                    yield output
+        while pending:
+            output = pending.popleft().result()
+            if output:
+                yield output
+    finally:
+        # Also reached when the consumer stops early (e.g. `grep -r x | head`)
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def grep(tokens, chunks=None):
+    try:
+        opts = parse_args(tokens)
+    except ValueError as e:
+        yield f"grep: {e}\n".encode() + USAGE
+        return
+
+    try:
+        regex = compile_patterns(tuple(opts.patterns), opts.fixed, opts.ignore_case)
+    except re.error as e:
+        yield f"grep: invalid pattern: {e}\n".encode()
+        return
+
+    if not opts.files:
+        if opts.recursive:
+            opts.files = ["."]
+        elif chunks is not None:
+            yield from grep_stream(chunks, regex, opts)
+            return
+        else:
+            yield b"grep error: no input or file provided\n"
+            return
+
+    show_names = opts.recursive or len(opts.files) > 1
+    if not show_names:
+        path = opts.files[0]
+        if os.path.isdir(path):
+            yield f"grep: {path}: Is a directory\n".encode()
+            return
+        try:
+            f = open(path, "rb")
+        except OSError as e:
+            yield f"grep error: {e}\n".encode()
+            return
+        with f:
+            yield from grep_stream(iter_file_chunks(f), regex, opts, path)
+        return
+
+    if opts.recursive:
+        files = walk_files(opts.files)
+    else:
+        files = []
+        for path in opts.files:
+            if os.path.isdir(path):
+                yield f"grep: {path}: Is a directory\n".encode()
+            else:
+                files.append(path)
+    yield from grep_files(files, regex, opts, show_names)
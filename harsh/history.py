@@ -1 +1,322 @@
-command_history = []
\ No newline at end of file
+import os
+import re
+import threading
+from array import array
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are still atomic, compaction is not locked
+    fcntl = None
+
+# Persistent command history.
+#
+# Storage: one command per line in HISTORY_PATH. Every command is appended
+# with a single O_APPEND write, so a crash loses at most that line and
+# shells running side by side never interleave partial lines. When the file
+# grows past HISTORY_SIZE by a quarter it is compacted: older duplicates are
+# dropped, the newest HISTORY_SIZE commands are kept, and the result is
+# written to a temporary file and renamed over the original. A lock file
+# (shared for appends, exclusive for compaction) keeps another shell from
+# appending to the old file while it is being replaced.
+#
+# Search: every entry is indexed by its trigrams and its characters, with
+# postings in entry order. A query walks the postings of its rarest gram
+# from the newest entry backwards and checks each candidate, so the common
+# case (the newest match) touches a handful of entries however long the
+# history is. Repeated commands only count at their latest position. The
+# index is built lazily (or in the background, see warm_up) and extended on
+# each search.
+
+HISTORY_PATH = os.path.expanduser(os.environ.get("BASHAI_HISTFILE", "~/.bashai_history"))
+HISTORY_SIZE = int(os.environ.get("BASHAI_HISTSIZE", "100000"))
+SHOW_DEFAULT = 50
+
+
+def _trigrams(text):
+    return set(map("".join, zip(text, text[1:], text[2:])))
+
+
+class History:
+    def __init__(self, path=HISTORY_PATH, size=HISTORY_SIZE):
+        self.path = path
+        self.size = size
+        self.entries = None
+        self._latest = {}
+        self._grams = {}
+        self._indexed = 0
+        self._torn = False
+        self._lock = threading.RLock()
+
+    # list interface used by the rest of the shell
+
+    def append(self, command):
+        command = command.replace("\n", " ").strip()
+        with self._lock:
+            self._load()
+            if not command or (self.entries and self.entries[-1] == command):
+                return
+            self.entries.append(command)
+            self._latest[command] = len(self.entries) - 1
+            self._write(command)
+            if len(self.entries) > self.size + self.size // 4:
+                self.compact()
+
+    def __iter__(self):
+        with self._lock:
+            self._load()
+            return iter(list(self.entries))
+
+    def __len__(self):
+        with self._lock:
+            self._load()
+            return len(self.entries)
+
+    def __getitem__(self, index):
+        with self._lock:
+            self._load()
+            return self.entries[index]
+
+    def tail(self, count):
+        with self._lock:
+            self._load()
+            start = max(0, len(self.entries) - count)
+            return list(enumerate(self.entries[start:], start + 1))
+
+    # storage
+
+    def _lock_file(self, exclusive):
+        if fcntl is None:
+            return None
+        fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        return fd
+
+    def _unlock_file(self, fd):
+        if fd is not None:
+            os.close(fd)
+
+    def _read_file(self):
+        try:
+            with open(self.path, "r", encoding="utf-8", errors="replace") as f:
+                data = f.read()
+        except OSError:
+            return []
+        lines = data.split("\n")
+        # A last line without its newline was cut off mid-write
+        self._torn = bool(lines[-1])
+        return [line for line in lines[:-1] if line]
+
+    def _load(self):
+        if self.entries is not None:
+            return
+        self.entries = self._read_file()[-self.size:]
+        self._latest = {command: i for i, command in enumerate(self.entries)}
+
+    def _write(self, command):
+        lock = None
+        try:
+            lock = self._lock_file(exclusive=False)
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o600)
+            try:
+                data = (command + "\n").encode("utf-8", errors="replace")
+                if self._torn:
+                    # Terminate the cut-off line so it stays on its own
+                    data = b"\n" + data
+                    self._torn = False
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+        finally:
+            self._unlock_file(lock)
+
+    def compact(self):
+        """Rewrite the file without older duplicates, capped at size."""
+        with self._lock:
+            lock = None
+            try:
+                lock = self._lock_file(exclusive=True)
+                # Re-read so commands appended by other shells are kept
+                kept = _dedupe(self._read_file())[-self.size:]
+                tmp = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write("".join(line + "\n" for line in kept))
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+            except OSError:
+                return
+            finally:
+                self._unlock_file(lock)
+            self.entries = kept
+            self._latest = {command: i for i, command in enumerate(kept)}
+            self._grams = {}
+            self._indexed = 0
+
+    def clear(self):
+        with self._lock:
+            lock = self._lock_file(exclusive=True)
+            try:
+                open(self.path, "w").close()
+            except OSError:
+                pass
+            finally:
+                self._unlock_file(lock)
+            self.entries = []
+            self._latest = {}
+            self._grams = {}
+            self._indexed = 0
+
+    # index and search
+
+    def _index(self):
+        # Index entries added since the last call
+        _add_postings(self._grams, self.entries, self._latest, self._indexed, len(self.entries))
+        self._indexed = len(self.entries)
+
+    def warm_up(self):
+        threading.Thread(target=self._warm, daemon=True).start()
+
+    def _warm(self):
+        # The postings are built without the lock, so the prompt can append
+        # meanwhile, and merged in under it. Appends only add to the end of
+        # the list; compact() and clear() replace it, and then the work is
+        # thrown away, as it is when a search has indexed the entries first.
+        with self._lock:
+            self._load()
+            entries, latest = self.entries, self._latest
+            start, end = self._indexed, len(entries)
+        grams = {}
+        _add_postings(grams, entries, latest, start, end)
+        with self._lock:
+            if self.entries is not entries or self._indexed != start:
+                return
+            for gram, posting in grams.items():
+                existing = self._grams.get(gram)
+                if existing is None:
+                    self._grams[gram] = posting
+                else:
+                    existing.extend(posting)
+            self._indexed = end
+
+    def _candidates(self, grams):
+        # Newest-first numbers of the entries that may contain every gram:
+        # the postings of the rarest one
+        postings = []
+        for gram in grams:
+            posting = self._grams.get(gram)
+            if posting is None:
+                return ()
+            postings.append(posting)
+        if not postings:
+            return range(len(self.entries) - 1, -1, -1)
+        return reversed(min(postings, key=len))
+
+    def search(self, query, mode="substring", limit=None):
+        """(number, command) pairs, newest first, each command once.
+
+        mode is "substring", "prefix" or "fuzzy" (the query's characters in
+        order, anything in between).
+        """
+        if mode == "fuzzy":
+            pattern = re.compile(".*?".join(map(re.escape, query)))
+            match = lambda command: pattern.search(command) is not None
+            # Only the characters narrow down fuzzy candidates
+            grams = set(query)
+        else:
+            match = (lambda command: command.startswith(query)) if mode == "prefix" \
+                else (lambda command: query in command)
+            grams = _trigrams(query) or set(query)
+        results = []
+        with self._lock:
+            self._load()
+            self._index()
+            for i in self._candidates(grams):
+                command = self.entries[i]
+                if self._latest.get(command) != i or not match(command):
+                    continue
+                results.append((i + 1, command))
+                if limit is not None and len(results) >= limit:
+                    break
+        return results
+
+    def find(self, query, mode="substring"):
+        found = self.search(query, mode, limit=1)
+        return found[0][1] if found else None
+
+    def expand(self, line):
+        """Expand a leading !event designator; returns (line, error)."""
+        if not line.startswith("!") or len(line) == 1 or line[1] in " \t=(":
+            return line, None
+        event, sep, rest = line[1:].partition(" ")
+        rest = sep + rest
+        command = None
+        with self._lock:
+            self._load()
+            count = len(self.entries)
+            if event == "!":
+                command = self.entries[-1] if count else None
+            elif event.lstrip("-").isdigit():
+                n = int(event)
+                index = n - 1 if n > 0 else count + n
+                command = self.entries[index] if 0 <= index < count and n != 0 else None
+            elif event.startswith("?"):
+                command = self.find(event[1:].rstrip("?"))
+            else:
+                command = self.find(event, mode="prefix")
+        if command is None:
+            return None, f"{line[:len(event) + 1]}: event not found"
+        return command + rest, None
+
+
+def _add_postings(grams, entries, latest, start, end):
+    # Older copies of a repeated command can never match, so only its latest
+    # position is indexed. A command repeated past end has moved on and is
+    # indexed there.
+    for i in range(start, end):
+        command = entries[i]
+        if latest[command] != i:
+            continue
+        keys = _trigrams(command)
+        keys.update(command)
+        for gram in keys:
+            posting = grams.get(gram)
+            if posting is None:
+                posting = grams[gram] = array("I")
+            posting.append(i)
+
+
+def _dedupe(lines):
+    # Keep the last occurrence of each command, in order
+    last = {line: i for i, line in enumerate(lines)}
+    return [line for i, line in enumerate(lines) if last[line] == i]
+
+
+command_history = History()
+
+
+def cmd_history(tokens, input_bytes=None):
+    # history [n]         last n commands
+    # history -s|-p|-f q  substring, prefix or fuzzy search, newest first
+    # history -c          clear
+    # history -w          compact the history file now
+    args = tokens[1:]
+    if args[:1] == ["-c"]:
+        command_history.clear()
+        return b""
+    if args[:1] == ["-w"]:
+        command_history.compact()
+        return b""
+    modes = {"-s": "substring", "-p": "prefix", "-f": "fuzzy"}
+    if args and args[0] in modes:
+        if len(args) < 2:
+            return b"Usage: history [n] | history -s|-p|-f text | history -c | history -w\n"
+        rows = command_history.search(" ".join(args[1:]), modes[args[0]], limit=SHOW_DEFAULT)[::-1]
+    else:
+        try:
+            count = int(args[0]) if args else SHOW_DEFAULT
+        except ValueError:
+            return f"history: {args[0]}: numeric argument required\n".encode()
+        rows = command_history.tail(count)
+    return "".join(f"{idx}: {cmd}\n" for idx, cmd in rows).encode()
@@ -0,0 +1,390 @@
+import os
+import sys
+import time
+import signal
+import threading
+from collections import deque
+
+# Job control. On POSIX every background pipeline is forked into its own
+# process group, so `kill %n` reaches the whole pipeline, `fg` can hand it
+# the terminal and Ctrl+Z / Ctrl+C in the foreground go to the job and not
+# to the shell. A SIGCHLD handler reaps only the pids of known jobs (never
+# the shell's own subprocess.Popen children) with os.wait4, which also gives
+# the job's CPU time and peak RSS. Finished jobs are reported once at the
+# next prompt or by `jobs`, then dropped from the table, so the table only
+# ever holds live jobs. The handler only records what wait4 returned; the
+# jobs are updated from those records by update(), outside the handler, so
+# the table never changes under code that is walking it. On Windows jobs are threads, as before, and with the
+# asyncio core (async_executor.py) they are futures of tasks on its loop.
+
+POSIX = os.name == "posix"
+
+table = {}
+_by_pid = {}
+_lock = threading.RLock()
+_current = None
+# (pid, wait status or None if already reaped, rusage) from the handler
+_reaped = deque()
+
+
+class Job:
+    def __init__(self, job_id, command):
+        self.id = job_id
+        self.command = command
+        self.pid = None
+        self.thread = None
+        self.future = None
+        self.status = "Running"
+        self.started = time.time()
+        self.ended = None
+        self.cpu = None
+        self.maxrss = None
+
+    @property
+    def finished(self):
+        return self.ended is not None
+
+    def wall(self):
+        return (self.ended or time.time()) - self.started
+
+
+def _next_id():
+    job_id = 1
+    while job_id in table:
+        job_id += 1
+    return job_id
+
+
+def start(command, target):
+    """Run target() as a background job and return the Job."""
+    global _current
+    with _lock:
+        job = Job(_next_id(), command)
+        table[job.id] = job
+        _current = job.id
+
+    if not POSIX:
+        def run():
+            try:
+                target()
+            finally:
+                job.ended = time.time()
+                job.status = "Done"
+        job.thread = threading.Thread(target=run, daemon=True)
+        job.thread.start()
+        return job
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    pid = os.fork()
+    if pid == 0:
+        code = 0
+        try:
+            os.setpgid(0, 0)
+            for sig in (signal.SIGINT, signal.SIGQUIT, signal.SIGTSTP, signal.SIGTTIN, signal.SIGTTOU, signal.SIGCHLD):
+                signal.signal(sig, signal.SIG_DFL)
+            target()
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else 1
+        except BaseException:
+            code = 1
+        finally:
+            try:
+                sys.stdout.flush()
+                sys.stderr.flush()
+            finally:
+                os._exit(code)
+
+    try:
+        # Also done here so the group exists before anyone signals it
+        os.setpgid(pid, pid)
+    except OSError:
+        pass
+    with _lock:
+        job.pid = pid
+        _by_pid[pid] = job
+    return job
+
+
+def add_future(command, future):
+    """Track a pipeline scheduled on the asyncio core as a job."""
+    global _current
+    with _lock:
+        job = Job(_next_id(), command)
+        job.future = future
+        table[job.id] = job
+        _current = job.id
+
+    def done(f):
+        if f.cancelled():
+            job.status = "Killed"
+        elif f.exception() is not None:
+            job.status = "Exit 1"
+        elif f.result():
+            job.status = f"Exit {f.result()}"
+        else:
+            job.status = "Done"
+        job.ended = time.time()
+
+    future.add_done_callback(done)
+    return job
+
+
+def _join(job):
+    # Wait for a thread or future job; Ctrl+C gives up waiting
+    try:
+        if job.future is not None:
+            job.future.result()
+        else:
+            job.thread.join()
+    except KeyboardInterrupt:
+        raise
+    except BaseException:
+        pass
+
+
+def _record(job, status, rusage):
+    if os.WIFSTOPPED(status):
+        job.status = "Stopped"
+        return
+    if os.WIFCONTINUED(status):
+        job.status = "Running"
+        return
+    if os.WIFSIGNALED(status):
+        job.status = f"Killed ({signal.Signals(os.WTERMSIG(status)).name})"
+    else:
+        code = os.WEXITSTATUS(status)
+        job.status = "Done" if code == 0 else f"Exit {code}"
+    job.ended = time.time()
+    job.cpu = rusage.ru_utime + rusage.ru_stime
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    job.maxrss = rusage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    _by_pid.pop(job.pid, None)
+
+
+def reap(*_):
+    # SIGCHLD handler: poll each live job pid without blocking and queue
+    # what was found; takes no lock and touches no job
+    flags = os.WNOHANG | os.WUNTRACED | getattr(os, "WCONTINUED", 0)
+    for pid in list(_by_pid):
+        try:
+            got, status, rusage = os.wait4(pid, flags)
+        except ChildProcessError:
+            _reaped.append((pid, None, None))
+            continue
+        if got:
+            _reaped.append((pid, status, rusage))
+
+
+def update():
+    """Apply the statuses queued by the SIGCHLD handler to their jobs."""
+    with _lock:
+        while _reaped:
+            pid, status, rusage = _reaped.popleft()
+            job = _by_pid.get(pid)
+            if job is None:
+                continue
+            if status is None:
+                job.status, job.ended = "Done", time.time()
+                _by_pid.pop(pid, None)
+            else:
+                _record(job, status, rusage)
+
+
+def install():
+    if POSIX:
+        signal.signal(signal.SIGCHLD, reap)
+        # tcsetpgrp() from a background group would otherwise stop the shell
+        signal.signal(signal.SIGTTOU, signal.SIG_IGN)
+
+
+def find_job(spec):
+    # %n, n, %% / %+ / % (current job)
+    with _lock:
+        if spec in (None, "%", "%%", "%+"):
+            if _current in table:
+                return table[_current]
+            live = [j for j in table.values() if not j.finished]
+            return live[-1] if live else None
+        spec = spec.lstrip("%")
+        if spec.isdigit():
+            return table.get(int(spec))
+        return None
+
+
+def _forget(job):
+    global _current
+    with _lock:
+        table.pop(job.id, None)
+        if _current == job.id:
+            _current = None
+
+
+def _wait_pid(job, foreground):
+    # Blocking wait for one job; returns when it exits or stops. SIGCHLD is
+    # blocked meanwhile so the handler cannot reap it from under us.
+    flags = os.WUNTRACED if foreground else 0
+    signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGCHLD})
+    try:
+        # The handler may have reaped it already
+        update()
+        while not job.finished and not (foreground and job.status == "Stopped"):
+            try:
+                got, status, rusage = os.wait4(job.pid, flags)
+            except ChildProcessError:
+                update()
+                if not job.finished:
+                    job.status, job.ended = "Done", time.time()
+                    _by_pid.pop(job.pid, None)
+                break
+            if got:
+                _record(job, status, rusage)
+    finally:
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGCHLD})
+
+
+def _terminal_fd():
+    try:
+        return sys.stdin.fileno() if os.isatty(sys.stdin.fileno()) else None
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def foreground(spec=None):
+    job = find_job(spec)
+    if job is None:
+        return f"fg: {spec or 'current'}: no such job\n"
+    print(job.command)
+    if job.pid is None:
+        try:
+            _join(job)
+        except KeyboardInterrupt:
+            if job.future is not None:
+                job.future.cancel()
+        _forget(job)
+        return ""
+
+    tty = _terminal_fd()
+    if tty is not None:
+        os.tcsetpgrp(tty, job.pid)
+    try:
+        if job.status == "Stopped":
+            os.killpg(job.pid, signal.SIGCONT)
+            job.status = "Running"
+        _wait_pid(job, foreground=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if tty is not None:
+            os.tcsetpgrp(tty, os.getpgrp())
+
+    if job.status == "Stopped":
+        return f"\n[{job.id}]+  Stopped                 {job.command}\n"
+    _forget(job)
+    return ""
+
+
+def background(spec=None):
+    job = find_job(spec)
+    if job is None:
+        return f"bg: {spec or 'current'}: no such job\n"
+    if job.pid is None or job.status != "Stopped":
+        return f"bg: job {job.id} already in background\n"
+    os.killpg(job.pid, signal.SIGCONT)
+    job.status = "Running"
+    return f"[{job.id}]+ {job.command} &\n"
+
+
+def wait_for(specs):
+    if specs:
+        targets = [(spec, find_job(spec)) for spec in specs]
+    else:
+        targets = [(None, job) for job in list(table.values())]
+    out = []
+    for spec, job in targets:
+        if job is None:
+            out.append(f"wait: {spec}: no such job\n")
+            continue
+        try:
+            if job.pid is not None:
+                _wait_pid(job, foreground=False)
+            else:
+                _join(job)
+        except KeyboardInterrupt:
+            break
+        if job.finished:
+            _forget(job)
+    return "".join(out)
+
+
+def kill(tokens):
+    # kill [-SIGNAL] %job|pid ...
+    args = tokens[1:]
+    sig = signal.SIGTERM
+    if args and args[0].startswith("-") and len(args[0]) > 1:
+        name = args.pop(0)[1:]
+        try:
+            sig = signal.Signals(int(name)) if name.isdigit() else signal.Signals[
+                name if name.startswith("SIG") else "SIG" + name]
+        except (KeyError, ValueError):
+            return f"kill: {name}: invalid signal specification\n"
+    if not args:
+        return "Usage: kill [-SIGNAL] %job|pid ...\n"
+
+    out = []
+    for arg in args:
+        try:
+            if arg.startswith("%"):
+                job = find_job(arg)
+                if job is None or job.finished:
+                    out.append(f"kill: {arg}: no such job\n")
+                elif job.future is not None:
+                    job.future.cancel()
+                elif not POSIX:
+                    out.append(f"kill: {arg}: jobs cannot be signalled on this platform\n")
+                else:
+                    os.killpg(job.pid, sig)
+            elif arg.lstrip("-").isdigit():
+                os.kill(int(arg), sig)
+            else:
+                out.append(f"kill: {arg}: arguments must be process or job IDs\n")
+        except ProcessLookupError:
+            out.append(f"kill: {arg}: no such process\n")
+        except PermissionError:
+            out.append(f"kill: {arg}: operation not permitted\n")
+    return "".join(out)
+
+
+def _format(job, long):
+    marker = "+" if job.id == _current else " "
+    if not long:
+        return f"[{job.id}]{marker}  {job.status:<22}  {job.command}\n"
+    cpu = f"{job.cpu:.2f}s" if job.cpu is not None else "-"
+    rss = f"{job.maxrss / (1024 * 1024):.1f}MB" if job.maxrss is not None else "-"
+    pid = job.pid if job.pid is not None else "-"
+    return (f"[{job.id}]{marker}  {pid:>7}  {job.status:<22}  wall {job.wall():.2f}s  "
+            f"cpu {cpu}  rss {rss}  {job.command}\n")
+
+
+def list_jobs(long=False):
+    if POSIX:
+        reap()
+    update()
+    with _lock:
+        jobs = sorted(table.values(), key=lambda j: j.id)
+        out = [_format(job, long) for job in jobs]
+        for job in jobs:
+            if job.finished:
+                _forget(job)
+    return "".join(out)
+
+
+def notify_finished():
+    # Lines for jobs that finished since the last prompt; they are then
+    # forgotten
+    update()
+    with _lock:
+        done = sorted((j for j in table.values() if j.finished), key=lambda j: j.id)
+        for job in done:
+            _forget(job)
+    return "".join(_format(job, False) for job in done)
@@ -1,60 +1,215 @@
+import sys
+
+# Must be installed before anything else is imported to see every module
+if "--startup-profile" in sys.argv:
+    import startup_profile
+    startup_profile.enable()
+
 import signal
 import os
-import readline
-import glob
-from parser_self import parser_util
-from executer import execute_command, background_jobs, aliases
+from executer import execute_command, PIPE
 from history import command_history
+import jobs
+import suggest
+
+# readline is only loaded for the interactive shell
+readline = None
+READLINE_HISTORY = int(os.environ.get("BASHAI_READLINE_HISTORY", "5000"))
+
+USAGE = "Usage: main.py [-c command | script] [--warm-docbot] [--startup-profile]"
 
-import signal
-from executer import execute_command
-
-BUILTIN_COMMANDS = [
-    "cd", "pwd", "exit", "clear", "mkdir", "rmdir", "echo", "ls", "dir",
-    "touch", "cp", "mv", "rm", "whoami", "jobs", "alias", "DocBot",
-    "grep", "find", "df", "uptime", "stat", "uname", "tree", "sort", "history", "sleep", "countdown", "repeat", 
-]
-
-
-def complete(text, state):
-    buffer = readline.get_line_buffer().split()
-    if len(buffer) <= 1:
-        options = list(aliases.keys()) + BUILTIN_COMMANDS
-    else:
-        dirname, rest = os.path.split(text)
-        dirname = dirname or "."
-        try:
-            entries = os.listdir(dirname)
-        except FileNotFoundError:
-            entries = []
-        options = [os.path.join(dirname, e) for e in entries if e.startswith(rest)]
-    matches = [o for o in options if o.startswith(text)]
-    return matches[state] if state < len(matches) else None
 
-readline.parse_and_bind("tab: complete")
-readline.set_completer_delims(" \t\n;")
-readline.set_completer(complete)
+def setup_readline():
+    global readline
+    import readline
+    import completion
+    readline.parse_and_bind("tab: complete")
+    readline.set_completer_delims(" \t\n;|<>")
+    readline.set_completer(completion.complete)
+    # Ctrl+R in readline searches the most recent persisted commands; the
+    # full history is searched through `history -s/-p/-f` and `!` expansion
+    for _, command in command_history.tail(READLINE_HISTORY):
+        readline.add_history(command)
+    command_history.warm_up()
 
-# Install signal handlers again (if needed, especially on Windows)
-signal.signal(signal.SIGINT, signal.default_int_handler)
 
 def shell_loop():
+    warm_docbot = "--warm-docbot" in sys.argv or os.environ.get("BASHAI_WARM_DOCBOT") == "1"
+    GREEN = "\033[92m"
+    RESET = "\033[0m"
+    prompt = f"{GREEN}DocBot> {RESET}"
+    session = None
+    if suggest.enabled():
+        # Inline suggestions need prompt_toolkit and a terminal; otherwise
+        # readline's Tab offers them
+        if sys.stdin.isatty():
+            session = suggest.prompt_session(prompt)
+        suggest.warm_up()
     while True:
+        if warm_docbot:
+            # Load DocBot in the background while the user types
+            import chat
+            chat.warm_up()
+            warm_docbot = False
         try:
-            GREEN = "\033[92m"
-            RESET = "\033[0m"
+            print(jobs.notify_finished(), end="")
 
-            user_input = input(f"{GREEN}DocBot> {RESET}").strip()
+            user_input = (session.prompt() if session else input(prompt)).strip()
 
             if not user_input:
                 continue
+            if user_input.startswith("!"):
+                expanded, error = command_history.expand(user_input)
+                if error:
+                    print(error)
+                    continue
+                if expanded != user_input:
+                    print(expanded)
+                    if readline is not None:
+                        # Remember what ran, not the !event
+                        last = readline.get_current_history_length()
+                        if last and readline.get_history_item(last) == user_input:
+                            readline.remove_history_item(last - 1)
+                        readline.add_history(expanded)
+                    user_input = expanded
             command_history.append(user_input) 
-            tokens = user_input.split()
-            execute_command(tokens)
+            if suggest.enabled():
+                suggest.record(user_input, os.getcwd())
+            if user_input.split(None, 1)[0] == "DocBot":
+                # The question is free text, quotes and all
+                commands = [user_input.split()]
+            else:
+                try:
+                    commands = split_commands(user_input)
+                except ValueError as e:
+                    print(f"bashai: {e}")
+                    continue
+            for tokens in commands:
+                execute_command(tokens)
         except KeyboardInterrupt:
             print("\nCtrl+C pressed: Shell continues...")
         except EOFError:
             print("\nExiting shell (EOF).")
             break
 
-shell_loop()
+
+def split_commands(line):
+    # Words split as sh does: quotes, backslashes, `#` comments and `;`
+    # between commands, so `echo "a;b"; pwd # note` is two commands. An
+    # unquoted `|` becomes the PIPE operator; a quoted one is just text.
+    commands = [[]]
+    word = None
+    i, n = 0, len(line)
+    while i < n:
+        char = line[i]
+        if char in " \t\n;|" or char == "#" and word is None:
+            if word is not None:
+                commands[-1].append("".join(word))
+                word = None
+            if char == "#":
+                break
+            if char == ";":
+                commands.append([])
+            elif char == "|":
+                commands[-1].append(PIPE)
+            i += 1
+            continue
+        if word is None:
+            word = []
+        if char == "\\":
+            if i + 1 == n:
+                raise ValueError("No escaped character")
+            word.append(line[i + 1])
+            i += 2
+        elif char == "'":
+            end = line.find("'", i + 1)
+            if end == -1:
+                raise ValueError("No closing quotation")
+            word.append(line[i + 1:end])
+            i = end + 1
+        elif char == '"':
+            i += 1
+            while i < n and line[i] != '"':
+                if line[i] == "\\" and line[i + 1:i + 2] in ('"', "\\"):
+                    i += 1
+                word.append(line[i])
+                i += 1
+            if i == n:
+                raise ValueError("No closing quotation")
+            i += 1
+        else:
+            word.append(char)
+            i += 1
+    if word is not None:
+        commands[-1].append("".join(word))
+    return [c for c in commands if c]
+
+
+def parse_script(text, name):
+    # The whole script is tokenized before anything runs, so a quoting
+    # error on the last line stops it before the first line has side
+    # effects
+    commands = []
+    for lineno, line in enumerate(text.splitlines(), 1):
+        try:
+            commands.extend(split_commands(line))
+        except ValueError as e:
+            raise SyntaxError(f"{name}: line {lineno}: {e}")
+    return commands
+
+
+def run_script(text, name):
+    try:
+        commands = parse_script(text, name)
+    except SyntaxError as e:
+        print(e, file=sys.stderr)
+        return 2
+    status = 0
+    for tokens in commands:
+        try:
+            status = execute_command(tokens)
+        except KeyboardInterrupt:
+            return 130
+        except SystemExit as e:
+            status = e.code if isinstance(e.code, int) else 1
+            break
+    sys.stdout.flush()
+    return status
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    args = [a for a in argv if a not in ("--warm-docbot", "--startup-profile")]
+
+    # Install signal handlers again (if needed, especially on Windows)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+
+    if args[:1] == ["-c"]:
+        if len(args) < 2:
+            print(USAGE, file=sys.stderr)
+            return 2
+        return run_script(args[1], "-c")
+    if args:
+        try:
+            with open(args[0], "r", encoding="utf-8") as f:
+                text = f.read()
+        except OSError as e:
+            print(f"{args[0]}: {e.strerror}", file=sys.stderr)
+            return 127
+        return run_script(text, args[0])
+
+    setup_readline()
+    if "--startup-profile" in sys.argv:
+        startup_profile.report()
+    shell_loop()
+    return 0
+
+
+if __name__ == "__main__":
+    try:
+        sys.exit(main())
+    except BrokenPipeError:
+        # Output went to a pipe that was closed early (`| head`). Point
+        # stdout at /dev/null so the flush at exit does not fail again.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(141)
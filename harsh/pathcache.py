@@ -0,0 +1,172 @@
+import os
+import time
+import shutil
+import threading
+
+# Hash table of external commands, like bash's `hash`: a name is looked up
+# on $PATH once and its absolute path is remembered, so running the same
+# tool again does no PATH search. Everything is dropped when $PATH changes
+# or when one of its directories changes (its mtime moves whenever a file is
+# added, removed or renamed in it). The directories are stat'ed at most once
+# per CHECK_INTERVAL, so a script that runs a tool thousands of times pays
+# for one round of stats per interval instead of a search per run.
+
+CHECK_INTERVAL = float(os.environ.get("BASHAI_HASH_CHECK_INTERVAL", "1"))
+
+_lock = threading.Lock()
+_path = None
+_dir_mtimes = []
+_checked_at = 0.0
+_table = {}       # name -> [path, hits]
+_missing = set()
+_executables = None
+
+
+def _path_dirs(path):
+    return [d for d in path.split(os.pathsep) if d]
+
+
+def _mtimes(dirs):
+    out = []
+    for directory in dirs:
+        try:
+            out.append(os.stat(directory).st_mtime_ns)
+        except OSError:
+            out.append(None)
+    return out
+
+
+def _reset(path):
+    global _path, _dir_mtimes, _checked_at, _executables
+    _path = path
+    _dir_mtimes = _mtimes(_path_dirs(path))
+    _checked_at = time.monotonic()
+    _table.clear()
+    _missing.clear()
+    _executables = None
+
+
+def _validate():
+    # Called with _lock held
+    global _checked_at
+    path = os.environ.get("PATH", os.defpath)
+    if path != _path:
+        _reset(path)
+        return
+    now = time.monotonic()
+    if now - _checked_at < CHECK_INTERVAL:
+        return
+    _checked_at = now
+    if _mtimes(_path_dirs(path)) != _dir_mtimes:
+        _reset(path)
+
+
+def lookup(name, hit=True):
+    """Absolute path of an external command, or None if it is not on PATH."""
+    if os.sep in name or (os.altsep and os.altsep in name):
+        return name if shutil.which(name) else None
+    with _lock:
+        _validate()
+        entry = _table.get(name)
+        if entry is not None:
+            entry[1] += hit
+            return entry[0]
+        if name in _missing:
+            return None
+        found = shutil.which(name, path=_path)
+        if found is None:
+            _missing.add(name)
+            return None
+        found = os.path.abspath(found)
+        _table[name] = [found, int(hit)]
+        return found
+
+
+def forget():
+    with _lock:
+        _reset(os.environ.get("PATH", os.defpath))
+
+
+def executables():
+    """Every command name on PATH, for completion."""
+    global _executables
+    with _lock:
+        _validate()
+        if _executables is None:
+            names = set()
+            for directory in _path_dirs(_path):
+                try:
+                    with os.scandir(directory) as it:
+                        for entry in it:
+                            try:
+                                if entry.is_file() and os.access(entry.path, os.X_OK):
+                                    names.add(entry.name)
+                            except OSError:
+                                continue
+                except OSError:
+                    continue
+            _executables = sorted(names)
+        return _executables
+
+
+def hashed(name):
+    with _lock:
+        entry = _table.get(name)
+        return entry[0] if entry else None
+
+
+def cmd_hash(tokens, input_bytes=None):
+    # hash          list remembered commands with their hit counts
+    # hash -r       forget everything
+    # hash name...  look names up now and remember them
+    args = tokens[1:]
+    if args[:1] == ["-r"]:
+        forget()
+        args = args[1:]
+    elif not args:
+        with _lock:
+            _validate()
+            rows = sorted(_table.values())
+        if not rows:
+            return b"hash: hash table empty\n"
+        return ("hits\tcommand\n" + "".join(f"{hits:4d}\t{path}\n" for path, hits in rows)).encode()
+    out = []
+    for name in args:
+        if lookup(name, hit=False) is None:
+            out.append(f"hash: {name}: not found\n")
+    return "".join(out).encode()
+
+
+def _describe(name):
+    import registry
+    from executer import aliases
+    if name in aliases:
+        return f"{name} is aliased to `{aliases[name]}'"
+    if name in registry.SHELL_COMMANDS or registry.get(name) is not None:
+        return f"{name} is a shell builtin"
+    was_hashed = hashed(name)
+    path = lookup(name, hit=False)
+    if path is None:
+        return None
+    return f"{name} is hashed ({path})" if was_hashed else f"{name} is {path}"
+
+
+def cmd_type(tokens, input_bytes=None):
+    if len(tokens) < 2:
+        return b"Usage: type name...\n"
+    out = []
+    for name in tokens[1:]:
+        description = _describe(name)
+        out.append(f"{description}\n" if description else f"type: {name}: not found\n")
+    return "".join(out).encode()
+
+
+def cmd_which(tokens, input_bytes=None):
+    if len(tokens) < 2:
+        return b"Usage: which name...\n"
+    out = []
+    for name in tokens[1:]:
+        path = lookup(name, hit=False)
+        if path is not None:
+            out.append(path + "\n")
+    return "".join(out).encode()
@@ -0,0 +1,229 @@
+import queue
+import subprocess
+import threading
+
+import pathcache
+
+# Size of the chunks passed between stages, and how many chunks a stage may
+# run ahead of the one reading from it before it blocks (backpressure).
+CHUNK_SIZE = 64 * 1024
+QUEUE_DEPTH = 16
+
+_DONE = object()
+
+
+class PipelineCancelled(Exception):
+    pass
+
+
+class _Channel:
+    """Bounded hand-off between two stages running in different threads."""
+
+    def __init__(self, cancel):
+        self.queue = queue.Queue(maxsize=QUEUE_DEPTH)
+        self.cancel = cancel
+
+    def put(self, item):
+        while True:
+            if self.cancel.is_set():
+                raise PipelineCancelled()
+            try:
+                self.queue.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def __iter__(self):
+        while True:
+            if self.cancel.is_set():
+                raise PipelineCancelled()
+            try:
+                item = self.queue.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+
+
+def iter_file(f, chunk_size=CHUNK_SIZE):
+    # Stream an open binary file in fixed-size chunks.
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def iter_lines(chunks):
+    # Re-split a stream of byte chunks into lines, keeping the trailing b"\n".
+    if chunks is None:
+        return
+    pending = []
+    for chunk in chunks:
+        start = 0
+        end = chunk.find(b"\n")
+        while end != -1:
+            if pending:
+                pending.append(chunk[start:end + 1])
+                yield b"".join(pending)
+                pending = []
+            else:
+                yield chunk[start:end + 1]
+            start = end + 1
+            end = chunk.find(b"\n", start)
+        if start < len(chunk):
+            pending.append(chunk[start:])
+    if pending:
+        yield b"".join(pending)
+
+
+def external_stage(cmd_tokens, chunks=None, status=None):
+    # Run an external program as a streaming stage. Input chunks are fed to
+    # its stdin from a helper thread while its output is yielded as it comes.
+    # Its exit status is appended to the status list, if one is given.
+    if status is None:
+        status = []
+    executable = pathcache.lookup(cmd_tokens[0])
+    if executable is None:
+        status.append(127)
+        yield f"{cmd_tokens[0]}: command not found\n".encode()
+        return
+    try:
+        proc = subprocess.Popen(
+            cmd_tokens,
+            executable=executable,
+            stdin=subprocess.PIPE if chunks is not None else None,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+        )
+    except FileNotFoundError:
+        status.append(127)
+        yield f"{cmd_tokens[0]}: command not found\n".encode()
+        return
+    except Exception as e:
+        status.append(126)
+        yield f"Error running {cmd_tokens[0]}: {e}\n".encode()
+        return
+
+    feeder = None
+    if chunks is not None:
+        def feed():
+            try:
+                for chunk in chunks:
+                    proc.stdin.write(chunk)
+            except (BrokenPipeError, OSError, ValueError, PipelineCancelled):
+                pass
+            finally:
+                try:
+                    proc.stdin.close()
+                except OSError:
+                    pass
+
+        feeder = threading.Thread(target=feed, daemon=True)
+        feeder.start()
+
+    finished = False
+    try:
+        while True:
+            data = proc.stdout.read1(CHUNK_SIZE)
+            if not data:
+                break
+            yield data
+        finished = True
+    finally:
+        # The reader went away early (like SIGPIPE in a real shell).
+        if not finished and proc.poll() is None:
+            proc.terminate()
+        proc.stdout.close()
+        status.append(proc.wait())
+        if feeder is not None:
+            feeder.join(timeout=1)
+
+
+def _pump(stage, upstream, channel):
+    output = stage(upstream)
+    try:
+        for chunk in output:
+            if chunk:
+                channel.put(chunk)
+    except PipelineCancelled:
+        return
+    except BaseException as e:
+        try:
+            channel.put(e)
+        except PipelineCancelled:
+            return
+    finally:
+        close = getattr(output, "close", None)
+        if close is not None:
+            close()
+    try:
+        channel.put(_DONE)
+    except PipelineCancelled:
+        pass
+
+
+def run_stages(stages, source=None):
+    """Run pipeline stages concurrently and yield the final stage's output.
+
+    Each stage is a callable taking an iterator of input byte chunks (or None
+    when it has no input) and returning an iterable of output chunks. Every
+    stage but the last runs in its own thread and hands its output to the
+    next one through a bounded queue; the last stage runs in the caller's
+    thread so interactive builtins keep working.
+    """
+    cancel = threading.Event()
+    upstream = source
+    for stage in stages[:-1]:
+        channel = _Channel(cancel)
+        threading.Thread(target=_pump, args=(stage, upstream, channel), daemon=True).start()
+        upstream = iter(channel)
+
+    output = stages[-1](upstream)
+    try:
+        for chunk in output:
+            if chunk:
+                yield chunk
+    finally:
+        cancel.set()
+        close = getattr(output, "close", None)
+        if close is not None:
+            close()
+
+
+def run_native(commands, stdin=None, stdout=None):
+    """Run a pipeline of external programs connected by OS pipes.
+
+    All processes are started up front and wired stdout-to-stdin by the
+    kernel, so none of the data passes through Python. The first stage reads
+    from ``stdin`` and the last writes to ``stdout`` (file objects or None to
+    inherit the shell's own descriptors). Returns the exit status of the last
+    stage.
+    """
+    procs = []
+    try:
+        for i, cmd_tokens in enumerate(commands):
+            last = i == len(commands) - 1
+            proc = subprocess.Popen(
+                cmd_tokens,
+                executable=pathcache.lookup(cmd_tokens[0]),
+                stdin=procs[-1].stdout if procs else stdin,
+                stdout=stdout if last else subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+            )
+            # Drop the parent's copy of the read end so the upstream process
+            # gets SIGPIPE when this one exits.
+            if procs:
+                procs[-1].stdout.close()
+            procs.append(proc)
+        for proc in procs:
+            proc.wait()
+        return procs[-1].returncode
+    finally:
+        for proc in procs:
+            if proc.poll() is None:
+                proc.terminate()
+                proc.wait()
@@ -0,0 +1,122 @@
+import os
+import importlib
+
+# Table of builtin commands. Each entry names its handler as "module:function"
+# and the module is imported the first time the command runs, so the shell
+# starts with only the core loaded and dispatch is one dict lookup.
+#
+# Handler conventions:
+#   streaming=True   generator (tokens, chunks=None) yielding byte chunks
+#   streaming=False  function (tokens, input_bytes=None) returning bytes
+#
+# needs_stdin: the command reads its input; for the others piped input is
+#   not collected at all.
+#
+# Plugins: every module named in BASHAI_PLUGINS (comma separated) is imported
+# at startup and may call register(); packages can also declare entry points
+# in the "bashai.builtins" group as name = "module:function" (non-streaming).
+# Scanning entry points costs ~50ms, so it waits until a name is not found
+# or the full list is wanted.
+
+PLUGIN_GROUP = "bashai.builtins"
+
+# Handled by execute_command itself because they change the shell's state;
+# listed here so completion and `type`-style lookups know them
+SHELL_COMMANDS = ("cd", "exit", "alias", "jobs", "fg", "bg", "wait")
+
+
+class Builtin:
+    def __init__(self, name, target, streaming=False, needs_stdin=False):
+        self.name = name
+        self.target = target
+        self.streaming = streaming
+        self.needs_stdin = needs_stdin
+        self._handler = None
+
+    @property
+    def handler(self):
+        if self._handler is None:
+            module, _, function = self.target.partition(":")
+            self._handler = getattr(importlib.import_module(module), function)
+        return self._handler
+
+
+builtins = {}
+_entry_points_loaded = False
+
+
+def register(name, target, streaming=False, needs_stdin=False):
+    builtins[name] = Builtin(name, target, streaming, needs_stdin)
+
+
+def get(name):
+    builtin = builtins.get(name)
+    if builtin is None and not _entry_points_loaded:
+        load_entry_points()
+        builtin = builtins.get(name)
+    return builtin
+
+
+def names():
+    load_entry_points()
+    return list(SHELL_COMMANDS) + list(builtins)
+
+
+register("echo", "cmd_basic:echo")
+register("pwd", "cmd_basic:pwd")
+register("whoami", "cmd_basic:whoami")
+register("clear", "cmd_basic:clear")
+register("ls", "cmd_basic:ls")
+register("dir", "cmd_basic:dir_")
+register("touch", "cmd_basic:touch")
+register("mkdir", "cmd_basic:mkdir")
+register("rmdir", "cmd_basic:rmdir")
+register("rm", "cmd_basic:rm")
+register("sleep", "cmd_basic:sleep")
+register("countdown", "cmd_basic:countdown")
+register("repeat", "cmd_basic:repeat")
+register("cat", "fastcopy:cat", streaming=True, needs_stdin=True)
+register("cp", "fastcopy:cp")
+register("mv", "fastcopy:mv")
+register("kill", "cmd_basic:kill")
+register("grep", "grep_engine:grep", streaming=True, needs_stdin=True)
+register("sort", "sort_engine:sort", streaming=True, needs_stdin=True)
+register("find", "find_engine:find", streaming=True)
+register("tree", "tree_engine:tree", streaming=True)
+register("index", "fsindex:cmd_index", streaming=True)
+register("locate", "fsindex:cmd_locate", streaming=True)
+register("df", "cmd_system:df")
+register("uptime", "cmd_system:uptime")
+register("stat", "cmd_system:stat")
+register("uname", "cmd_system:uname")
+register("history", "history:cmd_history")
+register("hash", "pathcache:cmd_hash")
+register("type", "pathcache:cmd_type")
+register("which", "pathcache:cmd_which")
+register("DocBot", "cmd_docbot:docbot")
+
+
+def load_plugins():
+    for module in filter(None, os.environ.get("BASHAI_PLUGINS", "").split(",")):
+        try:
+            importlib.import_module(module.strip())
+        except Exception as e:
+            print(f"plugin {module}: {e}")
+
+
+def load_entry_points():
+    global _entry_points_loaded
+    if _entry_points_loaded:
+        return
+    _entry_points_loaded = True
+    try:
+        from importlib.metadata import entry_points
+        found = entry_points(group=PLUGIN_GROUP)
+    except Exception:
+        return
+    for entry in found:
+        if entry.name not in builtins:
+            register(entry.name, entry.value)
+
+
+load_plugins()
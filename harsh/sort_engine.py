@@ -0,0 +1,271 @@
+import os
+import re
+import heapq
+import shutil
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+# External merge sort: input is cut into runs of at most SORT_MEMORY bytes,
+# each run is sorted (in a process pool when there is more than one) and
+# spilled to a temp file, then the runs are merged with a k-way heap merge and
+# streamed out. Memory stays bounded by the budget no matter how large the
+# input is. Lines are compared as bytes, like `LC_ALL=C sort`.
+
+SORT_MEMORY = int(os.environ.get("BASHAI_SORT_MEMORY", 64 * 1024 * 1024))
+SORT_WORKERS = int(os.environ.get("BASHAI_SORT_WORKERS", os.cpu_count() or 1))
+MERGE_FANIN = 64
+OUTPUT_BLOCK = 64 * 1024
+READ_SIZE = 1024 * 1024
+NUMBER = re.compile(rb"\s*([-+]?(?:\d+\.?\d*|\.\d+))")
+USAGE = b"Usage: sort [-nru] [-t sep] [-k start[,end]] [file...]\n"
+
+
+class SortOptions:
+    def __init__(self):
+        self.files = []
+        self.numeric = False
+        self.reverse = False
+        self.unique = False
+        self.separator = None
+        self.key_start = None
+        self.key_end = None
+
+
+def parse_field(spec):
+    # "2" or "2.3" style field specs; character offsets are not supported
+    field = spec.split(".")[0].rstrip("bdfgimnrR")
+    if not field.isdigit() or int(field) < 1:
+        raise ValueError(f"invalid field specification '{spec}'")
+    return int(field)
+
+
+def parse_args(tokens):
+    opts = SortOptions()
+    args = iter(tokens[1:])
+    for arg in args:
+        if arg == "--":
+            opts.files.extend(args)
+            break
+        if arg.startswith("-") and len(arg) > 1:
+            flags = arg[1:]
+            while flags:
+                flag, flags = flags[0], flags[1:]
+                if flag == "n":
+                    opts.numeric = True
+                elif flag == "r":
+                    opts.reverse = True
+                elif flag == "u":
+                    opts.unique = True
+                elif flag in "tk":
+                    value = flags or next(args, None)
+                    flags = ""
+                    if value is None:
+                        raise ValueError(f"option requires an argument -- '{flag}'")
+                    if flag == "t":
+                        if len(value) != 1:
+                            raise ValueError("the separator must be a single character")
+                        opts.separator = value.encode()
+                    else:
+                        start, _, end = value.partition(",")
+                        opts.key_start = parse_field(start)
+                        opts.key_end = parse_field(end) if end else None
+                else:
+                    raise ValueError(f"invalid option -- '{flag}'")
+        else:
+            opts.files.append(arg)
+    return opts
+
+
+def make_keys(opts):
+    # Returns (primary, full). primary decides equality for -u; full adds the
+    # whole line as a last-resort tie-break, like GNU sort. With -u there is
+    # no tie-break and the sort is stable, so the first of equal lines wins.
+    def extract(line):
+        line = line.rstrip(b"\n")
+        if opts.key_start is None:
+            return line
+        if opts.separator is not None:
+            fields = line.split(opts.separator)
+            joiner = opts.separator
+        else:
+            fields = line.split()
+            joiner = b" "
+        end = opts.key_end if opts.key_end is not None else len(fields)
+        return joiner.join(fields[opts.key_start - 1:end])
+
+    if opts.numeric:
+        def primary(line):
+            m = NUMBER.match(extract(line))
+            return float(m.group(1)) if m else 0.0
+    else:
+        primary = extract
+
+    if opts.unique or (not opts.numeric and opts.key_start is None):
+        return primary, primary
+
+    def full(line):
+        return primary(line), line
+    return primary, full
+
+
+def iter_input(opts, chunks):
+    if not opts.files:
+        yield from chunks
+        return
+    for path in opts.files:
+        with open(path, "rb") as f:
+            while True:
+                chunk = f.read(READ_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+
+def iter_runs(chunks, run_size):
+    # Regroup the input into byte runs of about run_size that end on a line
+    # boundary; a missing final newline is added.
+    buf = bytearray()
+    for chunk in chunks:
+        buf += chunk
+        while len(buf) >= run_size:
+            cut = buf.rfind(b"\n", 0, run_size)
+            if cut == -1:
+                # A single line longer than a run becomes a run of its own
+                cut = buf.find(b"\n", run_size)
+                if cut == -1:
+                    break
+            yield bytes(buf[:cut + 1])
+            del buf[:cut + 1]
+    if buf:
+        if not buf.endswith(b"\n"):
+            buf += b"\n"
+        yield bytes(buf)
+
+
+def sort_lines(data, opts):
+    primary, full = make_keys(opts)
+    lines = data.splitlines(keepends=True)
+    lines.sort(key=full, reverse=opts.reverse)
+    if opts.unique:
+        lines = list(dedupe(lines, primary))
+    return lines
+
+
+def sort_run_file(path, opts):
+    # Runs in a pool worker: sort a spilled run in place
+    with open(path, "rb") as f:
+        data = f.read()
+    lines = sort_lines(data, opts)
+    with open(path, "wb") as f:
+        f.writelines(lines)
+    return path
+
+
+def dedupe(lines, primary):
+    previous = object()
+    for line in lines:
+        key = primary(line)
+        if key != previous:
+            yield line
+            previous = key
+
+
+def iter_run_file(path):
+    with open(path, "rb", buffering=READ_SIZE) as f:
+        yield from f
+
+
+def merge_runs(paths, opts, tmp_dir):
+    # Merge sorted runs, first collapsing them MERGE_FANIN at a time if there
+    # are too many to keep open at once
+    primary, full = make_keys(opts)
+    generation = 0
+    while len(paths) > MERGE_FANIN:
+        merged = []
+        for i in range(0, len(paths), MERGE_FANIN):
+            group = paths[i:i + MERGE_FANIN]
+            out_path = os.path.join(tmp_dir, f"merge-{generation}-{i}")
+            with open(out_path, "wb") as out:
+                out.writelines(heapq.merge(*map(iter_run_file, group), key=full, reverse=opts.reverse))
+            for path in group:
+                os.remove(path)
+            merged.append(out_path)
+        paths = merged
+        generation += 1
+
+    lines = heapq.merge(*map(iter_run_file, paths), key=full, reverse=opts.reverse)
+    return dedupe(lines, primary) if opts.unique else lines
+
+
+def spill_runs(runs, opts, tmp_dir):
+    # Write each run to disk and sort it in a worker process, keeping only
+    # about one run per worker in flight. Returns the sorted run paths.
+    paths = []
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=SORT_WORKERS) as pool:
+        for i, data in enumerate(runs):
+            path = os.path.join(tmp_dir, f"run-{i}")
+            with open(path, "wb") as f:
+                f.write(data)
+            del data
+            pending.append(pool.submit(sort_run_file, path, opts))
+            if len(pending) >= SORT_WORKERS:
+                paths.append(pending.popleft().result())
+        while pending:
+            paths.append(pending.popleft().result())
+    return paths
+
+
+def blocks(lines):
+    out = []
+    size = 0
+    for line in lines:
+        out.append(line)
+        size += len(line)
+        if size >= OUTPUT_BLOCK:
+            yield b"".join(out)
+            out = []
+            size = 0
+    if out:
+        yield b"".join(out)
+
+
+def sort(tokens, chunks=None):
+    try:
+        opts = parse_args(tokens)
+    except ValueError as e:
+        yield f"sort: {e}\n".encode() + USAGE
+        return
+    if not opts.files and chunks is None:
+        yield b"sort error: no input or file provided\n"
+        return
+
+    # Each worker holds one run while the main process fills the next
+    run_size = max(SORT_MEMORY // (SORT_WORKERS + 1), 1024)
+    try:
+        runs = iter_runs(iter_input(opts, chunks), run_size)
+        first = next(runs, None)
+        if first is None:
+            return
+        second = next(runs, None)
+        if second is None:
+            # Fits in memory: no temp files, no pool
+            yield from blocks(sort_lines(first, opts))
+            return
+
+        tmp_dir = tempfile.mkdtemp(prefix="bashai-sort-")
+        try:
+            paths = spill_runs(_chain(first, second, runs), opts, tmp_dir)
+            del first, second
+            yield from blocks(merge_runs(paths, opts, tmp_dir))
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+    except OSError as e:
+        yield f"sort error: {e}\n".encode()
+
+
+def _chain(first, second, rest):
+    yield first
+    yield second
+    yield from rest
@@ -0,0 +1,44 @@
+import builtins
+import sys
+import time
+
+# Times every module imported after enable() is called, so `main.py
+# --startup-profile` can show what the shell pays for before the first prompt.
+
+_original_import = builtins.__import__
+_records = []
+_stack = []
+_started = None
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level == 0 and name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+
+    start = time.perf_counter()
+    _stack.append(0.0)
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - start
+        children = _stack.pop()
+        if _stack:
+            _stack[-1] += elapsed
+        _records.append((name, elapsed - children, elapsed, len(_stack)))
+
+
+def enable():
+    global _started
+    _started = time.perf_counter()
+    builtins.__import__ = _timed_import
+
+
+def report(limit=25):
+    builtins.__import__ = _original_import
+    total = time.perf_counter() - _started
+
+    print(f"{'self ms':>9} {'total ms':>9}  module")
+    ranked = sorted(_records, key=lambda r: r[2], reverse=True)
+    for name, self_time, cumulative, depth in ranked[:limit]:
+        print(f"{self_time * 1000:9.2f} {cumulative * 1000:9.2f}  {'  ' * depth}{name}")
+    print(f"Time to first prompt: {total * 1000:.2f} ms ({len(_records)} imports)")
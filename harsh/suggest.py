@@ -0,0 +1,240 @@
+import os
+import bisect
+import threading
+
+from history import History, command_history
+
+# Fish-style autosuggestions: while a line is typed, the rest of the most
+# likely command is shown after the cursor.
+#
+# Ranking: every use of a command adds 2 ** (n / HALF_LIFE) to its score,
+# where n counts commands run so far. That is frequency with older uses
+# decaying (a use HALF_LIFE commands ago counts half), and a score only ever
+# grows when its command is used again. Commands used in the current
+# directory are boosted by CWD_BOOST.
+#
+# Index: for every prefix up to PREFIX_DEPTH characters the TOP_K best
+# commands are kept, so a lookup is one dict access. Because only the used
+# command's score changes, recording a command just updates the entries
+# along its own prefixes. Longer prefixes match few commands and are
+# answered from a sorted list with bisect. The boost can lift a command
+# that is not in the global TOP_K, so the commands used in the current
+# directory are also looked up, in that directory's own sorted list.
+#
+# The model is built from the persistent history. Directories are not part
+# of the history file, so (cwd, command) pairs are logged separately in
+# PLACES_PATH, with the same append-only storage as the history.
+
+PLACES_PATH = os.path.expanduser(os.environ.get("BASHAI_SUGGEST_PLACES", "~/.bashai_places"))
+HALF_LIFE = 500.0
+CWD_BOOST = 4.0
+PREFIX_DEPTH = 12
+TOP_K = 4
+# Scores are rescaled before 2 ** (n / HALF_LIFE) gets near float overflow
+RESCALE_AT = 2.0 ** 600
+
+
+class Model:
+    def __init__(self):
+        self.scores = {}
+        self.sorted = []
+        self.top = {}
+        self.places = {}
+        self.place_lists = {}
+        self.uses = 0
+        self.base = 0
+        self._lock = threading.Lock()
+
+    def _weight(self):
+        return 2.0 ** ((self.uses - self.base) / HALF_LIFE)
+
+    def observe(self, command, cwd=None):
+        command = command.strip()
+        if not command:
+            return
+        with self._lock:
+            weight = self._weight()
+            if weight > RESCALE_AT:
+                self._rescale()
+                weight = self._weight()
+            self.uses += 1
+            score = self.scores.get(command)
+            if score is None:
+                bisect.insort(self.sorted, command)
+                score = 0.0
+            score += weight
+            self.scores[command] = score
+            for depth in range(1, min(len(command), PREFIX_DEPTH) + 1):
+                self._promote(command[:depth], command, score)
+            if cwd is not None:
+                self.add_place(cwd, command)
+
+    def add_place(self, cwd, command):
+        here = self.places.setdefault(cwd, set())
+        if command not in here:
+            here.add(command)
+            bisect.insort(self.place_lists.setdefault(cwd, []), command)
+
+    def load(self, commands):
+        """Build from past commands, oldest first, in one pass."""
+        with self._lock:
+            scores = self.scores
+            for command in commands:
+                command = command.strip()
+                if command:
+                    weight = self._weight()
+                    if weight > RESCALE_AT:
+                        self._rescale()
+                        weight = self._weight()
+                    scores[command] = scores.get(command, 0.0) + weight
+                    self.uses += 1
+            self.sorted = sorted(scores)
+            top = self.top
+            for command, score in scores.items():
+                for depth in range(1, min(len(command), PREFIX_DEPTH) + 1):
+                    prefix = command[:depth]
+                    best = top.get(prefix)
+                    if best is None:
+                        top[prefix] = [(score, command)]
+                    else:
+                        best.append((score, command))
+            for best in top.values():
+                if len(best) > 1:
+                    best.sort(reverse=True)
+                    del best[TOP_K:]
+
+    def _promote(self, prefix, command, score):
+        best = self.top.get(prefix)
+        if best is None:
+            self.top[prefix] = [(score, command)]
+            return
+        for i, (_, other) in enumerate(best):
+            if other == command:
+                del best[i]
+                break
+        else:
+            if len(best) >= TOP_K and score <= best[-1][0]:
+                return
+        best.append((score, command))
+        best.sort(reverse=True)
+        del best[TOP_K:]
+
+    def _rescale(self):
+        factor = 1.0 / self._weight()
+        self.base = self.uses
+        for command in self.scores:
+            self.scores[command] *= factor
+        for prefix, best in self.top.items():
+            self.top[prefix] = [(score * factor, command) for score, command in best]
+
+    def suggest(self, text, cwd=None):
+        """The most likely full command starting with text, or None."""
+        if not text or text.isspace():
+            return None
+        here = self.places.get(cwd, ())
+        with self._lock:
+            if len(text) <= PREFIX_DEPTH:
+                candidates = list(self.top.get(text, ()))
+            else:
+                candidates = []
+                commands = self.sorted
+                for i in range(bisect.bisect_left(commands, text), len(commands)):
+                    if not commands[i].startswith(text):
+                        break
+                    candidates.append((self.scores[commands[i]], commands[i]))
+            local = self.place_lists.get(cwd, ())
+            for i in range(bisect.bisect_left(local, text), len(local)):
+                if not local[i].startswith(text):
+                    break
+                score = self.scores.get(local[i])
+                if score is not None:
+                    candidates.append((score, local[i]))
+        best, best_score = None, 0.0
+        for score, command in candidates:
+            if command == text:
+                continue
+            if command in here:
+                score *= CWD_BOOST
+            if score > best_score:
+                best, best_score = command, score
+        return best
+
+
+_model = None
+_building = False
+_model_lock = threading.Lock()
+places = History(PLACES_PATH)
+
+
+def _build():
+    global _model
+    model = Model()
+    model.load(command_history)
+    for line in places:
+        cwd, _, command = line.partition("\t")
+        if command:
+            model.add_place(cwd, command)
+    _model = model
+
+
+def warm_up():
+    global _building
+    with _model_lock:
+        if not _building:
+            _building = True
+            threading.Thread(target=_build, daemon=True).start()
+
+
+def record(command, cwd):
+    places.append(f"{cwd}\t{command}")
+    if _model is not None:
+        _model.observe(command, cwd)
+
+
+def suggestion(text, cwd=None):
+    # Nothing is shown until the model has been built in the background
+    if _model is None:
+        warm_up()
+        return None
+    command = _model.suggest(text, cwd if cwd is not None else os.getcwd())
+    return command[len(text):] if command else None
+
+
+def enabled():
+    return os.environ.get("BASHAI_SUGGEST", "1") != "0"
+
+
+def prompt_session(message):
+    """A prompt_toolkit session with autosuggestions, or None when the
+    package is not installed (the shell then stays on readline)."""
+    try:
+        from prompt_toolkit import PromptSession
+        from prompt_toolkit.auto_suggest import AutoSuggest, Suggestion
+        from prompt_toolkit.completion import Completer, Completion
+        from prompt_toolkit.formatted_text import ANSI
+        from prompt_toolkit.history import InMemoryHistory
+    except ImportError:
+        return None
+    import completion
+
+    class ModelSuggest(AutoSuggest):
+        def get_suggestion(self, buffer, document):
+            if document.cursor_position != len(document.text):
+                return None
+            rest = suggestion(document.text)
+            return Suggestion(rest) if rest else None
+
+    class ShellCompleter(Completer):
+        def get_completions(self, document, complete_event):
+            word = document.get_word_before_cursor(WORD=True)
+            begidx = len(document.text_before_cursor) - len(word)
+            for candidate in completion.candidates(document.text_before_cursor, begidx, word):
+                yield Completion(candidate, start_position=-len(word))
+
+    history = InMemoryHistory()
+    for _, command in command_history.tail(1000):
+        history.append_string(command)
+    warm_up()
+    # Right arrow or Ctrl+E accepts the whole suggestion, Alt+F one word
+    return PromptSession(ANSI(message), history=history, auto_suggest=ModelSuggest(),
+                         completer=ShellCompleter(), complete_while_typing=False)
@@ -0,0 +1,46 @@
+import os
+import tempfile
+
+import answer_cache
+from answer_cache import AnswerCache
+
+
+def run_tests():
+    path = os.path.join(tempfile.mkdtemp(), "cache.json")
+    cache = AnswerCache(path, version="v1", max_entries=2)
+    cache.put("list files", None, {"code": "ls"})
+    cache.put("disk usage", None, {"code": "df -h"})
+    saved_on_put = os.path.exists(path)
+    hit = cache.get("List files?")
+    dirty = cache._dirty
+    cache.flush()
+
+    # After a restart the hit keeps "list files" as the most recently used
+    restarted = AnswerCache(path, version="v1", max_entries=2)
+    order = list(restarted.entries)
+    restarted.put("free memory", None, {"code": "free -h"})
+
+    tests = [
+        (saved_on_put, False),
+        (hit, {"code": "ls"}),
+        (dirty, True),
+        (cache._dirty, False),
+        (order, ["v1:disk usage", "v1:list files"]),
+        (restarted.get("list files"), {"code": "ls"}),
+        (restarted.get("disk usage"), None),
+        (AnswerCache(path, version="v2").entries, {}),
+        (os.path.isabs(answer_cache.CACHE_PATH), True),
+    ]
+
+    passed = 0
+    for i, (result, expected) in enumerate(tests, 1):
+        if result == expected:
+            print(f"✅ Test {i} Passed")
+            passed += 1
+        else:
+            print(f"❌ Test {i} Failed\nExpected: {expected}\nGot:      {result}\n")
+
+    print(f"\n{passed}/{len(tests)} tests passed.")
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,69 @@
+import os
+import tempfile
+
+os.environ["BASHAI_FSINDEX_PATH"] = os.path.join(tempfile.mkdtemp(), "fsindex.db")
+
+import completion
+from completion import Trie
+
+
+def touch(path):
+    open(path, "w").close()
+
+
+def run_tests():
+    trie = Trie(["grep", "git", "gitk", "go", "sort"])
+    trie.add("git")
+
+    tmp = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.chdir(tmp)
+    try:
+        os.makedirs("src/pkg")
+        os.makedirs("docs")
+        touch("setup.py")
+        touch("src/main.py")
+        touch("src/.hidden")
+
+        first = completion.listing("src")
+        cached = completion.listing("src")[0] is first[0]
+        touch("src/more.py")
+        refreshed = completion.listing("src")
+
+        completion.LISTING_CACHE_SIZE = 2
+        completion.listing("docs")
+        completion.listing(".")
+        evicted = os.path.abspath("src") not in completion._listings
+
+        tests = [
+            (trie.words("g"), ["git", "gitk", "go", "grep"]),
+            (trie.words("git"), ["git", "gitk"]),
+            (trie.words("x"), []),
+            (trie.words(""), ["git", "gitk", "go", "grep", "sort"]),
+            (first, ([".hidden", "main.py", "pkg"], {"pkg"})),
+            (cached, True),
+            (refreshed[0], [".hidden", "main.py", "more.py", "pkg"]),
+            (evicted, True),
+            (completion.complete_path("s"), ["setup.py", "src/"]),
+            (completion.complete_path("src/"), ["src/main.py", "src/more.py", "src/pkg/"]),
+            (completion.complete_path("src/."), ["src/.hidden"]),
+            (completion.candidates("cd ", 3, "s"), ["src/"]),
+            (completion.candidates("grep -", 5, "-"), completion.FLAGS["grep"]),
+            (completion.candidates("grep -", 5, "-w"), []),
+            (completion.candidates("ls | sort -", 10, "-u"), ["-u"]),
+        ]
+    finally:
+        os.chdir(cwd)
+
+    passed = 0
+    for i, (result, expected) in enumerate(tests, 1):
+        if result == expected:
+            print(f"✅ Test {i} Passed")
+            passed += 1
+        else:
+            print(f"❌ Test {i} Failed\nExpected: {expected}\nGot:      {result}\n")
+
+    print(f"\n{passed}/{len(tests)} tests passed.")
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,53 @@
+import os
+import tempfile
+
+import fastcopy
+
+
+def write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def run_tests():
+    tmp = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.chdir(tmp)
+    try:
+        write("f", b"keep me\n")
+        same = fastcopy.cp(["cp", "f", "f"])
+        same_dot = fastcopy.cp(["cp", "f", "."])
+        os.makedirs("d/sub")
+        write("d/sub/g", b"g\n")
+        into_self = fastcopy.cp(["cp", "-r", "d", "d/sub"])
+        copied = fastcopy.cp(["cp", "-r", "d", "e"])
+
+        tests = [
+            (b"are the same file" in same, True),
+            (b"are the same file" in same_dot, True),
+            (read("f"), b"keep me\n"),
+            (b"into itself" in into_self, True),
+            (os.listdir("d/sub"), ["g"]),
+            (copied, b""),
+            (read("e/sub/g"), b"g\n"),
+        ]
+    finally:
+        os.chdir(cwd)
+
+    passed = 0
+    for i, (result, expected) in enumerate(tests, 1):
+        if result == expected:
+            print(f"✅ Test {i} Passed")
+            passed += 1
+        else:
+            print(f"❌ Test {i} Failed\nExpected: {expected}\nGot:      {result}\n")
+
+    print(f"\n{passed}/{len(tests)} tests passed.")
+
+if __name__ == "__main__":
+    run_tests()
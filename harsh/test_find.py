@@ -0,0 +1,64 @@
+import os
+import tempfile
+
+os.environ["BASHAI_FSINDEX_PATH"] = os.path.join(tempfile.mkdtemp(), "fsindex.db")
+os.environ["BASHAI_FSINDEX_INOTIFY"] = "0"
+
+import fsindex
+import find_engine
+
+
+def write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def find(*args):
+    return sorted(b"".join(find_engine.find(["find", *args])).decode().split())
+
+
+def run_tests():
+    tmp = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.chdir(tmp)
+    try:
+        os.makedirs("d/sub")
+        write("d/small", b"x")
+        write("d/sub/grows", b"x")
+        write("ref", b"")
+        os.utime("d/small", (1, 1))
+        os.utime("d/sub/grows", (1, 1))
+        fsindex.index("d")
+
+        # Written in place: the directories' mtimes do not move, so the
+        # index keeps the old size and mtime for the file
+        sub_mtime = os.stat("d/sub").st_mtime_ns
+        write("d/sub/grows", b"x" * 4096)
+        os.utime("d/sub", ns=(sub_mtime, sub_mtime))
+
+        tests = [
+            (find("d", "-name", "*s*"), ["d/small", "d/sub", "d/sub/grows"]),
+            (find("d", "-type", "f", "-size", "+1k"), ["d/sub/grows"]),
+            (find("d", "-type", "f", "-mmin", "-5"), ["d/sub/grows"]),
+            (find("d", "-type", "f", "-newer", "ref"), ["d/sub/grows"]),
+            (find("d", "-type", "f", "-mtime", "+1"), ["d/small"]),
+            # Spelled as the unindexed walk spells them
+            (find("d/"), ["d/", "d/small", "d/sub", "d/sub/grows"]),
+            (find("d/sub/"), ["d/sub/", "d/sub/grows"]),
+            (find(os.path.join(tmp, "d") + "/", "-name", "grows"), [os.path.join(tmp, "d/sub/grows")]),
+        ]
+    finally:
+        os.chdir(cwd)
+
+    passed = 0
+    for i, (result, expected) in enumerate(tests, 1):
+        if result == expected:
+            print(f"✅ Test {i} Passed")
+            passed += 1
+        else:
+            print(f"❌ Test {i} Failed\nExpected: {expected}\nGot:      {result}\n")
+
+    print(f"\n{passed}/{len(tests)} tests passed.")
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,64 @@
+import os
+import shutil
+import subprocess
+import tempfile
+
+import grep_engine
+
+LINES = b"aaa\nab c\nxyz\n\nfoo bar\nx\n"
+
+
+def ours(args, *paths):
+    return b"".join(grep_engine.grep(["grep"] + args + list(paths)))
+
+
+def gnu(args, *paths):
+    return subprocess.run(["grep"] + args + list(paths), capture_output=True,
+                          env={**os.environ, "LC_ALL": "C"}).stdout
+
+
+def run_tests():
+    if shutil.which("grep") is None:
+        print("GNU grep not found, skipping")
+        return
+    fd, path = tempfile.mkstemp()
+    with os.fdopen(fd, "wb") as f:
+        f.write(LINES)
+
+    cases = [
+        ["[^a]"], ["-c", "[^a]"], ["\\s"], ["-c", "\\W"], ["-E", "[^x]*"],
+        ["-c", "-E", "[^x]*"], ["-v", "[^a]"], ["a"], ["-n", "x"], ["-E", "^$"],
+        ["-c", "-E", "b.?$"],
+    ]
+    tests = [(ours(args, path), gnu(args, path)) for args in cases]
+
+    # Cheap patterns stay on threads; only expensive ones go to processes.
+    opts = grep_engine.GrepOptions()
+    pool_cases = [("a.b", False), ("\\.", False), ("x.*y", False),
+                  ("(ab)+c", True), ("(a)\\1", True), (".*a.*b", True)]
+    workers, pool = grep_engine.GREP_WORKERS, grep_engine.GREP_POOL
+    grep_engine.GREP_WORKERS, grep_engine.GREP_POOL = 2, "auto"
+    for pattern, expected in pool_cases:
+        opts.patterns = [pattern]
+        cases.append(["use_processes", pattern])
+        tests.append((grep_engine.use_processes(None, opts), expected))
+
+    # A forced process pool gives the same output as GNU grep.
+    grep_engine.GREP_POOL = "process"
+    cases.append(["-E", "(a|b)+", path, path])
+    tests.append((ours(["-E", "(a|b)+"], path, path), gnu(["-E", "(a|b)+"], path, path)))
+    grep_engine.GREP_WORKERS, grep_engine.GREP_POOL = workers, pool
+    os.remove(path)
+
+    passed = 0
+    for i, (result, expected) in enumerate(tests, 1):
+        if result == expected:
+            print(f"✅ Test {i} Passed")
+            passed += 1
+        else:
+            print(f"❌ Test {i} Failed ({cases[i - 1]})\nExpected: {expected}\nGot:      {result}\n")
+
+    print(f"\n{passed}/{len(tests)} tests passed.")
+
+if __name__ == "__main__":
+    run_tests()
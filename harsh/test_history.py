@@ -0,0 +1,60 @@
+import os
+import tempfile
+import threading
+
+import history
+from history import History
+
+
+def run_tests():
+    path = os.path.join(tempfile.mkdtemp(), "history")
+    with open(path, "w") as f:
+        f.write("".join(f"make target{i}\n" for i in range(2000)))
+    log = History(path)
+
+    # Stop the background build on its first entry and append meanwhile
+    building, release = threading.Event(), threading.Event()
+    trigrams = history._trigrams
+
+    def slow_trigrams(text):
+        if not building.is_set():
+            building.set()
+            release.wait(5)
+        return trigrams(text)
+
+    history._trigrams = slow_trigrams
+    try:
+        warm = threading.Thread(target=log._warm)
+        warm.start()
+        building.wait(5)
+        appended = threading.Thread(target=log.append, args=("git status",))
+        appended.start()
+        appended.join(1)
+        append_waited = appended.is_alive()
+        release.set()
+        appended.join()
+        warm.join()
+    finally:
+        history._trigrams = trigrams
+
+    tests = [
+        (append_waited, False),
+        (log._indexed, 2000),
+        (log.find("target1999"), "make target1999"),
+        (log.find("git st"), "git status"),
+        (log.search("target12", limit=2), [(1300, "make target1299"), (1299, "make target1298")]),
+        (log.find("make", mode="prefix"), "make target1999"),
+    ]
+
+    passed = 0
+    for i, (result, expected) in enumerate(tests, 1):
+        if result == expected:
+            print(f"✅ Test {i} Passed")
+            passed += 1
+        else:
+            print(f"❌ Test {i} Failed\nExpected: {expected}\nGot:      {result}\n")
+
+    print(f"\n{passed}/{len(tests)} tests passed.")
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+
+import jobs
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def burn():
+    # Some CPU time and memory for the rusage columns
+    data = bytearray(8 * 1024 * 1024)
+    end = time.process_time() + 0.05
+    while time.process_time() < end:
+        data[0] ^= 1
+
+
+def run_tests():
+    if not jobs.POSIX:
+        print("Job control tests need POSIX.")
+        return
+    jobs.install()
+
+    sleeper = jobs.start("sleep 30", lambda: time.sleep(30))
+    own_group = os.getpgid(sleeper.pid) == sleeper.pid
+    killed = jobs.kill(["kill", f"%{sleeper.id}"])
+    waited = jobs.wait_for([f"%{sleeper.id}"])
+
+    failing = jobs.start("exit 3", lambda: sys.exit(3))
+    jobs.wait_for([f"%{failing.id}"])
+
+    worker = jobs.start("burn", burn)
+    # Reaped by the SIGCHLD handler, applied at the next listing
+    reaped = wait_until(lambda: bool(jobs._reaped))
+    untouched = worker.status
+    listing = jobs.list_jobs(long=True)
+
+    finisher = jobs.start("true", lambda: None)
+    wait_until(lambda: jobs._reaped)
+    notified = jobs.notify_finished()
+
+    tests = [
+        (own_group, True),
+        (killed, ""),
+        (waited, ""),
+        (sleeper.status, "Killed (SIGTERM)"),
+        (failing.status, "Exit 3"),
+        (failing.cpu is not None and failing.maxrss > 0, True),
+        (reaped, True),
+        (untouched, "Running"),
+        (f"[{worker.id}]" in listing and "Done" in listing and "burn" in listing, True),
+        (worker.cpu >= 0.04, True),
+        (worker.maxrss >= 8 * 1024 * 1024, True),
+        (notified, f"[{finisher.id}]   Done                    true\n"),
+        (jobs.kill(["kill", f"%{sleeper.id}"]), f"kill: %{sleeper.id}: no such job\n"),
+        (jobs.table, {}),
+        (jobs.list_jobs(), ""),
+    ]
+
+    passed = 0
+    for i, (result, expected) in enumerate(tests, 1):
+        if result == expected:
+            print(f"✅ Test {i} Passed")
+            passed += 1
+        else:
+            print(f"❌ Test {i} Failed\nExpected: {expected}\nGot:      {result}\n")
+
+    print(f"\n{passed}/{len(tests)} tests passed.")
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,41 @@
+from pipeline import run_stages, iter_lines
+
+
+def upper(chunks):
+    for chunk in chunks:
+        yield chunk.upper()
+
+
+def numbers(chunks):
+    for i in range(1, 4):
+        yield f"line {i}\n".encode()
+
+
+def keep_odd(chunks):
+    for line in iter_lines(chunks):
+        if int(line.split()[1]) % 2:
+            yield line
+
+
+def run_tests():
+    tests = [
+        (list(iter_lines([b"a\nb", b"c\n", b"d"])), [b"a\n", b"bc\n", b"d"]),
+        (list(iter_lines([b"", b"\n\n"])), [b"\n", b"\n"]),
+        (list(iter_lines(None)), []),
+        (b"".join(run_stages([upper], iter([b"abc"]))), b"ABC"),
+        (b"".join(run_stages([numbers, keep_odd])), b"line 1\nline 3\n"),
+        (b"".join(run_stages([numbers, keep_odd, upper])), b"LINE 1\nLINE 3\n"),
+    ]
+
+    passed = 0
+    for i, (result, expected) in enumerate(tests, 1):
+        if result == expected:
+            print(f"✅ Test {i} Passed")
+            passed += 1
+        else:
+            print(f"❌ Test {i} Failed\nExpected: {expected}\nGot:      {result}\n")
+
+    print(f"\n{passed}/{len(tests)} tests passed.")
+
+if __name__ == "__main__":
+    run_tests()
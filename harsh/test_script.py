@@ -0,0 +1,68 @@
+import contextlib
+import io
+import os
+import subprocess
+import sys
+
+import executer
+from executer import PIPE
+from main import split_commands, run_script
+
+
+def run(text):
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        status = run_script(text, "test")
+    return status, out.getvalue()
+
+
+def run_async(text):
+    # In a child shell: the asyncio core writes to the real stdout's buffer
+    env = dict(os.environ, BASHAI_EXECUTOR="async")
+    main = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    proc = subprocess.run([sys.executable, main, "-c", text], capture_output=True, env=env)
+    return proc.returncode, proc.stdout.decode()
+
+
+def run_tests():
+    os.environ["BASHAI_TEST_PRICE"] = "5$HOME"
+    try:
+        own_alias = run("alias echo='echo a'; echo b")
+    finally:
+        executer.aliases.pop("echo", None)
+
+    tests = [
+        (split_commands("echo 'x | y' | cat"), [["echo", "x | y", PIPE, "cat"]]),
+        (split_commands("tr '|' , <f|sort")[0][1] is PIPE, False),
+        (split_commands("tr '|' , <f|sort")[0][4] is PIPE, True),
+        (split_commands("echo \"a;b\"; pwd # note"), [["echo", "a;b"], ["pwd"]]),
+        (split_commands("echo a#b 'c'\"d\"\\ e ''"), [["echo", "a#b", "cd e", ""]]),
+        (run("echo 'x | y' | grep x"), (0, "x | y\n")),
+        (run("echo '|' | grep -c '|'"), (0, "1\n")),
+        (run("true; false"), (1, "")),
+        (run("false; true"), (0, "")),
+        (run("exit 3; echo no"), (3, "Exiting shell...\n")),
+        (run("no_such_command_here")[0], 127),
+        (run("echo 'unterminated")[0], 2),
+        (own_alias, (0, "a b\n")),
+        (run("echo $BASHAI_TEST_PRICE | cat"), (0, "5$HOME\n")),
+        (run("echo $BASHAI_TEST_PRICE"), (0, "5$HOME\n")),
+        (run_async("false")[0], 1),
+        (run_async("echo x | false; true")[0], 0),
+        (run_async("true | sh -c 'exit 7'")[0], 7),
+        (run_async("no_such_command_here")[0], 127),
+        (run_async("echo x | grep x"), (0, "x\n")),
+    ]
+
+    passed = 0
+    for i, (result, expected) in enumerate(tests, 1):
+        if result == expected:
+            print(f"✅ Test {i} Passed")
+            passed += 1
+        else:
+            print(f"❌ Test {i} Failed\nExpected: {expected}\nGot:      {result}\n")
+
+    print(f"\n{passed}/{len(tests)} tests passed.")
+
+if __name__ == "__main__":
+    run_tests()
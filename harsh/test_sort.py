@@ -0,0 +1,80 @@
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+
+# A tiny budget so every input below is cut into many runs that are spilled
+# to disk and merged
+os.environ["BASHAI_SORT_MEMORY"] = "4096"
+os.environ["BASHAI_SORT_WORKERS"] = "2"
+
+import sort_engine
+
+
+def gnu_sort(args, data):
+    env = dict(os.environ, LC_ALL="C")
+    return subprocess.run(["sort", *args], input=data, capture_output=True, env=env).stdout
+
+
+def ours(args, path=None, data=None):
+    tokens = ["sort", *args] + ([path] if path else [])
+    chunks = None if data is None else [data[i:i + 1000] for i in range(0, len(data), 1000)]
+    return b"".join(sort_engine.sort(tokens, chunks))
+
+
+def run_tests():
+    rng = random.Random(13)
+    words = ["apple", "Banana", "cherry", "date", "elder", "fig", "grape"]
+    lines = [f"{rng.choice(words)}:{rng.randint(-500, 500)}:{rng.choice(words)}{rng.randint(0, 40)}\n"
+             for _ in range(3000)]
+    data = "".join(lines).encode()
+
+    tmp = tempfile.mkdtemp()
+    old_tempdir = tempfile.tempdir
+    tempfile.tempdir = tmp
+    spilled = []
+    spill_runs = sort_engine.spill_runs
+
+    def counting_spill_runs(runs, opts, tmp_dir):
+        paths = spill_runs(runs, opts, tmp_dir)
+        spilled.append(len(paths))
+        return paths
+
+    sort_engine.spill_runs = counting_spill_runs
+    # Few enough open runs at a time that the intermediate merges run too
+    old_fanin, sort_engine.MERGE_FANIN = sort_engine.MERGE_FANIN, 4
+    try:
+        path = os.path.join(tmp, "input.txt")
+        with open(path, "wb") as f:
+            f.write(data)
+        cases = [[], ["-r"], ["-u"], ["-t", ":", "-k", "2,2", "-n"],
+                 ["-t", ":", "-k2", "-nr"], ["-t", ":", "-k", "3", "-u"]]
+        tests = [(ours(args, path=path), gnu_sort(args, data)) for args in cases]
+        tests += [
+            (ours(["-n", "-t", ":", "-k", "2,2"], data=data), gnu_sort(["-n", "-t", ":", "-k", "2,2"], data)),
+            (ours(["-u"], data=data), gnu_sort(["-u"], data)),
+            (ours([], data=b"b\na\n"), b"a\nb\n"),
+            (ours(["-r"], data=data + b"m" * 5000 + b"\n"), gnu_sort(["-r"], data + b"m" * 5000 + b"\n")),
+            (len(spilled), len(cases) + 3),
+            (min(spilled) > sort_engine.MERGE_FANIN, True),
+            (sorted(os.listdir(tmp)), ["input.txt"]),
+        ]
+    finally:
+        sort_engine.spill_runs = spill_runs
+        sort_engine.MERGE_FANIN = old_fanin
+        tempfile.tempdir = old_tempdir
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    passed = 0
+    for i, (result, expected) in enumerate(tests, 1):
+        if result == expected:
+            print(f"✅ Test {i} Passed")
+            passed += 1
+        else:
+            print(f"❌ Test {i} Failed\nExpected: {expected}\nGot:      {result}\n")
+
+    print(f"\n{passed}/{len(tests)} tests passed.")
+
+if __name__ == "__main__":
+    run_tests()
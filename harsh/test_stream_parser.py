@@ -0,0 +1,37 @@
+from chat import AnswerStreamParser
+
+
+def parse(text, size):
+    # Feed text in pieces of size characters, as tokens arrive
+    parser = AnswerStreamParser()
+    events = []
+    for i in range(0, len(text), size):
+        events += parser.feed(text[i:i + size])
+    events += parser.close()
+    shown = "".join(value for kind, value in events if kind == "explanation")
+    return shown, parser.command
+
+
+def run_tests():
+    reply = "Explanation: The Command: label is only a label\nat a line start.\nCommand: ls -la\n"
+    expected = ("The Command: label is only a label\nat a line start.", "ls -la")
+
+    tests = [(parse(reply, size), expected) for size in (1, 2, 3, 7, len(reply))]
+    tests += [
+        (parse("Command: df -h\n", 1), ("", "df -h")),
+        (parse("Explanation: disk usage\n   Command: du -sh .", 4), ("disk usage", "du -sh .")),
+        (parse("Explanation: no command here", 5), ("no command here", None)),
+    ]
+
+    passed = 0
+    for i, (result, expected) in enumerate(tests, 1):
+        if result == expected:
+            print(f"✅ Test {i} Passed")
+            passed += 1
+        else:
+            print(f"❌ Test {i} Failed\nExpected: {expected}\nGot:      {result}\n")
+
+    print(f"\n{passed}/{len(tests)} tests passed.")
+
+if __name__ == "__main__":
+    run_tests()
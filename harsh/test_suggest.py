@@ -0,0 +1,53 @@
+import math
+import os
+import tempfile
+
+os.environ["BASHAI_SUGGEST_PLACES"] = os.path.join(tempfile.mkdtemp(), "places")
+
+from suggest import Model, TOP_K
+
+
+def run_tests():
+    # Longer than the ~512k uses at which 2 ** (n / HALF_LIFE) overflows
+    long_model = Model()
+    try:
+        long_model.load(["make test", "make build"] * 300000)
+        loaded = True
+    except OverflowError:
+        loaded = False
+    long_model.observe("make lint")
+
+    # git diff is rare overall, so it is not among the global TOP_K for "g",
+    # but it is what gets run in this project
+    model = Model()
+    model.load(["g++ main.c"] * 3 + [f"grep word{i} log" for i in range(TOP_K)] * 5)
+    model.observe("git diff", cwd="/project")
+    model.observe("git diff", cwd="/project")
+    model.observe("git log", cwd="/elsewhere")
+    in_top = any(command == "git diff" for _, command in model.top["g"])
+
+    tests = [
+        (loaded, True),
+        (all(math.isfinite(score) for score in long_model.scores.values()), True),
+        (long_model.suggest("make t"), "make test"),
+        (long_model.suggest("make l"), "make lint"),
+        (in_top, False),
+        (model.suggest("g", cwd="/project"), "git diff"),
+        (model.suggest("g", cwd="/other") == "git diff", False),
+        (model.suggest("git ", cwd="/elsewhere"), "git log"),
+        (model.suggest("git d", cwd="/other"), "git diff"),
+        (model.place_lists["/project"], ["git diff"]),
+    ]
+
+    passed = 0
+    for i, (result, expected) in enumerate(tests, 1):
+        if result == expected:
+            print(f"✅ Test {i} Passed")
+            passed += 1
+        else:
+            print(f"❌ Test {i} Failed\nExpected: {expected}\nGot:      {result}\n")
+
+    print(f"\n{passed}/{len(tests)} tests passed.")
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,60 @@
+import os
+import tempfile
+
+os.environ["BASHAI_FSINDEX_PATH"] = os.path.join(tempfile.mkdtemp(), "fsindex.db")
+os.environ["BASHAI_FSINDEX_INOTIFY"] = "0"
+
+import fsindex
+import tree_engine
+
+
+def write(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+
+def tree(*args):
+    return b"".join(tree_engine.tree(["tree", *args])).decode()
+
+
+def run_tests():
+    tmp = tempfile.mkdtemp()
+    cwd = os.getcwd()
+    os.chdir(tmp)
+    try:
+        os.makedirs("d/sub")
+        write("d/sub/grows", b"x")
+        write("d/small", b"x")
+        fsindex.index("d")
+        indexed_before = tree("--du", "d")
+
+        # Rewritten in place: no directory mtime moves, the index row keeps
+        # the old size
+        sub_mtime = os.stat("d/sub").st_mtime_ns
+        write("d/sub/grows", b"x" * 100000)
+        os.utime("d/sub", ns=(sub_mtime, sub_mtime))
+        indexed_after = tree("--du", "d")
+        fsindex.drop("d")
+        unindexed = tree("--du", "d")
+
+        tests = [
+            ("[     1]  grows" in indexed_before, True),
+            ("[ 97.7K]  grows" in indexed_after, True),
+            (indexed_after, unindexed),
+            ("1 directory, 2 files" in tree("d"), True),
+        ]
+    finally:
+        os.chdir(cwd)
+
+    passed = 0
+    for i, (result, expected) in enumerate(tests, 1):
+        if result == expected:
+            print(f"✅ Test {i} Passed")
+            passed += 1
+        else:
+            print(f"❌ Test {i} Failed\nExpected: {expected}\nGot:      {result}\n")
+
+    print(f"\n{passed}/{len(tests)} tests passed.")
+
+if __name__ == "__main__":
+    run_tests()
@@ -0,0 +1,38 @@
+import os
+import tempfile
+
+import numpy as np
+
+from vector_index import build_index, open_index
+
+
+def run_tests():
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((500, 16)).astype(np.float32)
+    texts = [f"chunk {i}" for i in range(len(vectors))]
+    metadatas = [{"page": i} for i in range(len(vectors))]
+    query = vectors[42] + 0.01
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "native")
+        for dtype, nlist in [("float16", 0), ("int8", 0), ("float16", 10)]:
+            build_index(path, texts, vectors, metadatas, dtype=dtype, nlist=nlist)
+            index = open_index(path)
+            doc = index.similarity_search_by_vector(query, k=3, nprobe=10)[0]
+            results.append(((dtype, nlist, doc.page_content, doc.metadata), (dtype, nlist, "chunk 42", {"page": 42})))
+        build_index(path, [], [])
+        results.append((open_index(path).search(query), []))
+
+    passed = 0
+    for i, (result, expected) in enumerate(results, 1):
+        if result == expected:
+            print(f"✅ Test {i} Passed")
+            passed += 1
+        else:
+            print(f"❌ Test {i} Failed\nExpected: {expected}\nGot:      {result}\n")
+
+    print(f"\n{passed}/{len(results)} tests passed.")
+
+if __name__ == "__main__":
+    run_tests()
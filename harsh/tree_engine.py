@@ -0,0 +1,275 @@
+import os
+
+import fsindex
+
+# tree built on os.scandir: whether an entry is a directory comes from the
+# listing itself, so there is no extra stat per entry, and lines are streamed
+# out as they are produced. Only the entries of the directories on the
+# current path are held in memory. --du needs a directory's total before its
+# line can be printed, so it buffers each subtree's lines instead.
+
+OUTPUT_LINES = 256
+USAGE = b"Usage: tree [-a] [-d] [-l] [-L level] [--du] [--filelimit N] [--limit N] [path...]\n"
+
+
+class TreeOptions:
+    def __init__(self):
+        self.paths = []
+        self.all = False
+        self.dirs_only = False
+        self.follow = False
+        self.max_depth = None
+        self.du = False
+        self.file_limit = None
+        self.limit = None
+
+
+def parse_args(tokens):
+    opts = TreeOptions()
+    args = iter(tokens[1:])
+
+    def number(option):
+        value = next(args, None)
+        if value is None or not value.isdigit() or int(value) < 1:
+            raise ValueError(f"Invalid value for {option}")
+        return int(value)
+
+    for arg in args:
+        if arg == "-L":
+            opts.max_depth = number(arg)
+        elif arg == "--du":
+            opts.du = True
+        elif arg == "--filelimit":
+            opts.file_limit = number(arg)
+        elif arg == "--limit":
+            opts.limit = number(arg)
+        elif arg.startswith("-") and len(arg) > 1 and not arg.startswith("--"):
+            for flag in arg[1:]:
+                if flag == "a":
+                    opts.all = True
+                elif flag == "d":
+                    opts.dirs_only = True
+                elif flag == "l":
+                    opts.follow = True
+                else:
+                    raise ValueError(f"Invalid argument -`{flag}'")
+        elif arg.startswith("--"):
+            raise ValueError(f"Invalid argument `{arg}'")
+        else:
+            opts.paths.append(arg)
+    if not opts.paths:
+        opts.paths = ["."]
+    return opts
+
+
+def human_size(size):
+    for unit in ("", "K", "M", "G", "T"):
+        if size < 1024 or unit == "T":
+            return f"{size}" if not unit else f"{size:.1f}{unit}"
+        size /= 1024
+
+
+def list_entries(path, opts):
+    # Sorted, filtered entries of one directory; raises OSError
+    entries = fsindex.list_dir(path)
+    if entries is None:
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda e: e.name)
+    elif opts.du:
+        entries = [fsindex.FreshEntry(e) for e in entries]
+    if not opts.all:
+        entries = [e for e in entries if not e.name.startswith(".")]
+    if opts.dirs_only:
+        entries = [e for e in entries if is_dir(e, opts)]
+    return entries
+
+
+def is_dir(entry, opts):
+    if entry.is_dir(follow_symlinks=False):
+        return True
+    return opts.follow and entry.is_symlink() and os.path.isdir(entry.path)
+
+
+def label(entry):
+    if entry.is_symlink():
+        try:
+            return f"{entry.name} -> {os.readlink(entry.path)}"
+        except OSError:
+            return entry.name
+    return entry.name
+
+
+def dir_key(path, opts):
+    # (dev, inode) identity, only needed to catch loops when following links
+    if not opts.follow:
+        return None
+    st = os.stat(path)
+    return st.st_dev, st.st_ino
+
+
+class Walk:
+    def __init__(self, opts):
+        self.opts = opts
+        self.dirs = 0
+        self.files = 0
+        self.emitted = 0
+
+    def truncated(self):
+        return self.opts.limit is not None and self.emitted >= self.opts.limit
+
+    def descend(self, entry, depth, ancestors):
+        # Returns (should_walk, note, key)
+        if not is_dir(entry, self.opts):
+            return False, "", None
+        if self.opts.max_depth is not None and depth >= self.opts.max_depth:
+            return False, "", None
+        if entry.is_symlink() and not self.opts.follow:
+            return False, "", None
+        try:
+            key = dir_key(entry.path, self.opts)
+        except OSError:
+            return False, "  [error opening dir]", None
+        if key is not None and key in ancestors:
+            return False, "  [recursive, not followed]", None
+        return True, "", key
+
+    def walk(self, path, prefix, depth, ancestors):
+        # Yields the lines below path
+        try:
+            entries = list_entries(path, self.opts)
+        except OSError:
+            yield prefix + "[error opening dir]"
+            return
+        last = len(entries) - 1
+        for i, entry in enumerate(entries):
+            if self.truncated():
+                return
+            connector = "└── " if i == last else "├── "
+            walk_it, note, key = self.descend(entry, depth, ancestors)
+            if is_dir(entry, self.opts):
+                self.dirs += 1
+            else:
+                self.files += 1
+            if walk_it and self.opts.file_limit is not None:
+                count = self.count_entries(entry.path)
+                if count > self.opts.file_limit:
+                    walk_it = False
+                    note = f"  [{count} entries exceeds filelimit, not opening dir]"
+            self.emitted += 1
+            yield prefix + connector + label(entry) + note
+            if walk_it:
+                extension = "    " if i == last else "│   "
+                yield from self.walk(entry.path, prefix + extension, depth + 1, ancestors | {key})
+
+    def count_entries(self, path):
+        try:
+            return len(list_entries(path, self.opts))
+        except OSError:
+            return 0
+
+    def walk_du(self, path, prefix, depth, ancestors):
+        # Returns (lines, total bytes) for everything below path
+        try:
+            entries = list_entries(path, self.opts)
+        except OSError:
+            return [prefix + "[error opening dir]"], 0
+        lines = []
+        total = 0
+        last = len(entries) - 1
+        for i, entry in enumerate(entries):
+            connector = "└── " if i == last else "├── "
+            walk_it, note, key = self.descend(entry, depth, ancestors)
+            try:
+                size = entry.stat(follow_symlinks=False).st_size
+            except OSError:
+                size = 0
+            child_lines = []
+            if is_dir(entry, self.opts):
+                self.dirs += 1
+                if walk_it:
+                    extension = "    " if i == last else "│   "
+                    child_lines, child_total = self.walk_du(entry.path, prefix + extension, depth + 1, ancestors | {key})
+                    size += child_total
+                elif not note and not entry.is_symlink():
+                    # Below the -L limit: still counted, just not shown
+                    size += self.subtree_size(entry.path)
+            else:
+                self.files += 1
+            total += size
+            if self.truncated():
+                continue
+            self.emitted += 1
+            lines.append(f"{prefix}{connector}[{human_size(size):>6}]  {label(entry)}{note}")
+            lines.extend(child_lines)
+        return lines, total
+
+    def subtree_size(self, path):
+        total = 0
+        stack = [path]
+        while stack:
+            try:
+                with os.scandir(stack.pop()) as it:
+                    for entry in it:
+                        try:
+                            total += entry.stat(follow_symlinks=False).st_size
+                        except OSError:
+                            continue
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+            except OSError:
+                continue
+        return total
+
+
+def _blocks(lines):
+    out = []
+    for line in lines:
+        out.append(line)
+        if len(out) >= OUTPUT_LINES:
+            yield ("\n".join(out) + "\n").encode()
+            out = []
+    if out:
+        yield ("\n".join(out) + "\n").encode()
+
+
+def tree(tokens, chunks=None):
+    try:
+        opts = parse_args(tokens)
+    except ValueError as e:
+        yield f"tree: {e}\n".encode() + USAGE
+        return
+
+    walk = Walk(opts)
+    for path in opts.paths:
+        if not os.path.isdir(path):
+            yield f"{path}  [error opening dir]\n".encode()
+            continue
+        try:
+            root_key = dir_key(path, opts)
+        except OSError:
+            root_key = None
+        if opts.du:
+            lines, total = walk.walk_du(path, "", 1, {root_key})
+            try:
+                total += os.stat(path).st_size
+            except OSError:
+                pass
+            yield from _blocks([f"[{human_size(total):>6}]  {path}"] + lines)
+        else:
+            yield from _blocks(_chain([path], walk.walk(path, "", 1, {root_key})))
+
+    if walk.truncated():
+        yield f"... output truncated at {opts.limit} entries\n".encode()
+    summary = _plural(walk.dirs, "directory", "directories")
+    if not opts.dirs_only:
+        summary += ", " + _plural(walk.files, "file", "files")
+    yield f"\n{summary}\n".encode()
+
+
+def _plural(count, one, many):
+    return f"{count} {one if count == 1 else many}"
+
+
+def _chain(first, rest):
+    yield from first
+    yield from rest
@@ -0,0 +1,220 @@
+import os
+import json
+import shutil
+
+import numpy as np
+
+# Native on-disk format for the DocBot knowledge base. Everything is a flat
+# array that is memory-mapped on open, so opening is near-instant, nothing is
+# unpickled, and several shells share the same pages of the OS page cache.
+#
+#   meta.json       dim, count, dtype, IVF layout
+#   vectors.bin     count x dim unit vectors, float16 or int8
+#   scales.bin      float32 per-row scale (int8 only)
+#   docs.bin        one JSON record per chunk (text, metadata, id), concatenated
+#   offsets.bin     int64 count + 1 byte offsets into docs.bin
+#   centroids.bin   float32 nlist x dim IVF centroids (optional)
+#   lists.bin       int64 nlist + 1 row offsets; rows are stored grouped by list
+
+FORMAT_VERSION = 1
+SEARCH_BLOCK = 65536
+IVF_MIN_VECTORS = 50000
+
+
+class Document:
+    def __init__(self, page_content, metadata=None, id=None):
+        self.page_content = page_content
+        self.metadata = metadata or {}
+        self.id = id
+
+    def __repr__(self):
+        return f"Document(id={self.id!r}, page_content={self.page_content[:40]!r})"
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.maximum(norms, 1e-12)
+
+
+def _kmeans(vectors, nlist, iterations=10, seed=0):
+    # Spherical k-means on a sample, good enough to partition for IVF
+    rng = np.random.default_rng(seed)
+    sample_size = min(len(vectors), nlist * 256)
+    sample = vectors[rng.choice(len(vectors), sample_size, replace=False)]
+    centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+    for _ in range(iterations):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        for c in range(nlist):
+            members = sample[assign == c]
+            if len(members):
+                centroids[c] = members.mean(axis=0)
+        centroids = _normalize(centroids)
+    return centroids.astype(np.float32)
+
+
+def _assign(vectors, centroids):
+    out = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), SEARCH_BLOCK):
+        block = vectors[start:start + SEARCH_BLOCK]
+        out[start:start + SEARCH_BLOCK] = np.argmax(block @ centroids.T, axis=1)
+    return out
+
+
+def build_index(out_dir, texts, vectors, metadatas=None, ids=None, dtype="float16", nlist=None):
+    """Write a native index to ``out_dir``, replacing any existing one.
+
+    ``nlist`` is the number of IVF lists; None picks one automatically for
+    large corpora and 0 disables IVF.
+    """
+    if len(texts):
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+    else:
+        vectors = np.zeros((0, 0), dtype=np.float32)
+    count, dim = vectors.shape
+    metadatas = metadatas or [{} for _ in texts]
+    ids = ids or [str(i) for i in range(count)]
+
+    if nlist is None:
+        nlist = int(np.sqrt(count)) if count >= IVF_MIN_VECTORS else 0
+    nlist = min(nlist, count)
+
+    order = np.arange(count)
+    centroids = list_offsets = None
+    if nlist:
+        centroids = _kmeans(vectors, nlist)
+        assign = _assign(vectors, centroids)
+        order = np.argsort(assign, kind="stable")
+        list_offsets = np.searchsorted(assign[order], np.arange(nlist + 1)).astype(np.int64)
+        vectors = vectors[order]
+
+    tmp_dir = f"{out_dir}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    if dtype == "int8":
+        scales = np.maximum(np.abs(vectors).max(axis=1, initial=0), 1e-12) / 127.0
+        quantized = np.round(vectors / scales[:, None]).astype(np.int8)
+        quantized.tofile(os.path.join(tmp_dir, "vectors.bin"))
+        scales.astype(np.float32).tofile(os.path.join(tmp_dir, "scales.bin"))
+    else:
+        dtype = "float16"
+        vectors.astype(np.float16).tofile(os.path.join(tmp_dir, "vectors.bin"))
+
+    offsets = np.zeros(count + 1, dtype=np.int64)
+    with open(os.path.join(tmp_dir, "docs.bin"), "wb") as f:
+        for row, i in enumerate(order):
+            record = json.dumps({"text": texts[i], "metadata": metadatas[i], "id": ids[i]}).encode("utf-8")
+            f.write(record)
+            offsets[row + 1] = offsets[row] + len(record)
+    offsets.tofile(os.path.join(tmp_dir, "offsets.bin"))
+
+    if nlist:
+        centroids.tofile(os.path.join(tmp_dir, "centroids.bin"))
+        list_offsets.tofile(os.path.join(tmp_dir, "lists.bin"))
+
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({"version": FORMAT_VERSION, "dim": dim, "count": count, "dtype": dtype, "nlist": nlist}, f)
+
+    # Swap directories; shells that still map the old files keep their view
+    old_dir = f"{out_dir}.old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(out_dir):
+        os.rename(out_dir, old_dir)
+    os.rename(tmp_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def export_faiss(vectorstore, out_dir, dtype="float16", nlist=None):
+    # Convert a LangChain FAISS store into the native format
+    count = vectorstore.index.ntotal
+    vectors = vectorstore.index.reconstruct_n(0, count) if count else np.zeros((0, 0), dtype=np.float32)
+    texts, metadatas, ids = [], [], []
+    for i in range(count):
+        doc_id = vectorstore.index_to_docstore_id[i]
+        doc = vectorstore.docstore.search(doc_id)
+        texts.append(doc.page_content)
+        metadatas.append(doc.metadata)
+        ids.append(doc_id)
+    build_index(out_dir, texts, vectors, metadatas, ids, dtype=dtype, nlist=nlist)
+
+
+class NativeIndex:
+    def __init__(self, path):
+        with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported index format version {meta.get('version')}")
+
+        self.path = path
+        self.dim = meta["dim"]
+        self.count = meta["count"]
+        self.dtype = meta["dtype"]
+        self.nlist = meta.get("nlist", 0)
+
+        def mapped(name, dtype, shape=None):
+            if self.count == 0:
+                return np.zeros(shape or (0,), dtype=dtype)
+            return np.memmap(os.path.join(path, name), dtype=dtype, mode="r", shape=shape)
+
+        self.vectors = mapped("vectors.bin", np.int8 if self.dtype == "int8" else np.float16, (self.count, self.dim))
+        self.scales = mapped("scales.bin", np.float32) if self.dtype == "int8" else None
+        self.offsets = mapped("offsets.bin", np.int64)
+        self.docs = mapped("docs.bin", np.uint8)
+        if self.nlist:
+            self.centroids = np.fromfile(os.path.join(path, "centroids.bin"), dtype=np.float32).reshape(self.nlist, self.dim)
+            self.lists = np.fromfile(os.path.join(path, "lists.bin"), dtype=np.int64)
+
+    def __len__(self):
+        return self.count
+
+    def document(self, row):
+        start, end = int(self.offsets[row]), int(self.offsets[row + 1])
+        record = json.loads(bytes(self.docs[start:end]).decode("utf-8"))
+        return Document(record["text"], record["metadata"], record["id"])
+
+    def _scores(self, start, end, query):
+        block = self.vectors[start:end].astype(np.float32)
+        scores = block @ query
+        if self.scales is not None:
+            scores *= self.scales[start:end]
+        return scores
+
+    def search(self, vector, k=5, nprobe=8):
+        # Returns [(row, score)] best first, scanning only the nprobe closest
+        # IVF lists when the index has them.
+        if self.count == 0:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+
+        if self.nlist:
+            probes = np.argsort(self.centroids @ query)[::-1][:nprobe]
+            ranges = [(int(self.lists[c]), int(self.lists[c + 1])) for c in probes]
+        else:
+            ranges = [(s, min(s + SEARCH_BLOCK, self.count)) for s in range(0, self.count, SEARCH_BLOCK)]
+
+        best_rows, best_scores = [], []
+        for start, end in ranges:
+            if start == end:
+                continue
+            scores = self._scores(start, end, query)
+            top = np.argpartition(scores, -min(k, len(scores)))[-k:]
+            best_rows.append(top + start)
+            best_scores.append(scores[top])
+        if not best_rows:
+            return []
+
+        rows = np.concatenate(best_rows)
+        scores = np.concatenate(best_scores)
+        order = np.argsort(scores)[::-1][:k]
+        return [(int(rows[i]), float(scores[i])) for i in order]
+
+    def similarity_search_by_vector(self, embedding, k=5, **kwargs):
+        return [self.document(row) for row, _ in self.search(embedding, k, kwargs.get("nprobe", 8))]
+
+    def similarity_search_with_score_by_vector(self, embedding, k=5, **kwargs):
+        return [(self.document(row), score) for row, score in self.search(embedding, k, kwargs.get("nprobe", 8))]
+
+
+def open_index(path):
+    return NativeIndex(path)